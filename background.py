@@ -0,0 +1,113 @@
+import os
+import time
+import queue
+import logging
+import functools
+import threading
+import contextvars
+from datetime import datetime, timedelta
+
+import dash
+
+PREFETCH_QUEUE_SIZE = 64    # 대기 중인 미리 계산 요청 최대 수 (넘치면 새 요청은 버림)
+
+_result_key = contextvars.ContextVar("background_result_key", default=None)
+
+
+# 백그라운드 콜백 관리자: 콜백을 별도 프로세스에서 실행하고 결과를 디스크 캐시에 보관 (gunicorn 워커 간 공유)
+# Dash는 같은 입력의 결과가 이미 캐시에 있어도 매번 프로세스를 띄우므로, 캐시에 있으면 띄우지 않고
+# 작업 번호 0을 돌려줌 (브라우저는 작업 번호 없이 cacheKey로 다시 요청하여 캐시된 결과를 받음)
+# 작업 프로세스에서 잰 콜백 실행 시간은 결과보다 먼저 캐시에 적어 두고, 결과를 가져갈 때 on_job_done으로 전달
+class CachedDiskcacheManager(dash.DiskcacheManager):
+    on_job_done = None  # on_job_done(콜백 이름, 실행 시간 초)
+
+    def make_job_fn(self, fn, progress, key=None):
+        cache, expire = self.handle, self.expire
+
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                cache.set(f"{_result_key.get()}-runtime", (fn.__name__, time.perf_counter() - started), expire=expire)
+
+        job_fn = super().make_job_fn(timed, progress, key)
+
+        # Dash의 작업 함수는 현재 컨텍스트를 복사해 콜백을 실행하므로 결과 키를 컨텍스트 변수로 넘김
+        def run(result_key, progress_key, args, context):
+            _result_key.set(result_key)
+            return job_fn(result_key, progress_key, args, context)
+        return run
+
+    def get_result(self, key, job):
+        result = super().get_result(key, job)
+        if result is not self.UNDEFINED and self.on_job_done is not None:
+            runtime = self.handle.pop(f"{key}-runtime", None)
+            if runtime is not None:
+                self.on_job_done(*runtime)
+        return result
+
+    def call_job_fn(self, key, job_fn, args, context):
+        if self.cache_by is not None and self.result_ready(key):
+            return 0
+        return super().call_job_fn(key, job_fn, args, context)
+
+    def job_running(self, job):
+        return bool(job) and super().job_running(job)
+
+
+def background_callback_manager(cache_dir, version, expire):
+    import diskcache
+
+    return CachedDiskcacheManager(diskcache.Cache(cache_dir), cache_by=[version], expire=expire)
+
+
+# 이전/다음 기간 (조회 기간 바로 앞/뒤 날짜가 속한 같은 단위의 기간, 임의 기간은 없음)
+def neighbour_periods(period, start_date, end_date, resolve_period):
+    if period not in ('day', 'week', 'month'):
+        return []
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d")
+    return [resolve_period(period, day.strftime("%Y-%m-%d"), None, None)
+            for day in (start - timedelta(1), end + timedelta(1))]
+
+
+# 화면 값 미리 계산: 사용자가 보고 있는 동안 다음에 누를 가능성이 높은 지역/기간을 백그라운드 스레드에서 캐시에 채움
+# (스레드는 프로세스마다 첫 요청 시 시작, gunicorn preload 후 fork 된 워커에서도 동작)
+class Prefetcher:
+    def __init__(self, warm, size=PREFETCH_QUEUE_SIZE):
+        self.warm = warm    # warm(지역, 시작일, 종료일, 데이터 버전)
+        self.size = size
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        self._pid = os.getpid()
+        self._queue = queue.Queue(self.size)
+        self._pending = set()
+        threading.Thread(target=self._run, name="view-prefetch", daemon=True).start()
+
+    def request(self, keys):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._start()
+            for key in keys:
+                if key in self._pending:
+                    continue
+                try:
+                    self._queue.put_nowait(key)
+                except queue.Full:
+                    return
+                self._pending.add(key)
+
+    def _run(self):
+        while True:
+            key = self._queue.get()
+            try:
+                self.warm(*key)
+            except Exception as e:
+                logging.warning(f"Prefetch of {key} failed: {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
@@ -0,0 +1,115 @@
+import threading
+from datetime import date as Date
+
+import numpy as np
+import holidays
+
+BASELINE_FIELDS = ("days", "users", "calls", "wait_count", "wait_sum", "wait_sumsq")
+BASELINE_CHOICES = {"day_type": "평일/휴일", "weekday": "요일", "weeks4": "최근 4주", "weeks12": "최근 12주"}
+TRAILING_DAYS = {"weeks4": 28, "weeks12": 84}
+WEEKDAY_NAMES = ("월", "화", "수", "목", "금", "토", "일")
+
+
+# 데이터 기간 연도의 공휴일 ('YYYY-MM-DD' 집합, 일자마다 holidays.KR()에 문자열을 파싱해 묻지 않도록 미리 계산)
+def holiday_dates_of(dates):
+    years = sorted({int(date[:4]) for date in dates if date[:4].isdigit()})
+    if not years:
+        return frozenset()
+    return frozenset(day.isoformat() for day in holidays.KR(years=range(years[0], years[-1] + 1)))
+
+
+# 'YYYY-MM-DD' 기간의 일자 목록
+def dates_between(start_date, end_date):
+    return np.arange(np.datetime64(start_date), np.datetime64(end_date) + 1).astype(str).tolist()
+
+
+# 기간 값 합계 → (일평균 이용인원, 일평균 호출건수, 평균 대기시간), 자료가 없으면 None
+def summarize(values):
+    days, users, calls, wait_count, wait_sum, _ = values.tolist()
+    if not days:
+        return None
+    return users / days, calls / days, wait_sum / wait_count if wait_count else None
+
+
+# 지역별 비교 기준 (평일/휴일, 요일별 합계는 일자가 추가/교체될 때마다 그 일자만 빼고 더해 갱신)
+# 일자별 값은 (일수, 이용인원, 호출건수, 대기 건수/합/제곱합) 벡터로만 보관하여 운행 단위 자료를 들고 있지 않음
+class Baselines:
+    def __init__(self):
+        self._days = {}         # 지역 → {일자: 값 벡터}
+        self._groups = {}       # (지역, 구분) → 값 벡터 합계
+        self._holidays = frozenset()
+        self._years = set()
+        self._lock = threading.Lock()
+
+    # 일자 → 평일/휴일, 요일 구분
+    def _groups_of(self, date):
+        day = Date.fromisoformat(date)
+        return ("day_type", "휴일" if date in self._holidays else "평일"), ("weekday", day.weekday())
+
+    # (지역, 일자, 이용인원, 호출건수, 대기시간 RunningStats) 반영 (이미 있는 일자는 새 값으로 교체)
+    def update(self, day_totals):
+        rows = list(day_totals)
+        with self._lock:
+            years = {date[:4] for _, date, _, _, _ in rows} - self._years
+            if years:
+                self._years |= years
+                self._holidays = holiday_dates_of([f"{year}-01-01" for year in self._years])
+            for region, date, users, calls, waitings in rows:
+                values = np.array([1, users, calls, waitings.count, waitings.total, waitings.total_sq], dtype=float)
+                days = self._days.setdefault(region, {})
+                previous = days.get(date)
+                for group in self._groups_of(date):
+                    total = self._groups.setdefault((region, group), np.zeros(len(BASELINE_FIELDS)))
+                    if previous is not None:
+                        total -= previous
+                    total += values
+                days[date] = values
+        return self
+
+    # 같은 값을 가진 새 객체 (조회 중인 객체를 고치지 않고 갱신본을 만들어 교체할 때)
+    def copy(self):
+        other = Baselines()
+        with self._lock:
+            other._days = {region: dict(days) for region, days in self._days.items()}
+            other._groups = {key: total.copy() for key, total in self._groups.items()}
+            other._holidays = self._holidays
+            other._years = set(self._years)
+        return other
+
+    def __contains__(self, region):
+        return region in self._days
+
+    # 기간 [start_date, end_date] 값 합계 (자료가 있는 일자만)
+    def period(self, region, start_date, end_date):
+        total = np.zeros(len(BASELINE_FIELDS))
+        with self._lock:
+            days = self._days.get(region, {})
+            for date in dates_between(start_date, end_date):
+                values = days.get(date)
+                if values is not None:
+                    total += values
+        return total
+
+    # 기간 [start_date, end_date]와 비교할 기준 (라벨, 값 합계)
+    # 평일/휴일, 요일은 기간의 일자마다 같은 구분의 평균 하루를 더하고, 최근 N주는 시작일 직전 N주를 더함
+    def baseline(self, region, start_date, end_date, kind):
+        if kind in TRAILING_DAYS:
+            window = TRAILING_DAYS[kind]
+            first = str(np.datetime64(start_date) - window)
+            last = str(np.datetime64(start_date) - 1)
+            return f"{BASELINE_CHOICES[kind]} 평균", self.period(region, first, last)
+
+        total = np.zeros(len(BASELINE_FIELDS))
+        labels = set()
+        with self._lock:
+            for date in dates_between(start_date, end_date):
+                group = self._groups_of(date)[0 if kind == "day_type" else 1]
+                labels.add(group[1])
+                values = self._groups.get((region, group))
+                if values is not None and values[0]:
+                    total += values / values[0]
+        if kind == "weekday":
+            label = f"{WEEKDAY_NAMES[labels.pop()]}요일" if len(labels) == 1 else "요일별"
+        else:
+            label = labels.pop() if len(labels) == 1 else "평일·휴일"
+        return f"{label} 평균", total
@@ -0,0 +1,243 @@
+import os
+import sys
+import json
+import time
+import shutil
+import inspect
+import fnmatch
+import logging
+import argparse
+import platform
+import subprocess
+from datetime import datetime
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+bench_dir = os.path.join('cache', 'bench')
+RESULT_FORMAT = 1
+
+# 지표별 허용 증가율 (위에서부터 처음 맞는 패턴 적용), 잡음으로 보는 절대 증가량 (지표 단위별)
+# (지연 시간은 같은 코드에서도 실행마다 편차가 커서 넉넉하게, 응답 크기와 메모리는 좁게)
+THRESHOLDS = [
+    ("callback.*.payload_*", 0.05),
+    ("memory.*", 0.10),
+    ("callback.*", 0.50),
+    ("*", 0.30),
+]
+NOISE_FLOORS = {"_ms": 5.0, "_s": 0.1, "_mb": 5.0, "_bytes": 512}
+WARM_REPEAT = 3     # warm 지연 시간은 재호출 중 최솟값
+
+
+# 합성 데이터 작업 폴더 (정류장, 지역, 그린존/레드존 입력은 저장소의 파일을 링크, 운행내역만 생성)
+def prepare_workdir(trips, seed, days, regenerate=False):
+    from synth import write_history
+
+    data_dir = os.path.join(REPO_DIR, 'input', '01 data')
+    workdir = os.path.abspath(os.path.join(bench_dir, f"{trips}-{seed}-{days}"))
+    work_data_dir = os.path.join(workdir, 'input', '01 data')
+    os.makedirs(work_data_dir, exist_ok=True)
+    for name in ('DRT정류장(통합).csv', '지역별 중심점.csv'):
+        if not os.path.exists(os.path.join(work_data_dir, name)):
+            os.symlink(os.path.join(data_dir, name), os.path.join(work_data_dir, name))
+    if not os.path.exists(os.path.join(workdir, 'input', '02 shp')):
+        os.symlink(os.path.join(REPO_DIR, 'input', '02 shp'), os.path.join(workdir, 'input', '02 shp'))
+
+    history_file = os.path.join(work_data_dir, 'DRT운행내역(통합).csv')
+    if regenerate or not os.path.exists(history_file):
+        write_history(history_file, trips, os.path.join(data_dir, 'DRT정류장(통합).csv'),
+                      os.path.join(data_dir, '지역별 중심점.csv'), seed, days=days)
+    shutil.rmtree(os.path.join(workdir, 'cache'), ignore_errors=True)   # 스냅샷 없이 부팅 (CSV 집계 시간 측정)
+    return workdir
+
+
+def _rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError):
+        return float('nan')
+
+
+def _peak_rss_mb():
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024   # Linux: KB
+
+
+def _latency_metrics(prefix, cold, warm, sizes):
+    return {
+        f"{prefix}.cold_p50_ms": float(np.percentile(cold, 50)) * 1000,
+        f"{prefix}.cold_p95_ms": float(np.percentile(cold, 95)) * 1000,
+        f"{prefix}.warm_p50_ms": float(np.percentile(warm, 50)) * 1000,
+        f"{prefix}.payload_mean_bytes": float(np.mean(sizes)),
+        f"{prefix}.payload_max_bytes": float(np.max(sizes)),
+    }
+
+
+# 작업 폴더에서 앱을 부팅하고 부팅 단계, 메모리, 집계, 콜백별 지연 시간과 응답 크기 측정 (별도 프로세스에서 실행)
+def measure(samples, seed):
+    import plotly.utils
+
+    import my_app
+    from ingest import read_history_frame, aggregate_history_tables
+    from snapshot import load_snapshot
+    from spatial import trip_distance_speed
+
+    metrics = {f"startup.{name.lower().replace(' ', '_').replace('/', '_')}_s": seconds
+               for name, seconds in my_app.startup_timer.phases}
+    metrics["startup.total_s"] = my_app.startup_timer.total
+    metrics["memory.rss_after_boot_mb"] = _rss_mb()
+
+    # 집계 단계별 (단일 프로세스 CSV 읽기, 집계, 스냅샷 로드)
+    started = time.perf_counter()
+    trips, _ = read_history_frame(my_app.history_file, my_app.service_area)
+    metrics["ingest.csv_read_s"] = time.perf_counter() - started
+    started = time.perf_counter()
+    aggregate_history_tables(trips)
+    metrics["ingest.aggregate_s"] = time.perf_counter() - started
+    metrics["ingest.trips_per_s"] = len(trips) / max(metrics["ingest.csv_read_s"] + metrics["ingest.aggregate_s"],
+                                                    1e-9)
+    # 집계 중 이동거리, 속도 계산 (이용 완료 건의 좌표, 이동시간 배열 단위)
+    done = trips[trips["operation_type"] == '이용완료']
+    started = time.perf_counter()
+    trip_distance_speed(done["o_lat"].values, done["o_lon"].values, done["d_lat"].values, done["d_lon"].values,
+                        done["travel_time"].values)
+    metrics["ingest.distance_s"] = time.perf_counter() - started
+    del trips, done
+    started = time.perf_counter()
+    load_snapshot(my_app.history_backend.fingerprint())
+    metrics["ingest.snapshot_load_s"] = time.perf_counter() - started
+
+    # 콜백별 지연 시간 (cold: 캐시를 비운 첫 호출, warm: 같은 입력 재호출 중 최솟값), 응답 크기 (Dash가 보내는 JSON)
+    caches = [value for value in vars(my_app).values() if callable(getattr(value, 'cache_clear', None))]
+    rng = np.random.default_rng(seed)
+    pairs = [(region, date) for region in my_app.aggregate_store.regions()
+             for date in my_app.aggregate_store.dates(region)]
+    pairs = [pairs[i] for i in rng.choice(len(pairs), min(samples, len(pairs)), replace=False)] if pairs else []
+
+    def run(fn, args):
+        for cache in caches:
+            cache.cache_clear()
+        started = time.perf_counter()
+        output = fn(*args)
+        cold = time.perf_counter() - started
+        warm = []
+        for _ in range(WARM_REPEAT):
+            started = time.perf_counter()
+            fn(*args)
+            warm.append(time.perf_counter() - started)
+        return cold, min(warm), len(json.dumps(output, cls=plotly.utils.PlotlyJSONEncoder))
+
+    # 지역, 기간 외 추가 입력 (상위 k개, 비교 기준)
+    extra_args = {"top_k": max(my_app.TOP_K_CHOICES), "baseline_kind": "day_type"}
+    for callback in my_app.app.callback_map.values():
+        if 'callback' not in callback:              # 클라이언트 콜백
+            continue
+        fn = inspect.unwrap(callback['callback'])   # 계측 래퍼, Dash 래퍼를 벗긴 콜백 함수
+        names = fn.__code__.co_varnames[:fn.__code__.co_argcount]
+        if 'period' not in names:
+            scenarios = {"region": [(region,) for region in my_app.aggregate_store.regions()]}
+        else:
+            # 입력 이름별 값 (지역을 받지 않는 콜백은 표본의 일자만 사용)
+            scenarios = {period: [tuple(dict(extra_args, selected_region=region, selected_date=date, period=period,
+                                             start_date=date, end_date=date)[name] for name in names)
+                                  for region, date in pairs]
+                         for period in ("day", "month")}
+        for scenario, calls in scenarios.items():
+            if calls:
+                cold, warm, sizes = zip(*(run(fn, args) for args in calls))
+                metrics.update(_latency_metrics(f"callback.{fn.__name__}.{scenario}", cold, warm, sizes))
+
+    metrics["memory.rss_after_callbacks_mb"] = _rss_mb()
+    metrics["memory.peak_rss_mb"] = _peak_rss_mb()
+    return {name: round(value, 6) for name, value in metrics.items()}
+
+
+def _threshold(name, thresholds):
+    return next(limit for pattern, limit in thresholds if fnmatch.fnmatch(name, pattern))
+
+
+def _noise_floor(name):
+    return next((floor for suffix, floor in NOISE_FLOORS.items() if name.endswith(suffix)), 0.0)
+
+
+# 기준 결과와 비교 (처리량 지표는 감소, 나머지는 증가가 허용 비율과 잡음 수준을 넘으면 회귀, 회귀 지표 목록 반환)
+def compare(result, baseline):
+    thresholds = [tuple(item) for item in baseline.get("thresholds", THRESHOLDS)]
+    regressions = []
+    print(f"{'metric':<60} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, old in baseline["metrics"].items():
+        new = result["metrics"].get(name)
+        if new is None or not old:
+            continue
+        change = new / old - 1
+        worse = -change if name.endswith("_per_s") else change
+        regressed = (worse > _threshold(name, thresholds)
+                     and abs(new - old) > _noise_floor(name))
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<60} {old:>12.3f} {new:>12.3f} {change * 100:>7.1f}%" + ("  REGRESSION" if regressed else ""))
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+# 벤치마크: python benchmark.py --trips 100000 --output cache/bench/result.json [--baseline 이전결과.json]
+def main():
+    parser = argparse.ArgumentParser(description="합성 운행내역으로 집계, 메모리, Dash 콜백 성능 측정")
+    parser.add_argument('--trips', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--days', type=int, default=365, help="합성 운행내역 일수")
+    parser.add_argument('--samples', type=int, default=20, help="콜백별로 측정할 지역/일자 수")
+    parser.add_argument('--regenerate', action='store_true', help="합성 운행내역을 다시 생성")
+    parser.add_argument('--output', default=os.path.join(bench_dir, 'result.json'))
+    parser.add_argument('--baseline', help="비교할 이전 결과 JSON (회귀가 있으면 종료 코드 1)")
+    parser.add_argument('--measure', action='store_true', help=argparse.SUPPRESS)   # 작업 폴더에서 측정하는 자식 프로세스
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.samples, args.seed)))
+        return
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    workdir = prepare_workdir(args.trips, args.seed, args.days, args.regenerate)
+    # 미리 계산 스레드가 측정 중인 콜백과 경쟁하지 않도록 끄고 측정 (콜백 자체의 비용)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_DIR, os.environ.get('PYTHONPATH')])),
+               DRT_LOG_LEVEL='WARNING', DRT_HISTORY_DATABASE='', DRT_PREFETCH='0')
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), '--measure', '--samples', str(args.samples),
+                                '--seed', str(args.seed)], cwd=workdir, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        sys.stderr.write(completed.stderr)
+        raise SystemExit(completed.returncode)
+
+    result = {
+        "format": RESULT_FORMAT,
+        "meta": {"trips": args.trips, "seed": args.seed, "days": args.days, "samples": args.samples,
+                 "commit": _git_commit(), "created": datetime.now().isoformat(timespec='seconds'),
+                 "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "thresholds": THRESHOLDS,
+        "metrics": json.loads(completed.stdout.strip().splitlines()[-1]),
+    }
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    logging.info(f"{len(result['metrics'])} metrics written to {args.output}.")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("trips") != args.trips:
+            logging.warning(f"Baseline was measured with {baseline.get('meta', {}).get('trips')} trips.")
+        regressions = compare(result, baseline)
+        print(f"{len(regressions)} regressions" + (f": {', '.join(regressions)}" if regressions else ""))
+        raise SystemExit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
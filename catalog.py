@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+# 정류장 사전 (정류장명, 정류장 좌표를 정수 ID로 변환, 한 번 부여한 ID는 바뀌지 않음)
+class StationCatalog:
+    def __init__(self, station_types=None):
+        self.station_types = dict(station_types or {})
+        self.names = []          # 이름 ID → 정류장명
+        self.name_ids = {}
+        self.stations = []       # 정류장 ID → (정류장명, 위도, 경도)
+        self.station_ids = {}
+        self.station_names = []  # 정류장 ID → 이름 ID
+
+    @property
+    def n_names(self):
+        return len(self.names)
+
+    def name_id(self, name):
+        name_id = self.name_ids.get(name)
+        if name_id is None:
+            name_id = self.name_ids[name] = len(self.names)
+            self.names.append(name)
+        return name_id
+
+    def station_id(self, name, lat, lon):
+        key = (name, float(lat), float(lon))
+        station_id = self.station_ids.get(key)
+        if station_id is None:
+            station_id = self.station_ids[key] = len(self.stations)
+            self.stations.append(key)
+            self.station_names.append(self.name_id(name))
+        return station_id
+
+    # 고유값만 한 번씩 변환한 뒤 코드로 펼침
+    def name_ids_of(self, names):
+        codes, uniques = pd.factorize(np.asarray(names, dtype=object))
+        ids = np.array([self.name_id(name) for name in uniques], dtype=np.int32)
+        return ids[codes] if len(ids) else np.empty(0, dtype=np.int32)
+
+    def station_ids_of(self, names, lats, lons):
+        if not len(names):
+            return np.empty(0, dtype=np.int32)
+        codes, uniques = pd.MultiIndex.from_arrays([np.asarray(names, dtype=object),
+                                                    np.asarray(lats, dtype=float),
+                                                    np.asarray(lons, dtype=float)]).factorize()
+        ids = np.array([self.station_id(*key) for key in uniques], dtype=np.int32)
+        return ids[codes] if len(ids) else np.empty(0, dtype=np.int32)
+
+    def station_name(self, station_id):
+        return self.stations[station_id][0]
+
+    def station_type(self, station_id):
+        return self.station_types.get(self.stations[station_id][0], '')
+
+
+# 기점/종점 이름 ID별 이용인원 (이동시간 건수, 합) → 희소 OD 행렬 (중복 쌍은 합산)
+def od_matrix(o_ids, d_ids, users, size, dtype=np.int32):
+    return sparse.csr_matrix((np.asarray(users, dtype=dtype),
+                              (np.asarray(o_ids, dtype=np.int32), np.asarray(d_ids, dtype=np.int32))),
+                             shape=(size, size))
+
+
+# OD 행렬의 0이 아닌 항목 (기점 ID, 종점 ID, 이용인원)
+def od_entries(matrix):
+    coo = matrix.tocoo()
+    return coo.row, coo.col, coo.data
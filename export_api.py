@@ -0,0 +1,169 @@
+import io
+import csv
+import json
+import math
+import zlib
+import hashlib
+from datetime import datetime
+
+import flask
+import numpy as np
+import pandas as pd
+
+EXPORT_PATH = '/api'            # 집계 내보내기 경로 (/api/days, /api/stations, /api/od)
+EXPORT_CHUNK_ROWS = 5000        # 한 번에 변환하여 내보낼 행 수 (기간이 길어도 메모리 사용량이 늘지 않도록)
+GZIP_LEVEL = 6
+FORMATS = {"ndjson": "application/x-ndjson; charset=utf-8", "csv": "text/csv; charset=utf-8"}
+
+
+# OD별 평균 이동시간 (분, 이동시간 기록이 없으면 NaN)
+def _travel_mean(rows):
+    counts = rows["travel_count"].to_numpy()
+    return np.where(counts > 0, rows["travel_sum"].to_numpy() / np.maximum(counts, 1), np.nan)
+
+
+# 내보내기별 필드 (일자 요약은 일자별 저장소, 정류장/OD는 집계 테이블 컬럼 또는 계산 함수)
+DAY_FIELDS = ("region", "date", "calls", "completed", "users", "adult", "teen", "children",
+              "wait_count", "wait_mean", "wait_std")
+TABLE_EXPORTS = {
+    "stations": ("stations", {"region": "region", "date": "date", "name": "name", "lat": "lat", "lon": "lon",
+                              "boarding": "승차", "alighting": "하차"}),
+    "od": ("od", {"region": "region", "date": "date", "origin": "o_name", "destination": "d_name",
+                  "users": "users", "travel_count": "travel_count", "travel_mean": _travel_mean}),
+}
+EXPORT_FIELDS = {"days": DAY_FIELDS, **{name: tuple(columns) for name, (_, columns) in TABLE_EXPORTS.items()}}
+
+
+# 행 목록을 EXPORT_CHUNK_ROWS개씩 묶음
+def _chunks(rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= EXPORT_CHUNK_ROWS:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# 일자 요약 (일자별 저장소에서 한 행씩)
+def day_chunks(store, regions, start_date, end_date):
+    rows = ((region, date, calls, completed, users, adult, teen, children, waits.count, waits.mean, waits.std)
+            for region, date, calls, completed, users, adult, teen, children, waits
+            in store.day_rows(regions, start_date, end_date))
+    return _chunks(rows)
+
+
+# 집계 테이블 행 (조건에 맞는 행 위치만 지역, 일자 순으로 정렬한 뒤 묶음 단위로 잘라 변환)
+def table_chunks(table, columns, regions, start_date, end_date):
+    mask = np.ones(len(table), dtype=bool)
+    if regions is not None:
+        mask &= table["region"].isin(regions).to_numpy()
+    if start_date:
+        mask &= (table["date"] >= start_date).to_numpy()
+    if end_date:
+        mask &= (table["date"] <= end_date).to_numpy()
+    positions = np.flatnonzero(mask)
+    region_codes = pd.factorize(table["region"].to_numpy()[positions], sort=True)[0]
+    date_codes = pd.factorize(table["date"].to_numpy()[positions], sort=True)[0]
+    positions = positions[np.lexsort([date_codes, region_codes])]
+
+    for start in range(0, len(positions), EXPORT_CHUNK_ROWS):
+        rows = table.iloc[positions[start:start + EXPORT_CHUNK_ROWS]]
+        values = [rows[column] if isinstance(column, str) else column(rows) for column in columns.values()]
+        yield list(zip(*[np.asarray(value).tolist() for value in values]))
+
+
+# 값 → JSON 값 (NaN, inf는 null)
+def _json_value(value):
+    return None if isinstance(value, float) and not math.isfinite(value) else value
+
+
+# 행 묶음 → CSV, NDJSON 바이트 (positions: 내보낼 필드 위치)
+def encode_rows(chunks, names, positions, fmt):
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow([names[i] for i in positions])
+        for chunk in chunks:
+            writer.writerows([["" if _json_value(row[i]) is None else row[i] for i in positions] for row in chunk])
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+        return
+    for chunk in chunks:
+        yield "".join(json.dumps({names[i]: _json_value(row[i]) for i in positions}, ensure_ascii=False) + "\n"
+                      for row in chunk).encode('utf-8')
+
+
+# gzip 스트림 압축 (묶음마다 압축된 만큼만 내보냄)
+def gzip_stream(blocks):
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    for block in blocks:
+        data = compressor.compress(block)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# 요청 인자 → (지역 목록 또는 None, 시작일, 종료일, 필드 위치, 형식), 잘못된 값이면 400
+def parse_export_args(args, names):
+    regions = [region for value in args.getlist('region') for region in value.split(',') if region] or None
+    dates = []
+    for key in ('start', 'end'):
+        value = args.get(key) or None
+        if value is not None:
+            try:
+                datetime.strptime(value, "%Y-%m-%d")
+            except ValueError:
+                flask.abort(400, description=f"{key} must be YYYY-MM-DD")
+        dates.append(value)
+    fields = [field for value in args.getlist('fields') for field in value.split(',') if field] or list(names)
+    unknown = [field for field in fields if field not in names]
+    if unknown:
+        flask.abort(400, description=f"unknown fields: {', '.join(unknown)} (available: {', '.join(names)})")
+    fmt = args.get('format', 'ndjson')
+    if fmt not in FORMATS:
+        flask.abort(400, description=f"format must be one of {', '.join(FORMATS)}")
+    return regions, dates[0], dates[1], [names.index(field) for field in fields], fmt
+
+
+# 읽기 전용 집계 내보내기 경로 (current_data() → (AggregateStore, 집계 테이블), 데이터 버전은 store.version)
+# GET /api/<days|stations|od>?region=청주_오송,청주_남이&start=2024-01-01&end=2024-01-31&fields=date,users&format=csv
+# 응답은 묶음 단위로 생성하며 ETag는 데이터 버전과 요청 조건으로 정해져 If-None-Match가 맞으면 304 (집계 없이)
+def register_export_routes(server, current_data):
+    @server.route(EXPORT_PATH)
+    def export_index():
+        return flask.jsonify({name: list(fields) for name, fields in EXPORT_FIELDS.items()})
+
+    @server.route(f'{EXPORT_PATH}/<name>')
+    def export(name):
+        names = EXPORT_FIELDS.get(name)
+        if names is None:
+            flask.abort(404)
+        regions, start_date, end_date, positions, fmt = parse_export_args(flask.request.args, names)
+        store, tables = current_data()
+        gzip = flask.request.accept_encodings['gzip'] > 0
+
+        key = json.dumps([store.version, name, regions, start_date, end_date, positions, fmt], ensure_ascii=False)
+        etag = hashlib.sha1(key.encode()).hexdigest() + ("-gzip" if gzip else "")
+        if flask.request.if_none_match.contains(etag):
+            response = flask.Response(status=304)
+        else:
+            if name == "days":
+                chunks = day_chunks(store, regions, start_date, end_date)
+            else:
+                table, columns = TABLE_EXPORTS[name]
+                chunks = table_chunks(tables[table], columns, regions, start_date, end_date)
+            body = encode_rows(chunks, names, positions, fmt)
+            response = flask.Response(gzip_stream(body) if gzip else body, content_type=FORMATS[fmt])
+            if gzip:
+                response.headers['Content-Encoding'] = 'gzip'
+            if fmt == "csv":
+                response.headers['Content-Disposition'] = f'inline; filename="{name}.csv"'
+        response.set_etag(etag)
+        response.vary.add('Accept-Encoding')
+        response.cache_control.no_cache = True   # 매번 ETag로 재확인
+        return response
@@ -0,0 +1,35 @@
+import os
+
+# gunicorn 설정 (Procfile의 gunicorn my_app:server 실행 시 현재 폴더의 이 파일을 자동으로 읽음)
+preload_app = True    # 마스터에서 한 번만 집계한 뒤 fork 된 워커들이 집계 배열을 copy-on-write로 공유
+                      # (운행내역 추가분은 워커마다 따로 반영하므로 반영 후에는 공유되지 않음, my_app.REFRESH_INTERVAL 참고)
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+
+
+# 프로세스 메모리 (MB): RSS 전체, PSS 공유 페이지를 나눠 계산한 몫, Private 이 프로세스만 쓰는 페이지
+def process_memory():
+    fields = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if value.strip().endswith('kB'):
+                    fields[name] = int(value.split()[0])
+    except OSError:
+        return "memory n/a"
+    private = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return f"RSS {fields.get('Rss', 0) / 1024:.1f}MB, PSS {fields.get('Pss', 0) / 1024:.1f}MB, " \
+           f"Private {private / 1024:.1f}MB"
+
+
+def when_ready(server):
+    server.log.info(f"Master {os.getpid()} ready: {process_memory()}")
+
+
+def post_worker_init(worker):
+    worker.log.info(f"Worker {os.getpid()} started: {process_memory()}")
+
+
+# 워커 종료 직전 (요청 처리 후 늘어난 전용 메모리 확인용)
+def worker_exit(server, worker):
+    server.log.info(f"Worker {os.getpid()} exiting: {process_memory()}")
@@ -0,0 +1,336 @@
+import io
+import os
+import csv
+import logging
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from stats import RunningStats, QuantileSketch
+from catalog import od_matrix
+from spatial import ZoneIndex, ZONE_LABELS, trip_distance_speed
+
+shp_input_dir = os.path.join('input', '02 shp')
+
+# 운행내역 CSV 컬럼 위치
+HISTORY_COLUMNS = {
+    "area": 0,
+    "adult": 7,
+    "teen": 8,
+    "children": 9,
+    "operation_type": 10,
+    "date": 11,
+    "call_type": 12,
+    "in_time": 15,
+    "waiting_time": 17,
+    "travel_time": 18,
+    "o_name": 19,
+    "d_name": 20,
+    "o_lat": 23,
+    "o_lon": 24,
+    "d_lat": 25,
+    "d_lon": 26,
+}
+
+HOURS = range(6, 22)
+WAIT_BUCKETS = [(f"{5 * i}분 미만" if i == 1 else f"{5 * (i - 1)}~{5 * i}분") for i in range(1, 13)] + ["60분 이상"]
+WAIT_EDGES = np.arange(5, 65, 5, dtype=float)   # 5, 10, ..., 60분 경계
+ZONE_METRICS = ("trips", "users", "wait_count", "wait_sum", "wait_sumsq")   # 기점 구역 × 종점 구역별 지표
+HOUR_METRICS = ("users", "wait_count", "wait_sum", "wait_sumsq", "travel_count", "travel_sum", "travel_sumsq",
+                "distance_count", "distance_sum", "distance_sumsq", "speed_count", "speed_sum", "speed_sumsq")
+HOUR_STATS = ("time_wait", "time_travel", "time_distance", "time_speed")   # HOUR_METRICS의 건수/합/제곱합 순서
+OD_METRICS = ("users", "travel_count", "travel_sum")    # 통행 OD별 지표
+OD_FIELDS = ("od", "od_travel_count", "od_travel_sum")  # OD_METRICS별 레코드 희소 행렬
+OD_DTYPES = (np.int32, np.int32, np.float64)
+
+
+# CSV 파일 로드 (헤더 제외 행 목록)
+def load_csv_data(file_path, encoding='cp949', has_header=True):
+    data = []
+    try:
+        with open(file_path, 'r', encoding=encoding) as f:
+            reader = csv.reader(f)
+            if has_header:
+                next(reader)  # 헤더 건너뛰기
+            data = list(reader)
+        logging.info(f"Data from {file_path} loaded successfully.")
+    except FileNotFoundError:
+        logging.error(f"{file_path} 파일을 찾을 수 없습니다.")
+    except Exception as e:
+        logging.exception(f"Error reading {file_path}: {e}")
+    return data
+
+
+# 지역 코드 → 지역명, 지역 중심점
+def load_area_data(file_path):
+    service_area = defaultdict(str)
+    area_center = defaultdict(list)
+    for row in load_csv_data(file_path):
+        service_area[row[0]] = row[1]
+        area_center[row[0]] = [row[3], row[2]]
+    return service_area, area_center
+
+
+# 정류장명 → 정류장 구분 (기존정류장/가상정류장)
+def load_station_types(file_path):
+    return {row[5]: row[12] for row in load_csv_data(file_path) if len(row) > 12}
+
+
+# 지역명 → 정류장 [(정류장명, 위도, 경도)] (정류장 CSV의 마지막 열 '가덕문의' → 지역명 '청주_가덕문의',
+# 좌표가 없거나 잘못된 정류장, 중복 정류장은 제외)
+def load_region_stations(file_path, service_area):
+    suffixes = {region.rsplit('_', 1)[-1]: region for region in set(service_area.values()) if region}
+    stations = {}
+    for row in load_csv_data(file_path):
+        region = suffixes.get(row[15].strip()) if len(row) > 15 else None
+        if region is None:
+            continue
+        try:
+            station = (row[5], float(row[8]), float(row[7]))
+        except ValueError:
+            continue
+        if np.isnan(station[1]) or np.isnan(station[2]):
+            continue
+        region_stations = stations.setdefault(region, [])
+        if station not in region_stations:
+            region_stations.append(station)
+    return stations
+
+
+# 지역/일자별 집계 구조 (정류장, 통행 OD는 정류장 사전의 정수 ID 기준)
+def new_day_record():
+    return {
+        "map_center": None,
+        "shapefiles": {"그린존": "", "레드존": ""},
+        "total_user": 0,
+        "avg_wait_time": RunningStats(),
+        "station_ids": np.empty(0, dtype=np.int32),
+        "boarding": np.empty(0, dtype=np.int32),
+        "alighting": np.empty(0, dtype=np.int32),
+        "od_pairs": np.empty((2, 0), dtype=np.int32),   # OD 쌍 (기점, 종점 이름 ID) 첫 등장 순서, 동률 순위 기준
+        "od": od_matrix([], [], [], 0),
+        "od_travel_count": od_matrix([], [], [], 0),
+        "od_travel_sum": od_matrix([], [], [], 0, np.float64),
+        "operation_type": defaultdict(int),
+        "user_type": {"성인": 0, "청소년": 0, "어린이": 0},
+        "call_type": defaultdict(int),
+        "time_wait": {hour: RunningStats() for hour in HOURS},
+        "time_wait_sketch": {hour: QuantileSketch() for hour in HOURS},
+        "time_users": {hour: 0 for hour in HOURS},
+        "wait_dist": {label: 0 for label in WAIT_BUCKETS},
+        "time_travel": {hour: RunningStats() for hour in HOURS},
+        "time_distance": {hour: RunningStats() for hour in HOURS},
+        "time_speed": {hour: RunningStats() for hour in HOURS},
+        "zone_flows": np.zeros((len(ZONE_LABELS), len(ZONE_LABELS), len(ZONE_METRICS))),
+    }
+
+
+# 지역별 그린존/레드존 shapefile 경로
+def zone_shapefiles(region):
+    return {"그린존": os.path.join(shp_input_dir, f"{region}_그린존만.shp"),
+            "레드존": os.path.join(shp_input_dir, f"{region}_레드존.shp")}
+
+
+# 구역 shapefile 목록 (구역별 집계가 달라지므로 스냅샷 키에 포함)
+def zone_files():
+    try:
+        return sorted(os.path.join(shp_input_dir, name) for name in os.listdir(shp_input_dir) if name.endswith('.shp'))
+    except FileNotFoundError:
+        return []
+
+
+# 운행 끝점 → 그린존/레드존 (프로세스별로 폴리곤을 한 번 로드하고 정류장 좌표별 결과 재사용)
+zone_index = ZoneIndex(zone_shapefiles)
+
+
+def init_day_record(record, region, center):
+    record["map_center"] = center
+    record["shapefiles"].update(zone_shapefiles(region))
+
+
+# 'HH:MM:SS' → 분 (행 단위 파싱)
+def clock_to_minutes(value):
+    return sum(int(x) * [1/60, 1, 60][i] for i, x in enumerate(reversed(value.split(':'))))
+
+
+# 고유값만 한 번씩 변환한 뒤 코드로 펼침 (시각, 인원수 등 반복되는 값이 많은 컬럼용)
+def map_unique(values, func, dtype=float):
+    codes, uniques = pd.factorize(values)
+    converted = np.array([func(value) for value in uniques], dtype=dtype)
+    return converted[codes] if len(converted) else np.empty(0, dtype=dtype)
+
+
+def _minutes_or_nan(value):
+    return clock_to_minutes(value) if value else np.nan
+
+
+# 'HH:MM:SS' → 시 (시각이 없으면 -1, 시간대 집계에서 빠짐)
+def _hour_or_missing(value):
+    return int(value.split(':')[0]) if value else -1
+
+
+def _to_float(values):
+    return values.where(values != '').astype(float).to_numpy()
+
+
+# 운행내역 원본 컬럼 → 타입이 지정된 컬럼형 테이블
+def parse_history_frame(raw, service_area):
+    trips = pd.DataFrame({
+        "region": raw["area"].map(service_area).fillna(''),
+        "area": raw["area"],
+        "date": raw["date"],
+        "operation_type": raw["operation_type"],
+        "call_type": map_unique(raw["call_type"], lambda value: value.split("(")[0], dtype=object),
+        "adult": map_unique(raw["adult"], int, dtype=np.int64),
+        "teen": map_unique(raw["teen"], int, dtype=np.int64),
+        "children": map_unique(raw["children"], int, dtype=np.int64),
+        "hour": map_unique(raw["in_time"], _hour_or_missing, dtype=np.int64),
+        "waiting_time": map_unique(raw["waiting_time"], _minutes_or_nan),
+        "travel_time": map_unique(raw["travel_time"], _minutes_or_nan),
+        "o_name": raw["o_name"],
+        "d_name": raw["d_name"],
+        "o_lat": _to_float(raw["o_lat"]),
+        "o_lon": _to_float(raw["o_lon"]),
+        "d_lat": _to_float(raw["d_lat"]),
+        "d_lon": _to_float(raw["d_lon"]),
+    })
+    trips["users"] = trips["adult"] + trips["teen"] + trips["children"]
+    return trips
+
+
+# 운행내역 CSV의 offset 이후 완결된 행(마지막 줄바꿈까지)만 읽음 (읽은 바이트, 다음 시작 위치)
+def read_history_bytes(file_path, offset=0):
+    with open(file_path, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b'\n') + 1
+    return data[:end], offset + end
+
+
+# 운행내역 CSV 바이트 → 필요한 컬럼만 담은 원본 테이블
+def read_history_raw(data, encoding, has_header):
+    columns = sorted(HISTORY_COLUMNS.items(), key=lambda item: item[1])
+    if not data.strip():
+        return pd.DataFrame({name: pd.Series(dtype=str) for name, _ in columns})
+    raw = pd.read_csv(io.BytesIO(data), encoding=encoding, header=0 if has_header else None,
+                      usecols=[i for _, i in columns], dtype=str, keep_default_na=False)
+    raw.columns = [name for name, _ in columns]
+    return raw
+
+
+# 운행내역 CSV를 필요한 컬럼만 컬럼형으로 로드 (offset 이후 추가된 행만 읽을 수 있음, 테이블과 다음 시작 위치 반환)
+def read_history_frame(file_path, service_area, offset=0, encoding='cp949'):
+    try:
+        data, end = read_history_bytes(file_path, offset)
+        logging.info(f"Data from {file_path} loaded successfully ({offset} → {end} bytes).")
+    except FileNotFoundError:
+        logging.error(f"{file_path} 파일을 찾을 수 없습니다.")
+        data, end = b'', offset
+    return parse_history_frame(read_history_raw(data, encoding, has_header=offset == 0), service_area), end
+
+
+def load_history_frame(file_path, service_area, encoding='cp949'):
+    return read_history_frame(file_path, service_area, encoding=encoding)[0]
+
+
+# 건수/합/제곱합 집계 항목 (컬럼명 접두어별)
+def _stats_aggregations(prefix, column):
+    return {f"{prefix}_count": (column, "count"), f"{prefix}_sum": (column, "sum"),
+            f"{prefix}_sumsq": (f"{column}_sq", "sum")}
+
+
+# 컬럼형 테이블을 그룹 단위로 집계 (지역/일자 첫 등장 순서 유지)
+def aggregate_history_tables(trips):
+    keys = ["region", "date"]
+    tables = {"days": trips.drop_duplicates(keys)[keys + ["area"]].reset_index(drop=True)}
+
+    # 배차 분류, 호출 방법 건수
+    tables["categories"] = pd.concat([
+        trips.groupby(keys + [column], sort=False).size().reset_index(name="count")
+             .rename(columns={column: "label"}).assign(dimension=column)
+        for column in ["operation_type", "call_type"]
+    ], ignore_index=True)
+
+    # 이용 완료 건에 대한 집계 (대기시간, 이동시간, 이동거리, 속도는 건수/합/제곱합으로 요약)
+    done = trips[trips["operation_type"] == '이용완료']
+    done = done.assign(waiting_time_sq=done["waiting_time"] ** 2, travel_time_sq=done["travel_time"] ** 2)
+    tables["day_users"] = done.groupby(keys, sort=False).agg(
+        users=("users", "sum"), adult=("adult", "sum"), teen=("teen", "sum"), children=("children", "sum"),
+        **_stats_aggregations("wait", "waiting_time")).reset_index()
+
+    in_hours = done[done["hour"].isin(HOURS)]
+    groups = in_hours.groupby(keys + ["hour"], sort=False)
+    hourly = groups.agg(users=("users", "sum"), **_stats_aggregations("wait", "waiting_time"),
+                        **_stats_aggregations("travel", "travel_time")).reset_index()
+
+    # 시간대별 이동거리, 속도 (운행별 값을 테이블 컬럼으로 붙여 복사하지 않고 그룹 번호별로 바로 합산)
+    codes = groups.ngroup().to_numpy()
+    distance, speed = trip_distance_speed(in_hours["o_lat"].values, in_hours["o_lon"].values, in_hours["d_lat"].values,
+                                          in_hours["d_lon"].values, in_hours["travel_time"].values)
+    for prefix, values in (("distance", distance), ("speed", speed)):
+        known = ~np.isnan(values) & (codes >= 0)
+        hourly[f"{prefix}_count"] = np.bincount(codes[known], minlength=len(hourly))
+        hourly[f"{prefix}_sum"] = np.bincount(codes[known], values[known], minlength=len(hourly))
+        hourly[f"{prefix}_sumsq"] = np.bincount(codes[known], values[known] ** 2, minlength=len(hourly))
+    tables["hourly"] = hourly
+
+    # 대기시간 분포, 시간대별 분위수 스케치 구간별 건수
+    waited = done[done["waiting_time"].notna()]
+    tables["wait_dist"] = (waited.assign(bucket=np.searchsorted(WAIT_EDGES, waited["waiting_time"].values, side='right'))
+                           .groupby(keys + ["bucket"], sort=False).size().reset_index(name="count"))
+    waited = waited[waited["hour"].isin(HOURS)]
+    tables["wait_sketch"] = (waited.assign(key=QuantileSketch.keys_of(waited["waiting_time"].values))
+                             .groupby(keys + ["hour", "key"], sort=False).size().reset_index(name="count"))
+
+    # 정류장 승하차 (기점, 종점 순서를 행 순서대로 교차 배치)
+    order = np.arange(len(done))
+    ends = pd.concat([
+        pd.DataFrame({"region": done["region"].values, "date": done["date"].values,
+                      "name": done["o_name"].values, "lat": done["o_lat"].values, "lon": done["o_lon"].values,
+                      "승차": done["users"].values, "하차": 0, "order": 2 * order}),
+        pd.DataFrame({"region": done["region"].values, "date": done["date"].values,
+                      "name": done["d_name"].values, "lat": done["d_lat"].values, "lon": done["d_lon"].values,
+                      "승차": 0, "하차": done["users"].values, "order": 2 * order + 1}),
+    ]).sort_values("order", kind="stable")
+    tables["stations"] = ends.groupby(keys + ["name", "lat", "lon"], sort=False)[["승차", "하차"]].sum().reset_index()
+
+    # 통행 OD (이용인원, 이동시간 건수, 합)
+    tables["od"] = done.groupby(keys + ["o_name", "d_name"], sort=False).agg(
+        users=("users", "sum"), travel_count=("travel_time", "count"), travel_sum=("travel_time", "sum")).reset_index()
+
+    # 기점 구역 × 종점 구역별 운행 건수, 이용인원, 대기시간 (끝점을 그린존/레드존 폴리곤과 공간 결합)
+    zones = done.assign(o_zone=zone_index.codes_of(done["region"].values, done["o_lat"].values, done["o_lon"].values),
+                        d_zone=zone_index.codes_of(done["region"].values, done["d_lat"].values, done["d_lon"].values))
+    tables["zones"] = zones.groupby(keys + ["o_zone", "d_zone"], sort=False).agg(
+        trips=("users", "size"), users=("users", "sum"), **_stats_aggregations("wait", "waiting_time")).reset_index()
+    return tables
+
+
+# 집계 테이블별 그룹 키, 합산 컬럼
+TABLE_KEYS = {
+    "categories": (["region", "date", "dimension", "label"], ["count"]),
+    "day_users": (["region", "date"], ["users", "adult", "teen", "children", "wait_count", "wait_sum", "wait_sumsq"]),
+    "hourly": (["region", "date", "hour"], list(HOUR_METRICS)),
+    "wait_dist": (["region", "date", "bucket"], ["count"]),
+    "wait_sketch": (["region", "date", "hour", "key"], ["count"]),
+    "stations": (["region", "date", "name", "lat", "lon"], ["승차", "하차"]),
+    "od": (["region", "date", "o_name", "d_name"], list(OD_METRICS)),
+    "zones": (["region", "date", "o_zone", "d_zone"], list(ZONE_METRICS)),
+}
+
+
+# 두 집계 테이블 합치기 (같은 키는 합산, 키 첫 등장 순서 유지 → 나눠 집계해도 한 번에 집계한 결과와 같음)
+def merge_tables(tables, new_tables):
+    merged = {"days": pd.concat([tables["days"], new_tables["days"]], ignore_index=True)
+                        .drop_duplicates(["region", "date"]).reset_index(drop=True)}
+    for name, (keys, values) in TABLE_KEYS.items():
+        merged[name] = (pd.concat([tables[name], new_tables[name]], ignore_index=True)
+                        .groupby(keys, sort=False)[values].sum().reset_index())
+
+    # 배차 분류, 호출 방법은 분류별로 모아 둠 (한 번에 집계한 테이블과 같은 순서)
+    categories = merged["categories"]
+    merged["categories"] = pd.concat([categories[categories["dimension"] == dimension]
+                                      for dimension in categories["dimension"].unique()] or [categories],
+                                     ignore_index=True)
+    return merged
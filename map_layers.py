@@ -0,0 +1,152 @@
+import os
+from urllib.parse import quote
+
+import flask
+
+MAP_VIEW_PATH = '/map/view'         # 지도 틀 (Leaflet, 배경지도, 범례만 있는 정적 페이지, 한 번만 로드)
+MAP_ZONE_PATH = '/map/zones'        # 지역별 그린존/레드존 GeoJSON
+SHELL_MAX_AGE = 3600                # 지도 틀 브라우저 캐시 시간 (초)
+ZONE_MAX_AGE = 24 * 3600            # 구역 GeoJSON 브라우저 캐시 시간 (초, 이후 ETag로 재확인)
+COORD_PRECISION = 6                 # 정류장 경위도 소수점 자리수 (약 0.1m)
+ZONE_COLORS = {"레드존": "red", "그린존": "green"}
+
+# 지도 틀: folium 지도와 같은 Leaflet 버전, 배경지도, 범례 구성 (구역은 정류장 아래 별도 pane에 그려 정류장 클릭을 가리지 않음)
+MAP_SHELL = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0, maximum-scale=1.0, user-scalable=no">
+<link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/leaflet@1.9.3/dist/leaflet.css">
+<script src="https://cdn.jsdelivr.net/npm/leaflet@1.9.3/dist/leaflet.js"></script>
+<style>html, body, #map {width: 100%; height: 100%; margin: 0; padding: 0;}</style>
+</head>
+<body>
+<div id="map"></div>
+<script>
+var map = L.map("map", {crs: L.CRS.EPSG3857, zoomControl: true, preferCanvas: false});
+map.createPane("zones").style.zIndex = 350;
+var base = L.tileLayer("https://{s}.basemaps.cartocdn.com/light_all/{z}/{x}/{y}{r}.png", {
+    attribution: "&copy; <a href=\\"https://www.openstreetmap.org/copyright\\">OpenStreetMap</a> contributors " +
+                 "&copy; <a href=\\"https://carto.com/attributions\\">CARTO</a>",
+    subdomains: "abcd", maxNativeZoom: 20, maxZoom: 20, minZoom: 0
+}).addTo(map);
+var groups = {};
+["레드존", "그린존", "기존정류장", "가상정류장"].forEach(function (name) {
+    groups[name] = L.featureGroup().addTo(map);
+});
+L.control.layers({"cartodbpositron": base}, groups, {collapsed: false, position: "topright"}).addTo(map);
+
+var zones = {};         // URL → GeoJSON 요청 (지역을 다시 선택해도 다시 받지 않음)
+var current = null;
+var center = null;
+
+function zone(url) {
+    if (!zones[url]) {
+        zones[url] = fetch(url).then(function (response) {
+            if (!response.ok) { throw new Error(url + " " + response.status); }
+            return response.json();
+        });
+    }
+    return zones[url];
+}
+
+function popup(station) {
+    var content = document.createElement("div");
+    var name = document.createElement("b");
+    name.textContent = station[5];
+    content.append(name, document.createElement("br"),
+                   "승차 : " + station[2] + "명, 하차 : " + station[3] + "명");
+    return content;
+}
+
+// 정류장 레이어 적용: {center, zones: [{name, url, color}], stations: [[위도, 경도, 승차, 하차, 가상정류장 여부, 정류장명]]}
+function applyLayer(layer) {
+    current = layer;
+    if (!center || center[0] !== layer.center[0] || center[1] !== layer.center[1]) {
+        map.setView(layer.center, 12);
+        center = layer.center;
+    }
+    Object.keys(groups).forEach(function (name) { groups[name].clearLayers(); });
+    layer.zones.forEach(function (item) {
+        zone(item.url).then(function (geojson) {
+            if (current !== layer) { return; }
+            L.geoJson(geojson, {pane: "zones", style: function () {
+                return {fillColor: item.color, color: item.color, weight: 1, fillOpacity: 0.1};
+            }}).addTo(groups[item.name]);
+        }).catch(function (error) { console.error(error); });
+    });
+    layer.stations.forEach(function (station) {
+        var color = station[4] ? "red" : "blue";
+        L.circle([station[0], station[1]], {radius: (station[2] + station[3]) * 10, color: color, fill: true,
+                                            fillColor: color, fillOpacity: 0.2, weight: 3})
+            .bindPopup(popup(station), {maxWidth: 300})
+            .addTo(groups[station[4] ? "가상정류장" : "기존정류장"]);
+    });
+}
+
+window.drtApplyLayer = applyLayer;
+if (window.parent && window.parent.drtMapLayer) {
+    applyLayer(window.parent.drtMapLayer);
+}
+</script>
+</body>
+</html>
+"""
+
+# 대시보드 쪽 클라이언트 콜백: 받은 정류장 레이어를 지도 틀에 전달 (틀이 아직 로드 중이면 틀이 로드 후 가져감)
+APPLY_LAYER_JS = """
+function (layer) {
+    if (!layer) {
+        return window.dash_clientside.no_update;
+    }
+    window.drtMapLayer = layer;
+    var frame = document.getElementById("map");
+    if (frame && frame.contentWindow && frame.contentWindow.drtApplyLayer) {
+        frame.contentWindow.drtApplyLayer(layer);
+    }
+    return window.dash_clientside.no_update;
+}
+"""
+
+
+def zone_url(region, name):
+    return f"{MAP_ZONE_PATH}/{quote(region)}/{quote(name)}"
+
+
+# 지역/기간 정류장 레이어 (구역은 URL만 담고 정류장은 좌표, 승하차 인원, 구분, 이름만 담은 작은 JSON)
+def station_layer(region, region_info, catalog):
+    stations = []
+    for station_id, ride, alight in zip(region_info.station_ids, region_info.boarding, region_info.alighting):
+        name, lat, lon = catalog.stations[station_id]
+        stations.append([round(float(lat), COORD_PRECISION), round(float(lon), COORD_PRECISION), int(ride),
+                         int(alight), int(catalog.station_type(station_id) == '가상정류장'), name])
+    return {
+        "center": [float(value) for value in region_info.map_center],
+        "zones": [{"name": name, "url": zone_url(region, name), "color": ZONE_COLORS.get(name, "green")}
+                  for name, path in region_info.shapefiles.items() if path],
+        "stations": stations,
+    }
+
+
+# 지도 틀, 구역 GeoJSON 경로 (zone_paths(지역) → {구역명: shapefile 경로}, 모르는 지역이면 None)
+def register_map_routes(server, zone_paths):
+    @server.route(MAP_VIEW_PATH)
+    def map_view():
+        response = flask.Response(MAP_SHELL, mimetype='text/html')
+        response.cache_control.public = True
+        response.cache_control.max_age = SHELL_MAX_AGE
+        return response
+
+    @server.route(f'{MAP_ZONE_PATH}/<region>/<name>')
+    def map_zone(region, name):
+        from zones import zone_payload  # geopandas 포함, 첫 구역 요청 시 로드
+
+        path = (zone_paths(region) or {}).get(name)
+        if not path or not os.path.exists(path):
+            flask.abort(404)
+        body, etag = zone_payload(path)
+        response = flask.Response(body, mimetype='application/geo+json')
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = ZONE_MAX_AGE
+        return response.make_conditional(flask.request)
@@ -0,0 +1,295 @@
+import os
+import sys
+import time
+import bisect
+import functools
+import logging
+import threading
+from collections import Counter as StackCounter, defaultdict
+
+import flask
+from dash.exceptions import PreventUpdate
+
+# 지연 시간 (초), 응답 크기 (바이트) 히스토그램 구간
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+PROFILE_HEADER = 'X-Profile'    # 요청 헤더에 이 값이 있으면 해당 요청을 샘플링 프로파일링 (프로파일러를 켠 경우)
+PROFILE_INTERVAL = 0.005        # 샘플링 간격 (초)
+profile_dir = os.path.join('cache', 'profiles')
+
+
+def _label_text(names, values):
+    if not names:
+        return ""
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+# 라벨별 누적 값
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1.0):
+        with self._lock:
+            self._values[labels] += amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0.0)
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield self.name + _label_text(self.label_names, labels), value
+
+
+# 라벨별 구간 건수, 합, 건수 (Prometheus 히스토그램: 구간 건수는 누적으로 내보냄)
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, documentation, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                counts = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            counts[0][index] += 1
+            counts[1] += value
+            counts[2] += 1
+
+    def samples(self):
+        with self._lock:
+            values = [(labels, (list(buckets), total, count)) for labels, (buckets, total, count) in self._values.items()]
+        names = self.label_names + ("le",)
+        for labels, (buckets, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), buckets):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float('inf') else f"{bound:g}"
+                yield self.name + "_bucket" + _label_text(names, labels + (le,)), cumulative
+            yield self.name + "_sum" + _label_text(self.label_names, labels), total
+            yield self.name + "_count" + _label_text(self.label_names, labels), count
+
+
+# 조회 시점에 값을 계산하는 지표 (캐시 적중 수처럼 다른 곳에서 이미 세고 있는 값)
+class CollectedMetric:
+    def __init__(self, name, documentation, label_names, collect, kind="gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.collect = collect
+        self.kind = kind
+
+    def samples(self):
+        for labels, value in self.collect():
+            yield self.name + _label_text(self.label_names, labels), value
+
+
+# 프로세스별 지표 모음 (gunicorn 워커마다 따로 집계되므로 워커별로 수집)
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    # Prometheus 텍스트 형식
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines += [f"{sample} {value!r}" for sample, value in metric.samples()]
+        return "\n".join(lines) + "\n"
+
+
+# 샘플링 프로파일러: 대상 스레드의 호출 스택을 주기적으로 읽어 스택별 샘플 수 집계 (folded 형식으로 저장)
+class SamplingProfiler:
+    def __init__(self, thread_id, interval=PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = StackCounter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def save(self, file_path):
+        os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+        return file_path
+
+
+# 콜백 응답 크기 (바이트, Dash가 돌려주는 JSON 문자열만 측정, 다시 직렬화하지 않음)
+def _payload_bytes(response):
+    return len(response.encode('utf-8')) if isinstance(response, str) else None
+
+
+# Dash 콜백 계측: 콜백별 지연 시간, 응답 크기 (Dash가 보내는 JSON), 오류, PreventUpdate 건수
+# 백그라운드 콜백은 요청 처리 시간 (작업 시작, 결과 확인)을 따로 재고, 지연 시간에는 작업 프로세스에서 잰 실행 시간을 씀
+def instrument_callbacks(app, registry):
+    latency = registry.add(Histogram("drt_callback_duration_seconds", "Dash callback latency.", ["callback"]))
+    dispatch = registry.add(Histogram("drt_callback_dispatch_seconds",
+                                      "Background callback request time (job dispatch and result polls).",
+                                      ["callback"]))
+    size = registry.add(Histogram("drt_callback_response_bytes", "Dash callback JSON response size.", ["callback"],
+                                  SIZE_BUCKETS))
+    errors = registry.add(Counter("drt_callback_errors_total", "Dash callbacks that raised an error.", ["callback"]))
+    prevented = registry.add(Counter("drt_callback_prevented_total", "Dash callbacks that raised PreventUpdate.",
+                                     ["callback"]))
+
+    def timed(func, name, timer):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                response = func(*args, **kwargs)
+            except PreventUpdate:
+                prevented.inc(name)
+                raise
+            except Exception:
+                errors.inc(name)
+                raise
+            finally:
+                timer.observe(time.perf_counter() - started, name)
+            payload = _payload_bytes(response)
+            if payload is not None:
+                size.observe(payload, name)
+            return response
+        return wrapper
+
+    # Dash는 요청마다 callback_map에서 콜백을 찾으므로 등록된 함수를 감싸 두면 됨 (클라이언트 콜백은 서버 함수가 없음)
+    for callback in app.callback_map.values():
+        func = callback.get("callback")
+        if func is None:
+            continue
+        name = getattr(func, "__name__", "callback")
+        callback["callback"] = timed(func, name, dispatch if callback.get("long") else latency)
+
+    manager = getattr(app, "_background_manager", None)
+    if manager is not None and hasattr(manager, "on_job_done"):
+        manager.on_job_done = lambda name, seconds: latency.observe(seconds, name)
+
+
+# Flask 요청 계측: 경로별 지연 시간, 응답 크기, 상태 코드별 건수, 처리 중 오류
+def instrument_server(server, registry):
+    latency = registry.add(Histogram("drt_http_request_duration_seconds", "HTTP request latency.",
+                                     ["endpoint", "method"]))
+    size = registry.add(Histogram("drt_http_response_bytes", "HTTP response body size.", ["endpoint"], SIZE_BUCKETS))
+    requests = registry.add(Counter("drt_http_requests_total", "HTTP requests by status code.",
+                                    ["endpoint", "method", "status"]))
+    errors = registry.add(Counter("drt_http_errors_total", "HTTP requests that raised an error.", ["endpoint"]))
+
+    def endpoint():
+        rule = flask.request.url_rule
+        return rule.rule if rule is not None else "unmatched"   # 경로 패턴 단위 (라벨 수가 늘지 않도록)
+
+    @server.before_request
+    def start_timer():
+        flask.g.metrics_started = time.perf_counter()
+
+    @server.after_request
+    def record_request(response):
+        started = flask.g.pop("metrics_started", None)
+        if started is not None:
+            path = endpoint()
+            latency.observe(time.perf_counter() - started, path, flask.request.method)
+            requests.inc(path, flask.request.method, str(response.status_code))
+            # 스트리밍 응답은 길이를 구하면 본문 전체를 메모리에 모으므로 크기를 기록하지 않음
+            length = None if response.is_streamed else response.calculate_content_length()
+            if length is not None:
+                size.observe(length, path)
+        return response
+
+    @server.teardown_request
+    def record_error(exception):
+        if exception is not None:
+            errors.inc(endpoint())
+
+
+# lru_cache 함수별 적중, 실패 건수, 보관 개수, 적중률
+def register_caches(registry, caches):
+    def info(field):
+        return lambda: [((name,), getattr(cache.cache_info(), field)) for name, cache in caches.items()]
+
+    def hit_ratio():
+        for name, cache in caches.items():
+            stats = cache.cache_info()
+            yield (name,), stats.hits / (stats.hits + stats.misses) if stats.hits + stats.misses else 0.0
+
+    registry.add(CollectedMetric("drt_cache_hits_total", "Cache hits.", ["cache"], info("hits"), "counter"))
+    registry.add(CollectedMetric("drt_cache_misses_total", "Cache misses.", ["cache"], info("misses"), "counter"))
+    registry.add(CollectedMetric("drt_cache_entries", "Cached entries.", ["cache"], info("currsize")))
+    registry.add(CollectedMetric("drt_cache_hit_ratio", "Cache hit ratio since start.", ["cache"], hit_ratio))
+
+
+# 요청별 샘플링 프로파일러 (X-Profile 헤더가 있는 요청만, 결과는 cache/profiles에 folded 형식으로 저장)
+def install_profiler(server):
+    @server.before_request
+    def start_profiler():
+        if flask.request.headers.get(PROFILE_HEADER):
+            flask.g.profiler = SamplingProfiler(threading.get_ident()).start()
+
+    @server.after_request
+    def stop_profiler(response):
+        profiler = flask.g.pop("profiler", None)
+        if profiler is not None:
+            stacks = profiler.stop()
+            name = f"{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 10 ** 9:09d}-{os.getpid()}.folded"
+            path = profiler.save(os.path.join(profile_dir, name))
+            response.headers["X-Profile-Samples"] = str(sum(stacks.values()))
+            response.headers["X-Profile-File"] = path
+            logging.info(f"Profiled {flask.request.path}: {sum(stacks.values())} samples in {path}")
+        return response
+
+
+# 계측 설치: 콜백, 요청, 캐시 지표와 /metrics 경로 (켜지 않으면 아무것도 감싸지 않으므로 비용 없음)
+def install_metrics(app, caches=None, profiling=False):
+    registry = MetricsRegistry()
+    instrument_callbacks(app, registry)
+    instrument_server(app.server, registry)
+    register_caches(registry, caches or {})
+    if profiling:
+        install_profiler(app.server)
+
+    @app.server.route('/metrics')
+    def metrics():
+        return flask.Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+    return registry
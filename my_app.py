@@ -1,23 +1,43 @@
+import time
+boot_started = time.perf_counter()   # 부팅 보고서 기준 시각 (모듈 import 시간 포함)
 import os
-import csv
-import folium
-import geopandas as gpd
 import dash
 from dash import dcc, html
 from dash.dependencies import Input, Output
-from collections import defaultdict
+from dash.exceptions import PreventUpdate
 import plotly.graph_objects as go
-from folium import FeatureGroup
 from datetime import datetime, timedelta
+import gc
+import hmac
 import logging
 import functools
-import holidays
-
-# 로깅 설정
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
-
-# 날짜 설정
-day_now = (datetime.today() - timedelta(7)).strftime("%Y-%m-%d")
+import threading
+from flask import jsonify, request, abort
+from ingest import load_station_types, load_area_data, merge_tables, zone_shapefiles
+from storage import open_backend
+from store import AggregateStore, region_centers_of
+from range_index import RangeIndex
+from catalog import StationCatalog
+from startup import StartupTimer
+from metrics import install_metrics
+from background import background_callback_manager, neighbour_periods, Prefetcher
+from map_layers import MAP_VIEW_PATH, APPLY_LAYER_JS, station_layer, register_map_routes
+from export_api import register_export_routes
+from view_model import build_day_view, build_region_overview, TOP_K_CHOICES
+from baselines import Baselines, BASELINE_CHOICES, summarize
+from road_network import load_road_times
+
+# 부팅 단계별 소요 시간 (부팅이 끝나면 로그로 남기고 /healthz 에서 조회, python startup.py 로 측정)
+startup_timer = StartupTimer(boot_started)
+startup_timer.mark("imports")
+
+# 로깅 설정 (DEBUG로 두면 라이브러리 로그가 많아 부팅이 느려지므로 기본은 INFO, DRT_LOG_LEVEL로 변경)
+logging.basicConfig(level=os.environ.get('DRT_LOG_LEVEL', 'INFO').upper(),
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+# 날짜 설정 (기본 조회 일자, 오래 실행되는 워커에서도 바뀌도록 페이지를 열 때마다 계산)
+def default_date():
+    return (datetime.today() - timedelta(7)).strftime("%Y-%m-%d")
 
 # 데이터 경로 설정
 data_input_dir = os.path.join('input', '01 data')
@@ -32,400 +52,554 @@ logging.info(f"Station file path: {station_file}")
 logging.info(f"History file path: {history_file}")
 logging.info(f"Area file path: {area_file}")
 
-# 휴일 정보
-kr_holidays = holidays.KR()
-
-# 정류장 타입 구분 로드
-def load_csv_data(file_path, encoding='cp949', has_header=True):
-    data = []
-    try:
-        with open(file_path, 'r', encoding=encoding) as f:
-            reader = csv.reader(f)
-            if has_header:
-                next(reader)  # 헤더 건너뛰기
-            data = list(reader)
-        logging.info(f"Data from {file_path} loaded successfully.")
-    except FileNotFoundError:
-        logging.error(f"{file_path} 파일을 찾을 수 없습니다.")
-    except Exception as e:
-        logging.exception(f"Error reading {file_path}: {e}")
-    return data
-
-station_data = load_csv_data(station_file)
-area_data = load_csv_data(area_file)
-history_data = load_csv_data(history_file)
-
-# 데이터 로드
-station_type = defaultdict(str)
-for row in station_data:
-    station_type[row[5]] = row[12]
-
-service_area = defaultdict(str)
-area_center = defaultdict(list)
-for row in area_data:
-    service_area[row[0]] = row[1]
-    area_center[row[0]] = [row[3], row[2]]
-
-# CSV 파일을 읽어 지역별 집계
-region_data = defaultdict(lambda: defaultdict(lambda: {
-    "map_center": None,
-    "shapefiles": {"그린존": "", "레드존": ""},
-    "total_user": 0,
-    "avg_wait_time": [],
-    "stations": defaultdict(lambda: {"승차": 0, "하차": 0}),
-    "od": defaultdict(int),
-    "operation_type": defaultdict(int),
-    "user_type": {"성인": 0, "청소년": 0, "어린이": 0},
-    "call_type": defaultdict(int),
-    "time_wait": {hour: [] for hour in range(6, 22)},
-    "time_users": {hour: 0 for hour in range(6, 22)},
-    "wait_dist": {**{(f"{5 * i}분 미만" if i == 1 else f"{5 * (i - 1)}~{5 * i}분"): [] for i in range(1, 13)},
-                  "60분 이상": []},   # ** 딕셔너리 언패킹 : 두 개의 딕셔너리를 합쳐 새로운 딕셔너리 생성
-    "time_travel": {hour: [] for hour in range(6, 22)},
-}))
-
-for row in history_data:
-    area = row[0]
-    total_ride = int(row[6])
-    adult_num = int(row[7])
-    teen_num = int(row[8])
-    children_num = int(row[9])
-    total_num = int(row[7]) + int(row[8]) + int(row[9])
-    date = row[11]
-    operation_type = row[10]
-    call_type = row[12].split("(")[0]
-    in_time = int(row[15].split(':')[0]) if row[15] else None
-    waiting_time = sum(int(x) * [1/60, 1, 60][i] for i, x in enumerate(reversed(row[17].split(':')))) if row[17] else None
-    travel_time = sum(int(x) * [1/60, 1, 60][i] for i, x in enumerate(reversed(row[18].split(':')))) if row[18] else None
-    o_lat = float(row[23])
-    o_lon = float(row[24])
-    d_lat = float(row[25])
-    d_lon = float(row[26])
-    o_station = row[19], o_lat, o_lon
-    d_station = row[20], d_lat, d_lon
-    o_d = row[19] + "-" + row[20]
-
-    # 필요 시 초기화
-    if not region_data[service_area[area]][date]["map_center"]:
-        region_data[service_area[area]][date]["map_center"] = area_center[area]
-        region_data[service_area[area]][date]["shapefiles"]["그린존"] = os.path.join(shp_input_dir, f"{service_area[area]}_그린존만.shp")
-        region_data[service_area[area]][date]["shapefiles"]["레드존"] = os.path.join(shp_input_dir, f"{service_area[area]}_레드존.shp")
-
-    # 배차 분류 집계
-    region_data[service_area[area]][date]["operation_type"][operation_type] += 1
-
-    # 호출 방법 집계
-    region_data[service_area[area]][date]["call_type"][call_type] += 1
-
-    # 이용 완료 건에 대한 집계
-    if operation_type == '이용완료':
-        region_data[service_area[area]][date]["total_user"] += total_num    # 이용인원 집계
-        region_data[service_area[area]][date]["avg_wait_time"] += [waiting_time]     # 평균 대기시간 집계
-        region_data[service_area[area]][date]["user_type"]["성인"] += adult_num   # 이용자 유형(성인) 집계
-        region_data[service_area[area]][date]["user_type"]["청소년"] += teen_num   # 이용자 유형(청소년) 집계
-        region_data[service_area[area]][date]["user_type"]["어린이"] += children_num   # 이용자 유형(어린이) 집계
-        region_data[service_area[area]][date]["time_wait"][in_time] += [waiting_time]    # 시간대별 대기시간 집계
-        region_data[service_area[area]][date]["time_users"][in_time] += total_num   # 시간대별 이용인원 집계
-        region_data[service_area[area]][date]["time_travel"][in_time] += [travel_time]  # 시간대별 이동시간 집계
-
-        # 정류장 승하차 집계
-        region_data[service_area[area]][date]["stations"][o_station]["승차"] += total_num
-        region_data[service_area[area]][date]["stations"][d_station]["하차"] += total_num
-
-        # 대기시간 분포 집계
-        if waiting_time < 5:
-            region_data[service_area[area]][date]["wait_dist"]["5분 미만"] += [waiting_time]
-        elif waiting_time < 10:
-            region_data[service_area[area]][date]["wait_dist"]["5~10분"] += [waiting_time]
-        elif waiting_time < 15:
-            region_data[service_area[area]][date]["wait_dist"]["10~15분"] += [waiting_time]
-        elif waiting_time < 20:
-            region_data[service_area[area]][date]["wait_dist"]["15~20분"] += [waiting_time]
-        elif waiting_time < 25:
-            region_data[service_area[area]][date]["wait_dist"]["20~25분"] += [waiting_time]
-        elif waiting_time < 30:
-            region_data[service_area[area]][date]["wait_dist"]["25~30분"] += [waiting_time]
-        elif waiting_time < 35:
-            region_data[service_area[area]][date]["wait_dist"]["30~35분"] += [waiting_time]
-        elif waiting_time < 40:
-            region_data[service_area[area]][date]["wait_dist"]["35~40분"] += [waiting_time]
-        elif waiting_time < 45:
-            region_data[service_area[area]][date]["wait_dist"]["40~45분"] += [waiting_time]
-        elif waiting_time < 50:
-            region_data[service_area[area]][date]["wait_dist"]["45~50분"] += [waiting_time]
-        elif waiting_time < 55:
-            region_data[service_area[area]][date]["wait_dist"]["50~55분"] += [waiting_time]
-        elif waiting_time < 60:
-            region_data[service_area[area]][date]["wait_dist"]["55~60분"] += [waiting_time]
-        else:
-            region_data[service_area[area]][date]["wait_dist"]["60분 이상"] += [waiting_time]
-
-        # 통행 OD 초기화 및 집계
-        if o_d not in region_data[service_area[area]][date]["od"]:
-            region_data[service_area[area]][date]["od"][o_d] = 0
-        region_data[service_area[area]][date]["od"][o_d] += total_num
-
-holiday_data = defaultdict(lambda: {
-    "users_list": {"평일": [], "휴일": []},
-    "calls_list": {"평일": [], "휴일": []},
-    "waiting_list": {"평일": [], "휴일": []}
-})
-
-for service_a, services in region_data.items():
-    for service_d, data in services.items():
-        users = data["total_user"]
-        calls = sum(data["call_type"].values())
-        waitings = data["avg_wait_time"]
-
-        if service_d in kr_holidays:
-            holiday_data[service_a]["users_list"]["휴일"] += [users]
-            holiday_data[service_a]["calls_list"]["휴일"] += [calls]
-            holiday_data[service_a]["waiting_list"]["휴일"].extend(waitings)
+# 캐시 크기 (워커별 최근 지도 HTML, 화면 값 보관 개수)
+MAP_CACHE_SIZE = 64
+VIEW_CACHE_SIZE = 256
+
+# 운행내역 집계 프로세스 수 (부팅 시 스냅샷이 없거나 오래된 경우 청크별 병렬 집계, 1이면 단일 프로세스)
+INGEST_WORKERS = os.cpu_count() or 1
+# 실행 중 전체 재집계 프로세스 수 (스레드가 여러 개인 gunicorn 워커 안에서 프로세스 풀을 fork 하지 않도록 1)
+REFRESH_INGEST_WORKERS = 1
+
+# 운행내역 저장소 (비어 있으면 CSV 파일, 'sqlite:///경로' 또는 'mysql://사용자:암호@호스트:포트/DB'이면 SQL에서 집계)
+HISTORY_DATABASE = os.environ.get('DRT_HISTORY_DATABASE', '')
+
+# 운영 지표 (1이면 /metrics 경로를 Prometheus 형식으로 공개, 기본은 계측 코드를 설치하지 않음)
+# 인증 없이 콜백, 경로별 지표가 노출되므로 내부망 또는 프록시에서 /metrics 접근을 막은 경우에만 켬
+METRICS_ENABLED = os.environ.get('DRT_METRICS', '0') == '1'
+# 요청별 샘플링 프로파일러 (1이면 X-Profile 헤더가 있는 요청을 프로파일링하여 cache/profiles에 저장)
+PROFILING_ENABLED = os.environ.get('DRT_PROFILING', '0') == '1'
+
+# 백그라운드 콜백 (1이면 무거운 화면인 folium 지도, 상위 k개소, 전 지역 비교를 별도 프로세스에서 실행하고
+# 결과를 데이터 버전별로 디스크 캐시에 보관, 기본값 'client' 지도는 가벼운 JSON이므로 대상이 아님)
+# 작업마다 프로세스를 fork하므로 스레드 워커(gthread 등)에서는 켜지 않음, 가벼운 차트 콜백은 항상 바로 실행
+BACKGROUND_CALLBACKS = os.environ.get('DRT_BACKGROUND_CALLBACKS', '0') == '1'
+background_cache_dir = os.path.join('cache', 'callbacks')
+BACKGROUND_CACHE_EXPIRE = 24 * 3600     # 마지막 조회 후 보관 시간 (초)
+BACKGROUND_POLL_INTERVAL = 100          # 브라우저의 결과 확인 주기 (ms)
+# 화면 값 미리 계산 (1이면 부팅 시 기본 일자의 전 지역, 조회 시 이전/다음 기간과 같은 기간의 다른 지역을 미리 계산)
+PREFETCH_ENABLED = os.environ.get('DRT_PREFETCH', '1') != '0'
+
+# 지도 방식 ('client': 지도 틀은 한 번만 로드하고 구역 GeoJSON은 캐시 헤더와 함께 별도 경로로, 정류장은 작은 JSON으로
+# 보내 브라우저에서 그림, 'folium': 조회마다 folium 지도 HTML 전체를 생성)
+MAP_MODE = os.environ.get('DRT_MAP_MODE', 'client')
+
+# 운행내역 추가분 확인 주기 (초, 0이면 주기적 확인 안 함, /reload 요청으로는 언제든 반영 가능)
+# 반영은 워커마다 따로 하므로 첫 반영 이후에는 preload로 공유하던 집계 배열 대신 워커별 저장소, 기간 인덱스를 새로 들고 있음
+# (메모리가 워커 수만큼 늘어남, 공유를 유지하려면 0으로 두고 운행내역이 바뀔 때 gunicorn을 재시작하여 마스터에서 다시 집계)
+REFRESH_INTERVAL = int(os.environ.get('DRT_REFRESH_INTERVAL', 300))
+# 즉시 반영 토큰 (비어 있으면 /reload 경로를 만들지 않음, 설정하면 X-Reload-Token 헤더가 같은 요청만 반영)
+RELOAD_TOKEN = os.environ.get('DRT_RELOAD_TOKEN', '')
+
+# 지역 선택 목록
+REGION_NAMES = ['청주_오송', '청주_남이', '청주_가덕문의', '청주_내수북이', '청주_미원낭성', '청주_오창', '청주_옥산', '청주_현도',
+                '청주_강내']
+
+# 정류장 사전 (정류장 타입 구분 포함, 정류장/정류장명 → 정수 ID), 지역 정보
+with startup_timer.phase("station/area CSV"):
+    station_catalog = StationCatalog(load_station_types(station_file))
+    service_area, area_center = load_area_data(area_file)
+    region_centers = region_centers_of(service_area, area_center)
+    overview_regions = list(region_centers)   # 전 지역 비교 대상 (지역 정보의 모든 지역)
+
+# 정류장 간 도로망 최단 시간 (python road_network.py 로 미리 계산, 없으면 우회율을 표시하지 않음)
+with startup_timer.phase("road times"):
+    road_times = load_road_times()
+
+# 운행내역 저장소 (CSV는 입력 파일이 그대로면 저장된 스냅샷 사용, SQL은 DB에서 GROUP BY 집계)
+# 저장소는 집계에 반영된 위치를 기억하여 이후 추가된 행만 수집함
+history_backend = open_backend(HISTORY_DATABASE, history_file, area_file, service_area, workers=INGEST_WORKERS)
+
+# 운행내역 집계 로드 (집계 테이블 → 일자별 저장소, 기간 조회용 누적합 인덱스, 비교 기준)
+# 앱 구성과 분리되어 있어 Dash 앱, 레이아웃을 만든 뒤 모듈 끝에서 호출함
+def load_data():
+    global history_tables, data_version, aggregate_store, range_index, baselines, export_data
+    with startup_timer.phase("history tables"):
+        history_tables, data_version, position = history_backend.load()
+    with startup_timer.phase("aggregate store"):
+        aggregate_store = AggregateStore(history_tables, station_catalog, area_center, region_centers, data_version)
+    with startup_timer.phase("range index"):
+        range_index = RangeIndex(history_tables, region_centers, station_catalog, data_version)
+    with startup_timer.phase("baselines"):
+        baselines = Baselines().update(aggregate_store.day_totals())
+    export_data = (aggregate_store, history_tables)
+    history_backend.commit(position)
+    logging.info("Completed reading history data.")
+
+refresh_lock = threading.Lock()
+
+# 운행내역 추가분 반영 (추가된 행만 집계하여 해당 지역/일자 레코드, 기간 인덱스, 비교 기준을 교체하고 데이터 버전 갱신)
+# 중간에 실패하면 저장소의 위치도, 조회 중인 집계도 그대로이므로 다음 반영 때 같은 행부터 다시 집계함
+def refresh_history():
+    global history_tables, aggregate_store, range_index, baselines, export_data
+    with refresh_lock:
+        if history_backend.truncated():
+            # 파일이 교체되거나 잘린 경우 (DB는 집계한 행이 지워진 경우) 전체 다시 집계
+            logging.warning(f"{history_backend} 운행내역이 줄어들어 전체를 다시 집계합니다.")
+            tables, version, position = history_backend.load(force=True, workers=REFRESH_INGEST_WORKERS)
+            store = AggregateStore(tables, station_catalog, area_center, region_centers, version)
+            new_baselines = Baselines().update(store.day_totals())
         else:
-            holiday_data[service_a]["users_list"]["평일"] += [users]
-            holiday_data[service_a]["calls_list"]["평일"] += [calls]
-            holiday_data[service_a]["waiting_list"]["평일"].extend(waitings)
-
-# print(holiday_data["청주_오송"]["waiting_list"]["평일"])
-
-logging.info("Completed reading history data.")
-
-# Dash
-app = dash.Dash(__name__)
+            polled = history_backend.poll()
+            if polled is None:
+                return aggregate_store.version
+            new_tables, position = polled
+            tables = merge_tables(history_tables, new_tables)
+            version = history_backend.version(position)
+            store = AggregateStore(tables, station_catalog, area_center, region_centers, version)
+            # 추가분이 들어온 일자만 합계에서 빼고 새 값으로 다시 더함 (조회 중인 비교 기준은 고치지 않고 복사본을 갱신)
+            new_baselines = baselines.copy().update(
+                store.day_totals(set(zip(new_tables["days"]["region"], new_tables["days"]["date"]))))
+            history_backend.save(tables, version, position)
+
+        index = RangeIndex(tables, region_centers, station_catalog, version)
+        # 새 집계를 모두 만든 뒤 위치와 함께 교체 (캐시 키로 쓰는 데이터 버전이 바뀌므로 저장소는 마지막에,
+        # 내보내기용 저장소와 테이블은 한 번의 대입으로 함께 교체하여 요청마다 같은 버전을 읽음)
+        history_backend.commit(position)
+        history_tables, range_index, baselines = tables, index, new_baselines
+        aggregate_store = store
+        export_data = (store, tables)
+        logging.info(f"History refreshed to offset {history_backend.offset} (version {version[:12]}).")
+        return version
+
+# 주기적 반영 스레드 (워커 프로세스마다 첫 요청 시 시작, gunicorn preload 후 fork 된 워커에서도 동작)
+refresh_thread_pid = None
+
+def start_refresh_thread():
+    global refresh_thread_pid
+    if REFRESH_INTERVAL <= 0 or refresh_thread_pid == os.getpid():
+        return
+    with refresh_lock:
+        if refresh_thread_pid == os.getpid():
+            return
+        refresh_thread_pid = os.getpid()
+
+    def run():
+        while True:
+            time.sleep(REFRESH_INTERVAL)
+            try:
+                refresh_history()
+            except Exception as e:
+                logging.exception(f"Error refreshing history: {e}")
+
+    threading.Thread(target=run, name="history-refresh", daemon=True).start()
+
+# Dash (BACKGROUND_CALLBACKS이면 무거운 화면 콜백을 백그라운드 콜백 관리자로 실행, 결과 캐시 키에 데이터 버전 포함)
+app = dash.Dash(__name__, background_callback_manager=background_callback_manager(
+    background_cache_dir, lambda: aggregate_store.version, BACKGROUND_CACHE_EXPIRE) if BACKGROUND_CALLBACKS else None)
 server = app.server  # gunicorn은 server 객체를 사용함
 app.scripts.config.serve_locally = True
 app.css.config.serve_locally = True
 
-# Dash 레이아웃 설정
-app.layout = html.Div([
-    # 상단 - 지역 선택 Dropdown
-    html.Div([
-        dcc.Dropdown(
-            id='region-dropdown',
-            options=[{'label': '청주_오송', 'value': '청주_오송'},
-                     {'label': '청주_남이', 'value': '청주_남이'},
-                     {'label': '청주_가덕문의', 'value': '청주_가덕문의'},
-                     {'label': '청주_내수북이', 'value': '청주_내수북이'},
-                     {'label': '청주_미원낭성', 'value': '청주_미원낭성'},
-                     {'label': '청주_오창', 'value': '청주_오창'},
-                     {'label': '청주_옥산', 'value': '청주_옥산'},
-                     {'label': '청주_현도', 'value': '청주_현도'},
-                     {'label': '청주_강내', 'value': '청주_강내'}],
-            value='청주_오송',
-            style={'width': '30%'}
-        ),
-
-        # 상단 - 우측 기준 일자 DatePicker
-        dcc.DatePickerSingle(
-            id='date-picker',
-            date=day_now,
-            display_format='YYYY-MM-DD',
-            style={'width': '30%'}
-        ),
-
-        # 호출 건수
+@server.before_request
+def ensure_refresh_thread():
+    start_refresh_thread()
+
+# 운행내역 추가분 즉시 반영: POST /reload (X-Reload-Token 헤더 필요)
+# 요청을 받은 워커에만 반영되고, 다른 워커는 각자의 주기적 반영 스레드가 REFRESH_INTERVAL 안에 반영함
+if RELOAD_TOKEN:
+    @server.route('/reload', methods=['POST'])
+    def reload_history():
+        if not hmac.compare_digest(request.headers.get('X-Reload-Token', ''), RELOAD_TOKEN):
+            abort(403)
+        version = refresh_history()
+        return jsonify(version=version, offset=history_backend.offset, days=len(aggregate_store), pid=os.getpid())
+
+# 지도 틀, 구역 GeoJSON 경로 (지도 방식이 'client'인 경우)
+if MAP_MODE == 'client':
+    register_map_routes(server, lambda region: zone_shapefiles(region) if region in region_centers else None)
+
+# 집계 내보내기: GET /api/<days|stations|od> (지역, 기간, 필드 조건, CSV/NDJSON 스트리밍, 데이터 버전 ETag, gzip)
+# 요청마다 (저장소, 집계 테이블)을 한 번 읽으므로 ETag 버전과 내보내는 행이 항상 같은 데이터 버전
+register_export_routes(server, lambda: export_data)
+
+# 상태 확인: GET /healthz (데이터 버전, 부팅 단계별 소요 시간)
+@server.route('/healthz')
+def healthz():
+    return jsonify(status="ok", version=aggregate_store.version, days=len(aggregate_store),
+                   startup=startup_timer.as_dict())
+
+# Dash 레이아웃 설정 (페이지를 열 때마다 만들어 기본 조회 일자를 갱신)
+def serve_layout():
+    day_now = default_date()
+
+    return html.Div([
+        # 상단 - 지역 선택 Dropdown
         html.Div([
-                # 이미지 삽입
-                html.Img(
-                    src=os.path.join(img_input_dir, 'call_icon.png'),  # 이미지 경로 또는 URL
-                    style={'height': '50px', 'margin-right': '10px'}
+            dcc.Dropdown(
+                id='region-dropdown',
+                options=[{'label': region, 'value': region} for region in REGION_NAMES],
+                value=REGION_NAMES[0],
+                style={'width': '30%'}
+            ),
+
+            # 상단 - 우측 기준 일자 DatePicker
+            dcc.DatePickerSingle(
+                id='date-picker',
+                date=day_now,
+                display_format='YYYY-MM-DD',
+                style={'width': '30%'}
+            ),
+
+            # 상단 - 조회 기간 단위 (일/주/월/기간)
+            html.Div([
+                dcc.RadioItems(
+                    id='period-radio',
+                    options=[{'label': '일', 'value': 'day'},
+                             {'label': '주', 'value': 'week'},
+                             {'label': '월', 'value': 'month'},
+                             {'label': '기간', 'value': 'range'}],
+                    value='day',
+                    inline=True
                 ),
-                # 총 호출건수 표시
-                html.Div([
-                    html.Span(id='total-calls-display', children='000건',
-                              style={'font-size': '26px', 'font-weight': 'bold'}),
-                    html.Br(),  # 줄바꿈
-                    html.Div(id='avg-calls-display', children='(평일)000건/(휴일)000건',
-                             style={'font-size': '13px', 'color': 'gray'})
-                ], style={'display': 'inline-block', 'vertical-align': 'top'})
-            ], style={
-                'display': 'flex',
-                'align-items': 'center',    # 세로 방향 가운데 정렬
-                'border': '1px solid lightgray',
-                'padding': '10px',
-                'width': '250px',  # 원하는 크기로 조정
-                'box-sizing': 'border-box'
-            }),
-
-        # 이용 인원
-        html.Div([
-                # 이미지 삽입
-                html.Img(
-                    src=os.path.join(img_input_dir, 'users_icon.png'),  # 이미지 경로 또는 URL
-                    style={'height': '50px', 'margin-right': '10px'}
+                dcc.DatePickerRange(
+                    id='date-range',
+                    start_date=day_now,
+                    end_date=day_now,
+                    display_format='YYYY-MM-DD'
                 ),
-                # 총 이용인원 표시
-                html.Div([
-                    html.Span(id='total-users-display', children='000명',
-                              style={'font-size': '26px', 'font-weight': 'bold'}),
-                    html.Br(),  # 줄바꿈
-                    html.Div(id='avg-users-display', children='(평일)000명/(휴일)000명',
-                             style={'font-size': '13px', 'color': 'gray'})
-                ], style={'display': 'inline-block', 'vertical-align': 'top'})
-            ], style={
-                'display': 'flex',
-                'align-items': 'center',    # 세로 방향 가운데 정렬
-                'border': '1px solid lightgray',
-                'padding': '10px',
-                'width': '250px',  # 원하는 크기로 조정
-                'box-sizing': 'border-box'
-            }),
-
-        # 평균 대기시간
-        html.Div([
-                # 이미지 삽입
-                html.Img(
-                    src=os.path.join(img_input_dir, 'waiting_icon.png'),  # 이미지 경로 또는 URL
-                    style={'height': '50px', 'margin-right': '10px'}
+
+                # 상위 정류장/OD 표시 개수
+                dcc.RadioItems(
+                    id='topk-radio',
+                    options=[{'label': f'상위 {k}', 'value': k} for k in TOP_K_CHOICES],
+                    value=TOP_K_CHOICES[0],
+                    inline=True
                 ),
-                # 평균 대기시간 표시
-                html.Div([
-                    html.Span(id='total-waitings-display', children='000분',
-                              style={'font-size': '26px', 'font-weight': 'bold'}),
-                    html.Br(),  # 줄바꿈
-                    html.Div(id='avg-waitings-display', children='(평일)000분/(휴일)000분',
-                             style={'font-size': '13px', 'color': 'gray'})
-                ], style={'display': 'inline-block', 'vertical-align': 'top'})
-            ], style={
-                'display': 'flex',
-                'align-items': 'center',    # 세로 방향 가운데 정렬
-                'border': '1px solid lightgray',
-                'padding': '10px',
-                'width': '250px',  # 원하는 크기로 조정
-                'box-sizing': 'border-box'
-            })
-    ], style={'display': 'flex', 'align-items': 'center', 'padding': '10px', 'gap': '10px'}),
-
-    # 지도와 파이 차트를 포함하는 중간 부분
-    html.Div([
-        # 왼쪽 - 지도
-        html.Div([
-            html.Iframe(id="map", width="100%", height="96%")
-        ], style={'width': '40%', 'height': '600px', 'display': 'inline-block', 'padding': '10px',
-                  'border': '1px solid lightgray'}),
 
-        # 오른쪽 - 이용량 마크 3개, 차트 3개
+                # 평균 비교 기준 (평일/휴일, 요일, 최근 4주/12주)
+                dcc.RadioItems(
+                    id='baseline-radio',
+                    options=[{'label': label, 'value': kind} for kind, label in BASELINE_CHOICES.items()],
+                    value='day_type',
+                    inline=True
+                )
+            ]),
+
+            # 호출 건수
+            html.Div([
+                    # 이미지 삽입
+                    html.Img(
+                        src=os.path.join(img_input_dir, 'call_icon.png'),  # 이미지 경로 또는 URL
+                        style={'height': '50px', 'margin-right': '10px'}
+                    ),
+                    # 총 호출건수 표시
+                    html.Div([
+                        html.Span(id='total-calls-display', children='000건',
+                                  style={'font-size': '26px', 'font-weight': 'bold'}),
+                        html.Br(),  # 줄바꿈
+                        html.Div(id='avg-calls-display', children='(평일 평균)000건',
+                                 style={'font-size': '13px', 'color': 'gray'})
+                    ], style={'display': 'inline-block', 'vertical-align': 'top'})
+                ], style={
+                    'display': 'flex',
+                    'align-items': 'center',    # 세로 방향 가운데 정렬
+                    'border': '1px solid lightgray',
+                    'padding': '10px',
+                    'width': '250px',  # 원하는 크기로 조정
+                    'box-sizing': 'border-box'
+                }),
+
+            # 이용 인원
+            html.Div([
+                    # 이미지 삽입
+                    html.Img(
+                        src=os.path.join(img_input_dir, 'users_icon.png'),  # 이미지 경로 또는 URL
+                        style={'height': '50px', 'margin-right': '10px'}
+                    ),
+                    # 총 이용인원 표시
+                    html.Div([
+                        html.Span(id='total-users-display', children='000명',
+                                  style={'font-size': '26px', 'font-weight': 'bold'}),
+                        html.Br(),  # 줄바꿈
+                        html.Div(id='avg-users-display', children='(평일 평균)000명',
+                                 style={'font-size': '13px', 'color': 'gray'})
+                    ], style={'display': 'inline-block', 'vertical-align': 'top'})
+                ], style={
+                    'display': 'flex',
+                    'align-items': 'center',    # 세로 방향 가운데 정렬
+                    'border': '1px solid lightgray',
+                    'padding': '10px',
+                    'width': '250px',  # 원하는 크기로 조정
+                    'box-sizing': 'border-box'
+                }),
+
+            # 평균 대기시간
+            html.Div([
+                    # 이미지 삽입
+                    html.Img(
+                        src=os.path.join(img_input_dir, 'waiting_icon.png'),  # 이미지 경로 또는 URL
+                        style={'height': '50px', 'margin-right': '10px'}
+                    ),
+                    # 평균 대기시간 표시
+                    html.Div([
+                        html.Span(id='total-waitings-display', children='000분',
+                                  style={'font-size': '26px', 'font-weight': 'bold'}),
+                        html.Br(),  # 줄바꿈
+                        html.Div(id='avg-waitings-display', children='(평일 평균)000분',
+                                 style={'font-size': '13px', 'color': 'gray'})
+                    ], style={'display': 'inline-block', 'vertical-align': 'top'})
+                ], style={
+                    'display': 'flex',
+                    'align-items': 'center',    # 세로 방향 가운데 정렬
+                    'border': '1px solid lightgray',
+                    'padding': '10px',
+                    'width': '250px',  # 원하는 크기로 조정
+                    'box-sizing': 'border-box'
+                })
+        ], style={'display': 'flex', 'align-items': 'center', 'padding': '10px', 'gap': '10px'}),
+
+        # 지도와 파이 차트를 포함하는 중간 부분
         html.Div([
-            # 상위 5개소 3개
+            # 왼쪽 - 지도
             html.Div([
-                html.Div(dcc.Markdown(id="in-top5", style={'font-size': '14px', 'margin': '10px'}),
-                         style={'flex': '1', 'height': '100%', 'display': 'inline-block',
-                                'padding': '1px', 'border': '1px solid lightgray'}),  # 승차량 상위5개소
-                html.Div(dcc.Markdown(id="out-top5", style={'font-size': '14px', 'margin': '10px'}),
-                         style={'flex': '1', 'height': '100%', 'display': 'inline-block',
-                                'padding': '1px', 'border': '1px solid lightgray'}),  # 하차량 상위5개소
-                html.Div(dcc.Markdown(id="od-top5", style={'font-size': '14px', 'margin': '10px'}),
-                         style={'flex': '1', 'height': '100%', 'display': 'inline-block',
-                                'padding': '1px', 'border': '1px solid lightgray'}),  # 통행 상위5개소
-            ], style={'display': 'flex', 'flex-wrap': 'flex', 'width': '100%', 'height': '50%'}),
-
-            # 파이 차트 3개
+                html.Iframe(id="map", width="100%", height="96%",
+                            src=MAP_VIEW_PATH if MAP_MODE == 'client' else None),
+                dcc.Store(id="map-layer")
+            ], style={'width': '40%', 'height': '600px', 'display': 'inline-block', 'padding': '10px',
+                      'border': '1px solid lightgray'}),
+
+            # 오른쪽 - 이용량 마크 3개, 차트 3개
             html.Div([
-                html.Div(dcc.Graph(id="ride-pie-chart"),
-                         style={'flex': '1', 'height': '100%', 'display': 'inline-block',
-                                'padding': '1px', 'border': '1px solid lightgray'}),  # 배차 분류
-                html.Div(dcc.Graph(id="call-pie-chart"),
-                         style={'flex': '1', 'height': '100%', 'display': 'inline-block',
-                                'padding': '1px', 'border': '1px solid lightgray'}),  # 이용자 유형
-                html.Div(dcc.Graph(id="user-pie-chart"),
-                         style={'flex': '1', 'height': '100%', 'display': 'inline-block',
-                                'padding': '1px', 'border': '1px solid lightgray'})  # 호출 방법
-            ], style={'display': 'flex', 'flex-wrap': 'flex', 'width': '100%', 'height': '50%'})
-        ], style={'width': '60%', 'height': '600px', 'display': 'inline-block'})
-    ], style={'display': 'flex', 'width': '100%', 'height': '600px'}),
-
-    # 하단 - 시간대별 대기시간 및 이동시간 그래프
-    html.Div([
-        html.Div([dcc.Graph(id="waiting-time-chart")],
-                 style={'width': '50%', 'height': '250px', 'display': 'inline-block', 'padding': '10px',
-                        'border': '1px solid lightgray'}),
-        html.Div([dcc.Graph(id="waiting-time-dist")],
-                 style={'width': '50%', 'height': '250px', 'display': 'inline-block', 'padding': '10px',
-                        'border': '1px solid lightgray'})
-    ], style={'display': 'flex', 'width': '100%'})
-])  # 레이아웃의 끝부분에 괄호를 추가해줌
+                # 상위 5개소 3개
+                html.Div([
+                    html.Div(dcc.Markdown(id="in-top5", style={'font-size': '14px', 'margin': '10px'}),
+                             style={'flex': '1', 'height': '100%', 'display': 'inline-block', 'overflow-y': 'auto',
+                                    'padding': '1px', 'border': '1px solid lightgray'}),  # 승차량 상위5개소
+                    html.Div(dcc.Markdown(id="out-top5", style={'font-size': '14px', 'margin': '10px'}),
+                             style={'flex': '1', 'height': '100%', 'display': 'inline-block', 'overflow-y': 'auto',
+                                    'padding': '1px', 'border': '1px solid lightgray'}),  # 하차량 상위5개소
+                    html.Div(dcc.Markdown(id="od-top5", style={'font-size': '14px', 'margin': '10px'}),
+                             style={'flex': '1', 'height': '100%', 'display': 'inline-block', 'overflow-y': 'auto',
+                                    'padding': '1px', 'border': '1px solid lightgray'}),  # 통행 상위5개소
+                ], style={'display': 'flex', 'flex-wrap': 'flex', 'width': '100%', 'height': '50%'}),
+
+                # 파이 차트 3개
+                html.Div([
+                    html.Div(dcc.Graph(id="ride-pie-chart"),
+                             style={'flex': '1', 'height': '100%', 'display': 'inline-block',
+                                    'padding': '1px', 'border': '1px solid lightgray'}),  # 배차 분류
+                    html.Div(dcc.Graph(id="call-pie-chart"),
+                             style={'flex': '1', 'height': '100%', 'display': 'inline-block',
+                                    'padding': '1px', 'border': '1px solid lightgray'}),  # 이용자 유형
+                    html.Div(dcc.Graph(id="user-pie-chart"),
+                             style={'flex': '1', 'height': '100%', 'display': 'inline-block',
+                                    'padding': '1px', 'border': '1px solid lightgray'})  # 호출 방법
+                ], style={'display': 'flex', 'flex-wrap': 'flex', 'width': '100%', 'height': '50%'})
+            ], style={'width': '60%', 'height': '600px', 'display': 'inline-block'})
+        ], style={'display': 'flex', 'width': '100%', 'height': '600px'}),
+
+        # 하단 - 시간대별 대기시간 및 이동시간 그래프, 시간대별 이동거리 및 속도 그래프
+        html.Div([
+            html.Div([dcc.Graph(id="waiting-time-chart")],
+                     style={'width': '50%', 'height': '250px', 'display': 'inline-block', 'padding': '10px',
+                            'border': '1px solid lightgray'}),
+            html.Div([dcc.Graph(id="trip-distance-chart")],
+                     style={'width': '50%', 'height': '250px', 'display': 'inline-block', 'padding': '10px',
+                            'border': '1px solid lightgray'})
+        ], style={'display': 'flex', 'width': '100%'}),
+
+        # 하단 - 대기시간 분포 그래프, 그린존/레드존 구역별 현황 그래프
+        html.Div([
+            html.Div([dcc.Graph(id="waiting-time-dist")],
+                     style={'width': '50%', 'height': '250px', 'display': 'inline-block', 'padding': '10px',
+                            'border': '1px solid lightgray'}),
+            html.Div([dcc.Graph(id="zone-chart")],
+                     style={'width': '50%', 'height': '250px', 'display': 'inline-block', 'padding': '10px',
+                            'border': '1px solid lightgray'})
+        ], style={'display': 'flex', 'width': '100%'}),
+
+        # 하단 - 전 지역 비교 (선택한 기간의 지역별 지표 표, 그래프)
+        html.Div([
+            html.Div(dcc.Markdown(id="overview-table", style={'font-size': '14px', 'margin': '10px'}),
+                     style={'width': '50%', 'display': 'inline-block', 'padding': '10px', 'overflow-x': 'auto',
+                            'border': '1px solid lightgray'}),
+            html.Div([dcc.Graph(id="overview-chart")],
+                     style={'width': '50%', 'height': '300px', 'display': 'inline-block', 'padding': '10px',
+                            'border': '1px solid lightgray'})
+        ], style={'display': 'flex', 'width': '100%'})
+    ])  # 레이아웃의 끝부분에 괄호를 추가해줌
+
+app.layout = serve_layout
+
+# 기준 일자, 조회 단위 → 조회 기간 (시작일, 종료일)
+def resolve_period(period, selected_date, start_date, end_date):
+    if period == 'range' and start_date and end_date:
+        return start_date[:10], end_date[:10]
+    if not selected_date:
+        raise PreventUpdate
+
+    day = datetime.strptime(selected_date[:10], "%Y-%m-%d")
+    if period == 'week':
+        start = day - timedelta(day.weekday())
+        end = start + timedelta(6)
+    elif period == 'month':
+        start = day.replace(day=1)
+        end = (start + timedelta(32)).replace(day=1) - timedelta(1)
+    else:
+        start = end = day
+    return start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+
+# 지역/기간 집계 (하루는 일자별 저장소, 그 외는 누적합 인덱스로 조회)
+def period_aggregate(selected_region, start_date, end_date):
+    if start_date == end_date:
+        return aggregate_store.get(selected_region, start_date)
+    return range_index.query(selected_region, start_date, end_date)
+
+# 지역/기간 화면 값 (한 번 계산하여 모든 콜백이 공유)
+@functools.lru_cache(maxsize=VIEW_CACHE_SIZE)
+def day_view(selected_region, start_date, end_date, version):
+    return build_day_view(period_aggregate(selected_region, start_date, end_date), station_catalog)
+
+# 콜백 입력값 → 화면 값
+def selected_view(selected_region, selected_date, period, start_date, end_date):
+    start_date, end_date = resolve_period(period, selected_date, start_date, end_date)
+    return day_view(selected_region, start_date, end_date, aggregate_store.version)
+
+# 화면 값 미리 계산 (데이터가 바뀐 뒤에 처리되는 요청은 버림, 지도 내용까지 만들어 두면
+# 이후 백그라운드 콜백 프로세스가 워커의 캐시를 그대로 물려받음)
+def warm_view(selected_region, start_date, end_date, version):
+    if version != aggregate_store.version:
+        return
+    day_view(selected_region, start_date, end_date, version)
+    map_content(selected_region, start_date, end_date, version)
+
+prefetcher = Prefetcher(warm_view)
+
+# 다음에 볼 가능성이 높은 화면 예약 (같은 지역의 이전/다음 기간, 같은 기간의 다른 지역)
+def prefetch_neighbours(selected_region, selected_date, period, start_date, end_date):
+    if not PREFETCH_ENABLED:
+        return
+    start_date, end_date = resolve_period(period, selected_date, start_date, end_date)
+    version = aggregate_store.version
+    keys = [(selected_region, start, end, version)
+            for start, end in neighbour_periods(period, start_date, end_date, resolve_period)]
+    keys += [(region, start_date, end_date, version) for region in REGION_NAMES if region != selected_region]
+    prefetcher.request(keys)
+
+# 부팅 시 기본 일자의 전 지역 화면 미리 계산 (gunicorn preload이면 모든 워커가 공유)
+def warm_default_views():
+    day = default_date()
+    for region in REGION_NAMES:
+        warm_view(region, day, day, aggregate_store.version)
+
+# 무거운 화면 콜백 (folium 지도, 상위 k개소, 전 지역 비교)의 백그라운드 설정 (끄면 일반 콜백으로 실행)
+background_options = dict(background=BACKGROUND_CALLBACKS, interval=BACKGROUND_POLL_INTERVAL)
+
+# 기간 관련 공통 입력
+period_inputs = [Input('date-picker', 'date'),
+                 Input('period-radio', 'value'),
+                 Input('date-range', 'start_date'),
+                 Input('date-range', 'end_date')]
 
 # 콜백 함수: '총 호출건수' 텍스트 업데이트
 @app.callback(
     Output('total-calls-display', 'children'),
-    [Input('region-dropdown', 'value'),
-    Input('date-picker', 'date')]
+    [Input('region-dropdown', 'value')] + period_inputs
 )
-def update_total_users(selected_region, selected_date):
-    region_info = region_data[selected_region][selected_date]
-    total_calls = sum(region_info["call_type"].values())
+def update_total_calls(selected_region, selected_date, period, start_date, end_date):
+    view = selected_view(selected_region, selected_date, period, start_date, end_date)
+    prefetch_neighbours(selected_region, selected_date, period, start_date, end_date)
 
-    return [html.B(f'{total_calls}건')]
+    return [html.B(f'{view.total_calls}건')]
 
 # 콜백 함수: '총 이용인원' 텍스트 업데이트
 @app.callback(
     Output('total-users-display', 'children'),
-    [Input('region-dropdown', 'value'),
-    Input('date-picker', 'date')]
+    [Input('region-dropdown', 'value')] + period_inputs
 )
-def update_total_users(selected_region, selected_date):
-    region_info = region_data[selected_region][selected_date]
-    total_users = region_info["total_user"]
+def update_total_users(selected_region, selected_date, period, start_date, end_date):
+    view = selected_view(selected_region, selected_date, period, start_date, end_date)
 
-    return [html.B(f'{total_users}명')]
+    return [html.B(f'{view.total_users}명')]
 
 # 콜백 함수: '총 대기시간' 텍스트 업데이트
 @app.callback(
     Output('total-waitings-display', 'children'),
-    [Input('region-dropdown', 'value'),
-    Input('date-picker', 'date')]
+    [Input('region-dropdown', 'value')] + period_inputs
 )
-def update_avg_waitings(selected_region, selected_date):
-    region_info = region_data[selected_region][selected_date]
-    avg_waitings = float(round(sum(region_info["avg_wait_time"])/len(region_info["avg_wait_time"]),1))
+def update_avg_waitings(selected_region, selected_date, period, start_date, end_date):
+    view = selected_view(selected_region, selected_date, period, start_date, end_date)
 
-    return [html.B(f'{avg_waitings}분')]
+    return [html.B(f'{view.avg_wait}분')]
 
-# 콜백 함수: '지역별 평균 호출건수, 이용인원, 대기시간' 텍스트 업데이트
+# 기준 평균 대비 증감 텍스트 ('(기준)평균값단위 (+00%)', 조회 기간 자료가 없으면 기준 평균만)
+def baseline_text(label, current, baseline, unit, digits=0):
+    if baseline is None:
+        return f"({label}) 자료 없음"
+    value = round(baseline, digits) if digits else int(round(baseline, 0))
+    if current is None or not baseline:
+        return f"({label}){value}{unit}"
+    return f"({label}){value}{unit} ({(current - baseline) / baseline * 100:+.0f}%)"
+
+# 콜백 함수: '지역별 평균 호출건수, 이용인원, 대기시간' 텍스트 업데이트 (조회 기간의 일평균을 선택한 기준과 비교)
 @app.callback(
     [Output('avg-users-display', 'children'),
      Output('avg-calls-display', 'children'),
      Output('avg-waitings-display', 'children')],
-    Input('region-dropdown', 'value')
+    [Input('region-dropdown', 'value')] + period_inputs + [Input('baseline-radio', 'value')]
 )
+def update_area_avg(selected_region, selected_date, period, start_date, end_date, baseline_kind):
+    if selected_region not in baselines or baseline_kind not in BASELINE_CHOICES:
+        raise PreventUpdate
+    start_date, end_date = resolve_period(period, selected_date, start_date, end_date)
 
-def update_area_avg(selected_region):
-    avg_users = holiday_data[selected_region]["users_list"]
-    avg_calls = holiday_data[selected_region]["calls_list"]
-    avg_waitings = holiday_data[selected_region]["waiting_list"]
-
-    avg_users_weekday = int(round(sum(avg_users["평일"]) / len(avg_users["평일"]), 0))
-    avg_users_holiday = int(round(sum(avg_users["휴일"]) / len(avg_users["휴일"]), 0))
-    avg_calls_weekday = int(round(sum(avg_calls["평일"]) / len(avg_calls["평일"]), 0))
-    avg_calls_holiday = int(round(sum(avg_calls["휴일"]) / len(avg_calls["휴일"]), 0))
-    avg_waitings_weekday = float(round(sum(avg_waitings["평일"]) / len(avg_waitings["평일"]), 0))
-    avg_waitings_holiday = float(round(sum(avg_waitings["휴일"]) / len(avg_waitings["휴일"]), 0))
+    current = summarize(baselines.period(selected_region, start_date, end_date)) or (None, None, None)
+    label, values = baselines.baseline(selected_region, start_date, end_date, baseline_kind)
+    baseline = summarize(values) or (None, None, None)
 
-    # '(평일) 000건 / (휴일) 000건
-    avg_users_text = f"(평일){avg_users_weekday}명/(주말){avg_users_holiday}명"
-    avg_calls_text = f"(평일){avg_calls_weekday}건/(주말){avg_calls_holiday}건"
-    avg_waitings_text = f"(평일){avg_waitings_weekday}분/(주말){avg_waitings_holiday}분"
+    avg_users_text = baseline_text(label, current[0], baseline[0], "명")
+    avg_calls_text = baseline_text(label, current[1], baseline[1], "건")
+    avg_waitings_text = baseline_text(label, current[2], baseline[2], "분", 1)
 
     return avg_users_text, avg_calls_text, avg_waitings_text
 
-# 지역에 따른 지도 업데이트
+# 지역에 따른 지도 업데이트 ('client'는 정류장 레이어 JSON, 'folium'은 지도 HTML 전체를 백그라운드 콜백으로 생성)
 @app.callback(
-    Output("map", "srcDoc"),
-    [Input("region-dropdown", "value"),
-     Input("date-picker", "date")]
+    Output("map-layer", "data") if MAP_MODE == 'client' else Output("map", "srcDoc"),
+    [Input("region-dropdown", "value")] + period_inputs,
+    **(background_options if MAP_MODE != 'client' else {})
 )
-def update_map(selected_region, selected_date):
-    region_info = region_data[selected_region][selected_date]
-    m = folium.Map(location=region_info["map_center"], zoom_start=12, tiles="cartodbpositron")
+def update_map(selected_region, selected_date, period, start_date, end_date):
+    if selected_region not in region_centers:
+        raise PreventUpdate   # 지역 미선택, 모르는 지역은 지도 중심점이 없음
+    start_date, end_date = resolve_period(period, selected_date, start_date, end_date)
+    return map_content(selected_region, start_date, end_date, aggregate_store.version)
+
+# 받은 정류장 레이어를 지도 틀에 적용 (브라우저에서 실행)
+app.clientside_callback(APPLY_LAYER_JS, Output("map", "title"), Input("map-layer", "data"))
+
+# 지도 방식에 따른 지도 내용
+def map_content(selected_region, start_date, end_date, version):
+    if MAP_MODE == 'client':
+        return map_layer(selected_region, start_date, end_date, version)
+    return render_map_html(selected_region, start_date, end_date, version)
+
+# 정류장 레이어 (지역, 기간, 데이터 버전별로 최근 결과를 메모리에 보관)
+@functools.lru_cache(maxsize=VIEW_CACHE_SIZE)
+def map_layer(selected_region, start_date, end_date, version):
+    return station_layer(selected_region, period_aggregate(selected_region, start_date, end_date), station_catalog)
+
+# 지도 HTML 생성 (지역, 기간, 데이터 버전별로 최근 결과를 메모리에 보관)
+@functools.lru_cache(maxsize=MAP_CACHE_SIZE)
+def render_map_html(selected_region, start_date, end_date, version):
+    import folium                   # 지도 라이브러리는 첫 지도 요청 시 로드 (부팅 시간 단축)
+    from folium import FeatureGroup
+    from zones import zone_geojson  # geopandas 포함
+
+    region_info = period_aggregate(selected_region, start_date, end_date)
+    m = folium.Map(location=region_info.map_center, zoom_start=12, tiles="cartodbpositron")
 
     # 범례 그룹 추가
     red_zone = FeatureGroup(name='레드존', show=True).add_to(m)
     green_zone = FeatureGroup(name='그린존', show=True).add_to(m)
 
     # 지역의 shapefiles 추가
-    for name, path in region_info["shapefiles"].items():
+    for name, path in region_info.shapefiles.items():
+        if not path:
+            continue
         try:
-            gdf = gpd.read_file(path)
+            zone = zone_geojson(path)
             color = 'red' if name == "레드존" else 'green'
             feature_group = red_zone if color == 'red' else green_zone
 
@@ -441,7 +615,7 @@ def update_map(selected_region, selected_date):
             )
 
             folium.GeoJson(
-                gdf,
+                zone,
                 name=name,
                 style_function=style_function
             ).add_to(feature_group)
@@ -456,18 +630,19 @@ def update_map(selected_region, selected_date):
     virtual_stations_group = FeatureGroup(name="가상정류장", show=True).add_to(m)
 
     # 정류장 정보 추가
-    for station, count in region_info["stations"].items():
-        popup_text = f"<b>{station[0]}</b><br>승차 : {count['승차']}명, " \
-                     f"하차 : {count['하차']}명"
-        color = 'red' if station_type[station[0]] == '가상정류장' else 'blue'
+    for station_id, ride, alight in zip(region_info.station_ids, region_info.boarding, region_info.alighting):
+        name, lat, lon = station_catalog.stations[station_id]
+        popup_text = f"<b>{name}</b><br>승차 : {ride}명, " \
+                     f"하차 : {alight}명"
+        color = 'red' if station_catalog.station_type(station_id) == '가상정류장' else 'blue'
 
         # 정류장의 FeatureGroup에 추가
         target_group = virtual_stations_group if color == 'red' else existing_stations_group
 
         folium.Circle(
-            location=[station[1], station[2]],
+            location=[lat, lon],
             popup=folium.Popup(popup_text, max_width=300),
-            radius=(count['승차'] + count['하차']) * 10, # 정류장 표시 위해
+            radius=int(ride + alight) * 10, # 정류장 표시 위해
             color=color,
             fill=True,
             fill_color=color,
@@ -477,53 +652,50 @@ def update_map(selected_region, selected_date):
     # LayerControl을 추가하여 레이어를 제어할 수 있도록 설정
     folium.LayerControl(collapsed=False).add_to(m)
 
-    # 지도 저장 및 HTML 반환
-    map_file = 'temp_map.html'
-    m.save(map_file)
+    # 지도 HTML을 파일로 저장하지 않고 메모리에서 바로 반환
+    return m.get_root().render()
 
-    with open(map_file, 'r', encoding='utf-8') as f:
-        return f.read()
+# 마크다운 대괄호 이스케이프 처리
+MARKDOWN_ESCAPE = str.maketrans({'[': '\\[', ']': '\\]'})
 
-# 승차, 하차, 통행OD 상위 5개소 업데이트
+# 순위 목록 (이름, 인원) → 마크다운 (notes: 순위별 덧붙일 설명)
+def ranking_markdown(title, ranking, notes=()):
+    notes = list(notes) + [''] * (len(ranking) - len(notes))
+    lines = [f"### {title}\n"]
+    lines += [f"{i}. **{str(name).translate(MARKDOWN_ESCAPE)}** : {count}명{f' ({note})' if note else ''}\n\n"
+              for i, ((name, count), note) in enumerate(zip(ranking, notes), start=1)]
+    return "".join(lines)
+
+# O-D 우회율 (평균 이동시간 / 도로망 최단 시간, 둘 중 하나라도 없으면 빈 문자열)
+def detour_note(selected_region, origin, destination, travel_minutes):
+    road_minutes = road_times.minutes(selected_region, origin, destination) if road_times is not None else None
+    if travel_minutes is None or road_minutes is None:
+        return ''
+    return f"우회 {travel_minutes / road_minutes:.1f}배"
+
+# 승차, 하차, 통행OD 상위 k개소 업데이트
 @app.callback(
     [Output("in-top5", "children"),
      Output("out-top5", "children"),
      Output("od-top5", "children")],
-    [Input("region-dropdown", "value"),
-     Input("date-picker", "date")]
+    [Input("region-dropdown", "value")] + period_inputs + [Input("topk-radio", "value")],
+    **background_options
 )
-def update_pie_charts(selected_region, selected_date):
-    region_info = region_data[selected_region][selected_date]
-
-    # 승차 기준 상위 5개 정류장
-    top5_in = sorted(region_info["stations"].items(), key=lambda item: item[1]['승차'], reverse=True)[:5]
-    in_text = "### 승차량 상위 5개 정류장\n"
-    for i, station in enumerate(top5_in, start=1):
-        station_name = station[0][0]  # 정류장명 (튜플의 첫 번째 요소)
-        station_name = str(station_name).replace('[', '\\[').replace(']', '\\]')  # 대괄호 이스케이프 처리
-        station_data = station[1]  # Station data
-        in_text += f"{i}. **{station_name}** : {station_data['승차']}명\n"
-        in_text += "\n"
-
-    # 하차 기준 상위 5개 정류장
-    top5_out = sorted(region_info["stations"].items(), key=lambda item: item[1]['하차'], reverse=True)[:5]
-    out_text = "### 하차량 상위 5개 정류장\n"
-    for i, station in enumerate(top5_out, start=1):
-        station_name = station[0][0]  # 정류장명 (튜플의 첫 번째 요소)
-        station_name = str(station_name).replace('[', '\\[').replace(']', '\\]')  # 대괄호 이스케이프 처리
-        station_data = station[1]  # Station data
-        out_text += f"{i}. **{station_name}** : {station_data['하차']}명\n"
-        out_text += "\n"
-
-    # 기점-종점 기준 상위 5개 정류장
-    top5_od = sorted(region_info["od"].items(), key=lambda x: x[1], reverse=True)[:5]
-    od_text = "### 통행량 상위 5개 O-D\n"
-    for i, od_station in enumerate(top5_od, start=1):
-        o = (od_station[0].split('-')[0]).replace('[', '\\[').replace(']', '\\]')  # 대괄호 이스케이프 처리
-        d = (od_station[0].split('-')[1]).replace('[', '\\[').replace(']', '\\]')  # 대괄호 이스케이프 처리
-
-        od_text += f"{i}. **{o + '-' + d}** : {od_station[1]}명\n"
-        od_text += "\n"
+def update_top5(selected_region, selected_date, period, start_date, end_date, top_k=TOP_K_CHOICES[0]):
+    start_date, end_date = resolve_period(period, selected_date, start_date, end_date)
+    return top_markdown(selected_region, start_date, end_date, top_k or TOP_K_CHOICES[0], aggregate_store.version)
+
+# 상위 k개소 마크다운 (순위는 화면 값에 미리 계산되어 있어 잘라서 사용)
+@functools.lru_cache(maxsize=VIEW_CACHE_SIZE)
+def top_markdown(selected_region, start_date, end_date, top_k, version):
+    view = day_view(selected_region, start_date, end_date, version)
+
+    in_text = ranking_markdown(f"승차량 상위 {top_k}개 정류장", view.top_in[:top_k])
+    out_text = ranking_markdown(f"하차량 상위 {top_k}개 정류장", view.top_out[:top_k])
+    od_text = ranking_markdown(f"통행량 상위 {top_k}개 O-D",
+                               [(f"{o}-{d}", count) for (o, d), count in view.top_od[:top_k]],
+                               [detour_note(selected_region, o, d, travel)
+                                for ((o, d), _), travel in zip(view.top_od[:top_k], view.top_od_travel)])
 
     return in_text, out_text, od_text
 
@@ -532,19 +704,17 @@ def update_pie_charts(selected_region, selected_date):
     [Output("ride-pie-chart", "figure"),
      Output("user-pie-chart", "figure"),
      Output("call-pie-chart", "figure")],
-    [Input("region-dropdown", "value"),
-     Input("date-picker", "date")]
+    [Input("region-dropdown", "value")] + period_inputs
 )
-def update_pie_charts(selected_region, selected_date):
-    region_info = region_data[selected_region][selected_date]
+def update_pie_charts(selected_region, selected_date, period, start_date, end_date):
+    view = selected_view(selected_region, selected_date, period, start_date, end_date)
     pie_charts = []
 
     for key, title in zip(
             ["operation_type", "user_type", "call_type"],
             ["호출 현황", "이용자 현황", "호출 방법"]
     ):
-        labels = list(region_info[key].keys())
-        values = list(region_info[key].values())
+        labels, values = view.pies[key]
         fig = go.Figure(go.Pie(
             labels=labels, values=values, textinfo="percent+value", hoverinfo="label+percent+value", hole=0.5,
             texttemplate='%{value}<br>(<b>%{percent:.2f})</b>'
@@ -558,28 +728,26 @@ def update_pie_charts(selected_region, selected_date):
 # 지역에 따른 시간대별 현황 그래프 업데이트
 @app.callback(
     Output("waiting-time-chart", "figure"),
-    [Input("region-dropdown", "value"),
-     Input("date-picker", "date")]
+    [Input("region-dropdown", "value")] + period_inputs
 )
-def update_waiting_time_chart(selected_region, selected_date):
-    region_info = region_data[selected_region][selected_date]
-    times = list(region_info["time_wait"].keys())
-    avg_waiting_times = [
-        round(sum(wait_times) / len(wait_times) if wait_times else 0, 1)
-        for wait_times in region_info["time_wait"].values()
-    ]
-
-    user_counts = list(region_info["time_users"].values())
-
-    times2 = list(region_info["time_travel"].keys())
-    avg_travel_times = [
-        round(sum(travel_times) / len(travel_times) if travel_times else 0, 1)
-        for travel_times in region_info["time_travel"].values()
-    ]
+def update_waiting_time_chart(selected_region, selected_date, period, start_date, end_date):
+    view = selected_view(selected_region, selected_date, period, start_date, end_date)
+    times = view.hours
+    avg_waiting_times = view.hourly_wait
+
+    # 시간대별 대기시간 분위수 (p50, p90, p95)
+    wait_quantiles = view.hourly_wait_quantiles
+    p90_waiting_times = [quantiles[1] for quantiles in wait_quantiles]
+
+    user_counts = view.hourly_users
+    avg_travel_times = view.hourly_travel
 
     # 그래프 생성
     fig = go.Figure()
     fig.add_trace(go.Scatter(x=times, y=avg_waiting_times, name="대기시간", mode='lines+markers'))
+    fig.add_trace(go.Scatter(x=times, y=p90_waiting_times, name="대기시간(p90)", mode='lines',
+                             line=dict(dash='dot'), customdata=wait_quantiles,
+                             hovertemplate='p50 %{customdata[0]}분 / p90 %{customdata[1]}분 / p95 %{customdata[2]}분'))
     fig.add_trace(go.Scatter(x=times, y=avg_travel_times, name="이동시간", mode='lines+markers'))
     fig.add_trace(go.Scatter(x=times, y=user_counts, name="이용인원", mode='lines+markers', yaxis="y2"))
 
@@ -588,7 +756,7 @@ def update_waiting_time_chart(selected_region, selected_date):
         title="시간대별 현황",
         xaxis=dict(title="시간대", range=[5, 22]),
         yaxis=dict(title="대기시간 및 이동시간(분)", side='left',
-                   range=[0, max(max(avg_waiting_times), max(avg_travel_times)) * 1.2]),
+                   range=[0, max(max(avg_waiting_times), max(p90_waiting_times), max(avg_travel_times)) * 1.2]),
         yaxis2=dict(title="이용인원(인)", overlaying='y', side='right', range=[0, max(user_counts) * 1.2]),
         width=900, height=250,
         plot_bgcolor='whitesmoke',  # 플롯 배경색
@@ -610,21 +778,14 @@ def update_waiting_time_chart(selected_region, selected_date):
 # 지역에 따른 대기시간 분포 그래프 업데이트
 @app.callback(
     Output("waiting-time-dist", "figure"),
-    [Input("region-dropdown", "value"),
-     Input("date-picker", "date")]
+    [Input("region-dropdown", "value")] + period_inputs
 )
-def update_waiting_time_chart(selected_region, selected_date):
-    region_info = region_data[selected_region][selected_date]
-
-    # 대기시간 리스트 불러오기
-    labels = list(region_info["wait_dist"].keys())
-    sizes = [
-        len(times) if len(times) > 0 else 0  # 구간별 평균 대기 시간 계산
-        for times in region_info["wait_dist"].values()
-    ]
-    # 각 값의 비율 계산
-    total = sum(sizes)
-    percentages = [round((size / total) * 100, 1) for size in sizes]    # 비율 계산 (백분율)
+def update_waiting_time_dist(selected_region, selected_date, period, start_date, end_date):
+    view = selected_view(selected_region, selected_date, period, start_date, end_date)
+
+    # 대기시간 구간별 비율 (백분율)
+    labels = view.wait_dist_labels
+    percentages = view.wait_dist_percentages
 
     # 바 차트 생성
     fig = go.Figure(data=[
@@ -646,6 +807,144 @@ def update_waiting_time_chart(selected_region, selected_date):
 
     return fig
 
+# 지역에 따른 그린존/레드존 구역별 현황 그래프 업데이트
+@app.callback(
+    Output("zone-chart", "figure"),
+    [Input("region-dropdown", "value")] + period_inputs
+)
+def update_zone_chart(selected_region, selected_date, period, start_date, end_date):
+    view = selected_view(selected_region, selected_date, period, start_date, end_date)
+    labels = view.zone_labels
+
+    # 기점, 종점 구역별 운행 비율 (막대), 기점 구역별 평균 대기시간 (점)
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=labels, y=view.zone_start_shares, name="출발 비율"))
+    fig.add_trace(go.Bar(x=labels, y=view.zone_end_shares, name="도착 비율"))
+    fig.add_trace(go.Scatter(x=labels, y=view.zone_wait, name="평균 대기시간", mode='markers+text', yaxis="y2",
+                             text=[f"{wait}분" for wait in view.zone_wait], textposition='top center'))
+
+    fig.update_layout(
+        title="구역별 현황",
+        xaxis=dict(title="출발/도착 구역"),
+        yaxis=dict(title="비율(%)", range=[0, max(view.zone_start_shares + view.zone_end_shares) * 1.2 or 1]),
+        yaxis2=dict(title="대기시간(분)", overlaying='y', side='right', range=[0, max(view.zone_wait) * 1.3 or 1]),
+        width=900, height=250,
+        barmode='group',
+        plot_bgcolor='whitesmoke',  # 플롯 배경색
+        paper_bgcolor='white',  # 그래프 전체 배경색
+        margin=dict(l=15, r=15, t=50, b=20),  # 여백 설정
+        hovermode='x unified',  # 호버 스타일
+        legend=dict(x=1.1, y=1, bordercolor="black", borderwidth=1)
+    )
+
+    return fig
+
+# 지역에 따른 시간대별 이동거리, 속도 그래프 업데이트
+@app.callback(
+    Output("trip-distance-chart", "figure"),
+    [Input("region-dropdown", "value")] + period_inputs
+)
+def update_trip_distance_chart(selected_region, selected_date, period, start_date, end_date):
+    view = selected_view(selected_region, selected_date, period, start_date, end_date)
+    times = view.hours
+    (distance_mean, distance_std), (speed_mean, speed_std) = view.trip_distance, view.trip_speed
+
+    # 시간대별 평균 이동거리 (막대), 평균 속도 ± 표준편차 (선)
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=times, y=view.hourly_distance, name="이동거리", opacity=0.6))
+    fig.add_trace(go.Scatter(x=times, y=view.hourly_speed, name="속도", mode='lines+markers', yaxis="y2",
+                             error_y=dict(type='data', array=view.hourly_speed_std, visible=True, thickness=1)))
+
+    fig.update_layout(
+        title=f"시간대별 이동거리 및 속도 (평균 {distance_mean}±{distance_std}km, {speed_mean}±{speed_std}km/h)",
+        xaxis=dict(title="시간대", range=[5, 22]),
+        yaxis=dict(title="직선 이동거리(km)", side='left', range=[0, max(view.hourly_distance) * 1.2 or 1]),
+        yaxis2=dict(title="속도(km/h)", overlaying='y', side='right',
+                    range=[0, max(speed + std for speed, std in zip(view.hourly_speed, view.hourly_speed_std)) * 1.2
+                           or 1]),
+        width=900, height=250,
+        plot_bgcolor='whitesmoke',  # 플롯 배경색
+        paper_bgcolor='white',  # 그래프 전체 배경색
+        margin=dict(l=15, r=15, t=50, b=20),  # 여백 설정
+        hovermode='x unified',  # 호버 스타일
+        legend=dict(x=1.1, y=1, bordercolor="black", borderwidth=1)
+    )
+
+    return fig
+
+# 전 지역 비교 화면 값 (지역 축 누적합 배열에서 기간 합을 한 번에 계산, 데이터 버전별로 보관)
+@functools.lru_cache(maxsize=VIEW_CACHE_SIZE)
+def overview_view(start_date, end_date, version):
+    return build_region_overview(overview_regions, range_index.overview(overview_regions, start_date, end_date))
+
+# 전 지역 비교 표, 그래프 업데이트 (지역 선택과 무관하게 기간만 입력)
+@app.callback(
+    [Output("overview-table", "children"),
+     Output("overview-chart", "figure")],
+    period_inputs,
+    **background_options
+)
+def update_overview(selected_date, period, start_date, end_date):
+    start_date, end_date = resolve_period(period, selected_date, start_date, end_date)
+    overview = overview_view(start_date, end_date, aggregate_store.version)
+
+    period_label = start_date if start_date == end_date else f"{start_date} ~ {end_date}"
+    lines = [f"### 전 지역 비교 ({period_label})\n\n",
+             "| 지역 | 호출 | 이용인원 | 평균 대기 | 90% 대기 | 이용 완료율 |\n",
+             "|---|---:|---:|---:|---:|---:|\n"]
+    lines += [f"| {region} | {calls}건 | {users}명 | {wait_mean}분 | {wait_p90}분 | {completion}% |\n"
+              for region, calls, users, wait_mean, wait_p90, completion in zip(
+                  overview.regions, overview.calls, overview.users, overview.wait_mean, overview.wait_p90,
+                  overview.completion)]
+
+    # 지역별 호출건수, 이용인원 (막대), 이용 완료율 (선)
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=overview.regions, y=overview.calls, name="호출"))
+    fig.add_trace(go.Bar(x=overview.regions, y=overview.users, name="이용인원"))
+    fig.add_trace(go.Scatter(x=overview.regions, y=overview.completion, name="이용 완료율", mode='lines+markers',
+                             yaxis="y2"))
+
+    fig.update_layout(
+        title="지역별 호출건수, 이용인원 및 이용 완료율",
+        barmode='group',
+        yaxis=dict(title="건수/인원", side='left'),
+        yaxis2=dict(title="이용 완료율(%)", overlaying='y', side='right', range=[0, 100]),
+        height=300,
+        plot_bgcolor='whitesmoke',  # 플롯 배경색
+        paper_bgcolor='white',  # 그래프 전체 배경색
+        margin=dict(l=15, r=15, t=50, b=20),  # 여백 설정
+        hovermode='x unified',  # 호버 스타일
+        legend=dict(x=1.1, y=1, bordercolor="black", borderwidth=1)
+    )
+
+    return "".join(lines), fig
+
+# 콜백별 지연 시간, 응답 크기, 오류, 캐시 적중률 계측
+if METRICS_ENABLED:
+    install_metrics(app, {"day_view": day_view, "map_html": render_map_html, "map_layer": map_layer,
+                          "top_markdown": top_markdown, "overview_view": overview_view},
+                    profiling=PROFILING_ENABLED)
+
+startup_timer.mark("app build")
+
+# 레이아웃 구성 시간 측정 (페이지를 열 때마다 만드는 레이아웃을 한 번 미리 만들어 봄)
+with startup_timer.phase("layout build"):
+    serve_layout()
+
+# 운행내역 집계 로드
+load_data()
+
+if PREFETCH_ENABLED:
+    with startup_timer.phase("warm views"):
+        warm_default_views()
+
+# 부팅 중 만든 객체를 GC 추적 대상에서 제외 (gunicorn preload 후 fork 된 워커에서 GC가 객체 헤더를 고쳐 써
+# 공유 중인 메모리 페이지가 워커마다 복사되지 않도록 함, 운행내역 반영 후 워커가 새로 만든 집계는 공유되지 않음: REFRESH_INTERVAL 참고)
+with startup_timer.phase("gc freeze"):
+    gc.collect()
+    gc.freeze()
+logging.info("Startup report\n" + startup_timer.report())
+
 # 앱 실행
 if __name__ == '__main__':
     app.run_server(debug=True)
\ No newline at end of file
@@ -0,0 +1,108 @@
+import os
+import time
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from ingest import load_area_data, read_history_raw, parse_history_frame, aggregate_history_tables, merge_tables
+
+CHUNKS_PER_WORKER = 4    # 워커별 청크 수 (청크 크기 편차에 따른 유휴 시간 완화)
+
+
+# offset 이후 완결된 행 구간을 행 경계에 맞춰 약 n_chunks개의 바이트 구간으로 나눔 ([(시작, 끝)], 끝 위치)
+def chunk_ranges(file_path, n_chunks, offset=0):
+    size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        if offset == 0:
+            f.readline()    # 헤더 건너뛰기
+            offset = f.tell()
+
+        # 마지막 줄바꿈 위치 (이후의 쓰다 만 행은 다음 수집에서 읽음)
+        end = size
+        while end > offset:
+            f.seek(max(end - 65536, offset))
+            block = f.read(end - f.tell())
+            newline = block.rfind(b'\n')
+            if newline >= 0:
+                end = end - len(block) + newline + 1
+                break
+            end -= len(block)
+        end = max(end, offset)
+
+        bounds = [offset]
+        for i in range(1, n_chunks):
+            position = offset + (end - offset) * i // n_chunks
+            if position <= bounds[-1]:
+                continue
+            f.seek(position)
+            f.readline()    # 다음 행 시작까지 이동
+            if bounds[-1] < f.tell() < end:
+                bounds.append(f.tell())
+    bounds.append(end)
+    return [(start, stop) for start, stop in zip(bounds, bounds[1:]) if stop > start], end
+
+
+# 워커: 바이트 구간 하나를 읽어 부분 집계 테이블 생성
+def aggregate_chunk(file_path, start, stop, service_area, encoding='cp949'):
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(stop - start)
+    return aggregate_history_tables(parse_history_frame(read_history_raw(data, encoding, has_header=False),
+                                                        service_area))
+
+
+# 부분 집계를 인접한 것끼리 짝지어 합침 (청크 순서를 유지하므로 청크 수와 무관하게 같은 결과)
+def merge_partials(partials):
+    while len(partials) > 1:
+        partials = [merge_tables(partials[i], partials[i + 1]) if i + 1 < len(partials) else partials[i]
+                    for i in range(0, len(partials), 2)]
+    return partials[0]
+
+
+# 운행내역 CSV를 청크로 나눠 프로세스별로 집계한 뒤 합침 (집계 테이블, 끝 위치 반환)
+def read_history_tables(file_path, service_area, workers=1, offset=0, encoding='cp949'):
+    ranges, end = chunk_ranges(file_path, 1 if workers <= 1 else workers * CHUNKS_PER_WORKER, offset)
+    service_area = dict(service_area)
+    if not ranges:
+        return aggregate_chunk(file_path, end, end, service_area, encoding), end
+
+    if workers <= 1:
+        partials = [aggregate_chunk(file_path, start, stop, service_area, encoding) for start, stop in ranges]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(aggregate_chunk, file_path, start, stop, service_area, encoding)
+                       for start, stop in ranges]
+            partials = [future.result() for future in futures]
+    logging.info(f"Data from {file_path} aggregated in {len(ranges)} chunks by {workers} workers "
+                 f"({offset} → {end} bytes).")
+    return merge_partials(partials), end
+
+
+# 프로세스 수별 집계 시간 측정: python parallel_ingest.py --benchmark 1 2 4 8
+def main():
+    data_input_dir = os.path.join('input', '01 data')
+    parser = argparse.ArgumentParser(description="운행내역 병렬 집계 프로세스 수별 성능 측정")
+    parser.add_argument('--history', default=os.path.join(data_input_dir, 'DRT운행내역(통합).csv'))
+    parser.add_argument('--area', default=os.path.join(data_input_dir, '지역별 중심점.csv'))
+    parser.add_argument('--benchmark', type=int, nargs='+', default=[1, 2, 4, 8], help="측정할 프로세스 수")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    service_area, _ = load_area_data(args.area)
+
+    print(f"{os.path.getsize(args.history)} bytes, {os.cpu_count()} CPUs")
+    print(f"{'workers':>7} {'best(s)':>9} {'speedup':>8}")
+    baseline = None
+    for workers in args.benchmark:
+        times = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            read_history_tables(args.history, service_area, workers)
+            times.append(time.perf_counter() - started)
+        baseline = baseline or min(times)
+        print(f"{workers:>7} {min(times):>9.2f} {baseline / min(times):>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from ingest import (HOURS, HOUR_METRICS, HOUR_STATS, WAIT_BUCKETS, ZONE_METRICS, OD_METRICS, OD_FIELDS, OD_DTYPES,
+                    new_day_record, init_day_record)
+from spatial import ZONE_LABELS
+from stats import RunningStats, QuantileSketch
+from catalog import od_matrix
+from store import DayAggregate, COMPLETED
+
+DAY_METRICS = ("users", "adult", "teen", "children", "wait_count", "wait_sum", "wait_sumsq")
+CATEGORY_DIMENSIONS = ("operation_type", "call_type")
+SKETCH_WIDTH = QuantileSketch.max_key + 1
+
+
+def _cumulative(values):
+    # 일자 축(axis=1) 누적합, 앞에 0 행을 붙여 [start, end] 구간 합을 cum[end + 1] - cum[start]로 계산
+    cum = np.cumsum(values, axis=1)
+    return np.concatenate([np.zeros_like(cum[:, :1]), cum], axis=1)
+
+
+# 지역 × 일자 × 지표 누적합 기반 기간 조회 인덱스
+class RangeIndex:
+    def __init__(self, tables, region_centers, catalog, version=""):
+        self.version = version
+        self.catalog = catalog
+        self.region_centers = region_centers
+
+        days = tables["days"]
+        dates = pd.to_datetime(days["date"], format="%Y-%m-%d", errors="coerce").dropna()
+        self.first_date = dates.min().to_datetime64().astype("datetime64[D]") if len(dates) else None
+        n_dates = int((dates.max() - dates.min()).days) + 1 if len(dates) else 0
+        self.regions = {region: i for i, region in enumerate(dict.fromkeys(days["region"]))}
+        n_regions = len(self.regions)
+
+        def locate(table):
+            rows = self._region_codes(table["region"])
+            cols = self._date_codes(table["date"])
+            valid = (rows >= 0) & (cols >= 0) & (cols < n_dates)
+            return rows, cols, valid
+
+        # 일 단위 지표
+        day = tables["day_users"]
+        rows, cols, valid = locate(day)
+        values = np.zeros((n_regions, n_dates, len(DAY_METRICS)))
+        np.add.at(values, (rows[valid], cols[valid]), day[list(DAY_METRICS)].to_numpy(dtype=float)[valid])
+        self.day_cum = _cumulative(values)
+
+        # 배차 분류, 호출 방법 (라벨별 건수)
+        categories = tables["categories"]
+        self.labels = {}
+        self.category_cum = {}
+        for dimension in CATEGORY_DIMENSIONS:
+            table = categories[categories["dimension"] == dimension]
+            label_codes, labels = pd.factorize(table["label"])
+            self.labels[dimension] = list(labels)
+            rows, cols, valid = locate(table)
+            values = np.zeros((n_regions, n_dates, len(labels)), dtype=np.int64)
+            np.add.at(values, (rows[valid], cols[valid], label_codes[valid]), table["count"].to_numpy()[valid])
+            self.category_cum[dimension] = _cumulative(values)
+
+        # 시간대별 지표
+        hourly = tables["hourly"]
+        rows, cols, valid = locate(hourly)
+        hours = hourly["hour"].to_numpy() - HOURS.start
+        values = np.zeros((n_regions, n_dates, len(HOURS), len(HOUR_METRICS)))
+        np.add.at(values, (rows[valid], cols[valid], hours[valid]),
+                  hourly[list(HOUR_METRICS)].to_numpy(dtype=float)[valid])
+        self.hour_cum = _cumulative(values)
+
+        # 대기시간 분포 구간별 건수
+        dist = tables["wait_dist"]
+        rows, cols, valid = locate(dist)
+        values = np.zeros((n_regions, n_dates, len(WAIT_BUCKETS)), dtype=np.int64)
+        np.add.at(values, (rows[valid], cols[valid], dist["bucket"].to_numpy()[valid]), dist["count"].to_numpy()[valid])
+        self.dist_cum = _cumulative(values)
+
+        # 기점 구역 × 종점 구역별 지표
+        zones = tables["zones"]
+        rows, cols, valid = locate(zones)
+        values = np.zeros((n_regions, n_dates, len(ZONE_LABELS), len(ZONE_LABELS), len(ZONE_METRICS)))
+        o_zones, d_zones = zones["o_zone"].to_numpy(), zones["d_zone"].to_numpy()
+        np.add.at(values, (rows[valid], cols[valid], o_zones[valid], d_zones[valid]),
+                  zones[list(ZONE_METRICS)].to_numpy(dtype=float)[valid])
+        self.zone_cum = _cumulative(values)
+
+        # 시간대별 분위수 스케치 구간 (지역별 일자 × (시간대, 구간) 희소 행렬)
+        sketch = tables["wait_sketch"]
+        rows, cols, valid = locate(sketch)
+        sketch_cols = (sketch["hour"].to_numpy() - HOURS.start) * SKETCH_WIDTH + sketch["key"].to_numpy()
+        self.sketch_days = self._sparse_by_region(rows[valid], cols[valid], sketch_cols[valid],
+                                                  sketch["count"].to_numpy()[valid], n_dates, len(HOURS) * SKETCH_WIDTH)
+        # 전 지역 비교용 (시간대를 합친 지역 × 일자 × 구간 누적합)
+        values = np.zeros((n_regions, n_dates, SKETCH_WIDTH), dtype=np.int64)
+        np.add.at(values, (rows[valid], cols[valid], sketch["key"].to_numpy()[valid]), sketch["count"].to_numpy()[valid])
+        self.sketch_cum = _cumulative(values)
+
+        # 정류장 승하차 (지역별 일자 × 정류장 누적합, 정류장은 사전 ID)
+        stations = tables["stations"]
+        rows, cols, valid = locate(stations)
+        station_ids = catalog.station_ids_of(stations["name"], stations["lat"], stations["lon"])
+        counts = stations[["승차", "하차"]].to_numpy()
+        self.station_ids = []
+        self.station_cum = []
+        for region in range(n_regions):
+            mask = valid & (rows == region)
+            codes, uniques = pd.factorize(station_ids[mask])
+            values = np.zeros((1, n_dates, len(uniques), 2), dtype=np.int64)
+            np.add.at(values, (0, cols[mask], codes), counts[mask])
+            self.station_ids.append(uniques.astype(np.int32))
+            self.station_cum.append(_cumulative(values)[0])
+
+        # 통행 OD (지역별, 지표별 일자 × (기점, 종점) 희소 행렬)
+        od = tables["od"]
+        rows, cols, valid = locate(od)
+        o_ids = catalog.name_ids_of(od["o_name"]).astype(np.int64)
+        d_ids = catalog.name_ids_of(od["d_name"]).astype(np.int64)
+        pairs = o_ids * max(catalog.n_names, 1) + d_ids
+        self.od_pairs = []
+        self.od_days = []
+        for region in range(n_regions):
+            mask = valid & (rows == region)
+            codes, uniques = pd.factorize(pairs[mask])
+            self.od_pairs.append(np.divmod(uniques, max(catalog.n_names, 1)))
+            self.od_days.append([sparse.csr_matrix((od[name].to_numpy()[mask], (cols[mask], codes)),
+                                                   shape=(n_dates, len(uniques)),
+                                                   dtype=np.int64 if dtype == np.int32 else dtype)
+                                 for name, dtype in zip(OD_METRICS, OD_DTYPES)])
+        self.n_dates = n_dates
+
+    def _region_codes(self, regions):
+        return pd.Index(list(self.regions)).get_indexer(regions)
+
+    def _date_codes(self, dates):
+        if self.first_date is None:
+            return np.full(len(dates), -1)
+        parsed = pd.to_datetime(dates, format="%Y-%m-%d", errors="coerce")
+        codes = (parsed.to_numpy().astype("datetime64[D]") - self.first_date).astype(np.int64)
+        return np.where(parsed.isna(), -1, codes)
+
+    def _sparse_by_region(self, rows, cols, keys, counts, n_dates, width):
+        return [
+            sparse.csr_matrix((counts[rows == region], (cols[rows == region], keys[rows == region])),
+                              shape=(n_dates, width), dtype=np.int64)
+            for region in range(len(self.regions))
+        ]
+
+    # 'YYYY-MM-DD' → 일자 위치 (범위를 벗어나면 달력 끝으로 맞춤)
+    def _bounds(self, start_date, end_date):
+        if self.first_date is None:
+            return None
+        start, end = self._date_codes(pd.Series([start_date, end_date]))
+        start, end = max(int(start), 0), min(int(end), self.n_dates - 1)
+        return (start, end) if start <= end else None
+
+    # 지역별 기간 [start_date, end_date] 요약 (regions 순서, 지역 축 전체에 대한 구간 합 한 번으로 계산)
+    # 호출건수, 이용인원, 평균/90% 대기시간 (분), 이용 완료율 (배차 분류 중 이용완료 비율), 자료가 없는 지역은 0
+    def overview(self, regions, start_date, end_date):
+        positions = self._region_codes(regions)
+        present = positions >= 0
+        bounds = self._bounds(start_date, end_date)
+
+        def span(cum):
+            values = np.zeros((len(positions),) + cum.shape[2:], dtype=cum.dtype)
+            if bounds is not None:
+                start, end = bounds
+                values[present] = cum[positions[present], end + 1] - cum[positions[present], start]
+            return values
+
+        day = span(self.day_cum)
+        operations = span(self.category_cum["operation_type"])
+        labels = self.labels["operation_type"]
+        completed = operations[:, labels.index(COMPLETED)] if COMPLETED in labels else np.zeros(len(positions))
+        operation_total = operations.sum(axis=1)
+        wait_count, wait_sum = day[:, DAY_METRICS.index("wait_count")], day[:, DAY_METRICS.index("wait_sum")]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return {
+                "calls": span(self.category_cum["call_type"]).sum(axis=1),
+                "users": day[:, DAY_METRICS.index("users")],
+                "wait_mean": np.where(wait_count > 0, wait_sum / wait_count, 0.0),
+                "wait_p90": QuantileSketch.quantile_of_bins(span(self.sketch_cum), 0.9),
+                "completion": np.where(operation_total > 0, completed / operation_total, 0.0),
+            }
+
+    # 기간 [start_date, end_date] 집계 (구간 합은 지표별 O(1))
+    def query(self, region, start_date, end_date):
+        record = new_day_record()
+        init_day_record(record, region, self.region_centers.get(region))
+        region_index = self.regions.get(region)
+        bounds = self._bounds(start_date, end_date)
+        if region_index is None or bounds is None:
+            return DayAggregate(record, has_data=False)
+        start, end = bounds
+
+        def span(cum):
+            return cum[region_index, end + 1] - cum[region_index, start]
+
+        day = dict(zip(DAY_METRICS, span(self.day_cum)))
+        record["total_user"] = int(day["users"])
+        record["user_type"] = {"성인": int(day["adult"]), "청소년": int(day["teen"]), "어린이": int(day["children"])}
+        record["avg_wait_time"] = RunningStats(int(day["wait_count"]), day["wait_sum"], day["wait_sumsq"])
+
+        for dimension in CATEGORY_DIMENSIONS:
+            counts = span(self.category_cum[dimension])
+            record[dimension] = {label: int(count) for label, count in zip(self.labels[dimension], counts) if count}
+
+        hourly = span(self.hour_cum)
+        for hour, (users, *values) in zip(HOURS, hourly.tolist()):
+            record["time_users"][hour] = int(users)
+            for field, (count, total, total_sq) in zip(HOUR_STATS, zip(*[iter(values)] * 3)):
+                record[field][hour] = RunningStats(int(count), total, total_sq)
+
+        sketch_bins = np.asarray(self.sketch_days[region_index][start:end + 1].sum(axis=0)).reshape(len(HOURS), -1)
+        for hour, bins in zip(HOURS, sketch_bins):
+            keys = np.flatnonzero(bins)
+            record["time_wait_sketch"][hour] = QuantileSketch(zip(keys.tolist(), bins[keys].tolist()))
+
+        record["wait_dist"] = dict(zip(WAIT_BUCKETS, span(self.dist_cum).tolist()))
+        record["zone_flows"] = span(self.zone_cum)
+
+        station_counts = self.station_cum[region_index][end + 1] - self.station_cum[region_index][start]
+        active = np.flatnonzero(station_counts.any(axis=1))
+        record["station_ids"] = self.station_ids[region_index][active]
+        record["boarding"] = station_counts[active, 0].astype(np.int32)
+        record["alighting"] = station_counts[active, 1].astype(np.int32)
+
+        od_values = [np.asarray(days[start:end + 1].sum(axis=0)).ravel() for days in self.od_days[region_index]]
+        active = np.flatnonzero(od_values[0])
+        origins, destinations = self.od_pairs[region_index]
+        record["od_pairs"] = np.stack([origins[active], destinations[active]]).astype(np.int32)
+        for field, values, dtype in zip(OD_FIELDS, od_values, OD_DTYPES):
+            record[field] = od_matrix(origins[active], destinations[active], values[active], self.catalog.n_names, dtype)
+
+        return DayAggregate(record, has_data=bool(span(self.category_cum["operation_type"]).sum()))
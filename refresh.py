@@ -0,0 +1,113 @@
+import os
+import logging
+import argparse
+import tempfile
+
+import numpy as np
+
+from ingest import load_area_data, load_history_frame, read_history_frame, aggregate_history_tables, merge_tables
+
+
+# 운행내역 CSV 증분 수집기 (마지막으로 읽은 위치 이후 추가된 완결 행만 집계)
+class HistoryFeed:
+    def __init__(self, history_file, service_area, offset=0, encoding='cp949'):
+        self.history_file = history_file
+        self.service_area = service_area
+        self.offset = offset
+        self.encoding = encoding
+
+    # 파일이 마지막으로 읽은 위치보다 작아졌으면 (교체, 잘림) 전체를 다시 읽어야 함
+    def truncated(self):
+        try:
+            return os.path.getsize(self.history_file) < self.offset
+        except FileNotFoundError:
+            return False
+
+    # 추가된 행의 (집계 테이블, 새 위치) (추가된 완결 행이 없으면 None)
+    # 위치는 옮기지 않으므로 반영이 모두 끝난 뒤 호출한 쪽에서 offset에 대입
+    def poll(self):
+        try:
+            if os.path.getsize(self.history_file) <= self.offset:
+                return None
+        except FileNotFoundError:
+            return None
+        trips, offset = read_history_frame(self.history_file, self.service_area, self.offset, self.encoding)
+        if offset == self.offset:
+            return None
+        logging.info(f"{len(trips)} new trips appended to {self.history_file}.")
+        return aggregate_history_tables(trips), offset
+
+
+# 집계 테이블에 추가분 합치기 (처음이면 추가분 그대로)
+def append_tables(tables, new_tables):
+    return new_tables if tables is None else merge_tables(tables, new_tables)
+
+
+# 두 집계 테이블이 같은지 비교 (컬럼 순서 무관, 실수 컬럼은 합산 순서에 따른 오차 허용, 다른 테이블명 반환)
+def diff_tables(tables, expected):
+    different = []
+    for name, table in expected.items():
+        other = tables[name]
+        if sorted(table.columns) != sorted(other.columns) or len(table) != len(other):
+            different.append(name)
+            continue
+        for column in table.columns:
+            a, b = table[column].to_numpy(), other[column].to_numpy()
+            same = np.allclose(a, b, rtol=1e-9, equal_nan=True) if a.dtype.kind == 'f' else (a == b).all()
+            if not same:
+                different.append(name)
+                break
+    return different
+
+
+# 운행내역 바이트를 parts번에 나눠 쓸 끝 위치 (마지막을 뺀 나머지는 모두 행 가운데)
+def append_cuts(data, parts):
+    starts = np.concatenate([[0], np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == ord('\n')) + 1])
+    if starts[-1] == len(data):
+        starts = starts[:-1]
+    ends = np.append(starts[1:], len(data))
+    rows = np.arange(1, parts) * len(starts) // parts
+    cuts = starts[rows] + (ends[rows] - starts[rows]) // 2
+    return cuts.tolist() + [len(data)]
+
+
+# 운행내역을 parts번에 나눠 (행 중간에서 끊기도록) 이어 쓰면서 증분 수집한 결과와 한 번에 집계한 결과 비교
+def verify_appends(history_file, service_area, parts):
+    with open(history_file, 'rb') as f:
+        data = f.read()
+    expected = aggregate_history_tables(load_history_frame(history_file, service_area))
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, os.path.basename(history_file))
+        feed = HistoryFeed(path, service_area)
+        tables = None
+        start = 0
+        for end in append_cuts(data, parts):
+            with open(path, 'ab') as f:
+                f.write(data[start:end])
+            start = end
+            polled = feed.poll()
+            if polled is not None:
+                new_tables, feed.offset = polled
+                tables = append_tables(tables, new_tables)
+    return diff_tables(tables, expected)
+
+
+# 증분 수집 검증: python refresh.py --verify 5
+def main():
+    data_input_dir = os.path.join('input', '01 data')
+    parser = argparse.ArgumentParser(description="운행내역 증분 수집 검증 (N번 나눠 추가 == 한 번에 집계)")
+    parser.add_argument('--history', default=os.path.join(data_input_dir, 'DRT운행내역(통합).csv'))
+    parser.add_argument('--area', default=os.path.join(data_input_dir, '지역별 중심점.csv'))
+    parser.add_argument('--verify', type=int, default=5, help="나눠 추가할 횟수")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    service_area, _ = load_area_data(args.area)
+    different = verify_appends(args.history, service_area, args.verify)
+    print(f"{args.verify} appends: " + ("identical to full load" if not different else f"differs in {different}"))
+    raise SystemExit(1 if different else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+import os
+import json
+import hashlib
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse import csgraph
+from scipy.spatial import cKDTree
+
+from ingest import load_area_data, load_region_stations
+
+# 도로망 최단 시간 행렬 설정
+ROAD_TIMES_VERSION = 1
+road_graph_file = os.path.join('input', '03 road', 'road_network.graphml')
+road_times_file = os.path.join('cache', 'road_times.npz')
+DEFAULT_SPEED = 30.0        # 속도, 소요 시간 속성이 없는 도로의 주행 속도 (km/h)
+SNAP_DISTANCE = 300.0       # 정류장 → 가장 가까운 도로 노드 허용 거리 (m, 넘으면 도로망 밖 정류장으로 보고 제외)
+SOURCES_PER_TASK = 32       # 프로세스 작업 하나에서 탐색할 출발 노드 수
+EARTH_RADIUS = 6371008.8    # m
+
+
+# 위도/경도 → 기준 위도의 등장방형 평면 좌표 (m, 지역 규모에서 가까운 노드 찾기용)
+def _project(lats, lons, lat0):
+    lats, lons = np.radians(np.asarray(lats, dtype=float)), np.radians(np.asarray(lons, dtype=float))
+    return np.column_stack([lons * np.cos(np.radians(lat0)) * EARTH_RADIUS, lats * EARTH_RADIUS])
+
+
+def _float(value, default=np.nan):
+    try:
+        return float(str(value).split(',')[0].strip('[] \''))   # osmnx는 병합된 도로의 값을 목록 문자열로 저장
+    except (TypeError, ValueError):
+        return default
+
+
+# 입력 파일의 크기, 수정 시각
+def file_fingerprint(file_path):
+    try:
+        stat = os.stat(file_path)
+        return f"{file_path}:{stat.st_size}:{stat.st_mtime_ns}"
+    except FileNotFoundError:
+        return f"{file_path}:missing"
+
+
+# GraphML 도로망 → (노드 간 소요 시간(초) CSR 행렬, 노드 위도, 노드 경도)
+# 소요 시간은 travel_time, 없으면 length / speed_kph, 속도도 없으면 DEFAULT_SPEED로 계산
+# (osmnx로 저장한 그래프와 x/y 좌표만 있는 일반 GraphML 모두 지원, 방향이 없는 그래프는 양방향으로 추가)
+def load_road_graph(file_path):
+    import networkx as nx
+
+    graph = nx.read_graphml(file_path)
+    nodes = {node: i for i, node in enumerate(graph.nodes)}
+    lats = np.array([_float(data.get('y')) for _, data in graph.nodes(data=True)])
+    lons = np.array([_float(data.get('x')) for _, data in graph.nodes(data=True)])
+
+    rows, cols, seconds = [], [], []
+    for u, v, data in graph.edges(data=True):
+        rows.append(nodes[u])
+        cols.append(nodes[v])
+        seconds.append(_float(data.get('travel_time')))
+        if np.isnan(seconds[-1]):
+            length = _float(data.get('length'))
+            speed = _float(data.get('speed_kph'), DEFAULT_SPEED)
+            seconds[-1] = length / (speed if speed > 0 else DEFAULT_SPEED) * 3.6
+    rows, cols, seconds = np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64), np.array(seconds)
+
+    # 길이 속성이 없는 도로는 양 끝 노드의 직선거리로 계산
+    missing = np.isnan(seconds)
+    if missing.any():
+        points = _project(lats, lons, np.nanmean(lats))
+        seconds[missing] = np.hypot(*(points[rows[missing]] - points[cols[missing]]).T) / DEFAULT_SPEED * 3.6
+    if not graph.is_directed():
+        rows, cols, seconds = np.concatenate([rows, cols]), np.concatenate([cols, rows]), np.tile(seconds, 2)
+
+    # 평행 도로는 가장 빠른 것만 (CSR 생성 시 중복 항목이 합산되지 않도록), 0초 도로는 탐색에서 빠지지 않도록 최소값
+    order = np.lexsort([seconds, cols, rows])
+    first = np.concatenate([[True], np.diff(rows[order] * len(nodes) + cols[order]) != 0]) if len(order) else \
+        np.empty(0, dtype=bool)
+    order = order[first]
+    matrix = sparse.csr_matrix((np.maximum(seconds[order], 1e-3), (rows[order], cols[order])),
+                               shape=(len(nodes), len(nodes)))
+    logging.info(f"Road graph {file_path}: {len(nodes)} nodes, {len(order)} edges.")
+    return matrix, lats, lons
+
+
+# 지역별 행렬 키 (도로망 파일, 설정, 정류장 목록이 같으면 다시 계산하지 않음)
+def region_key(graph_fingerprint, stations):
+    digest = hashlib.sha1(f"v{ROAD_TIMES_VERSION}:{graph_fingerprint}:{SNAP_DISTANCE}:{DEFAULT_SPEED}".encode())
+    digest.update(json.dumps(stations, ensure_ascii=False).encode())
+    return digest.hexdigest()
+
+
+# 워커 프로세스별 도로망 (작업마다 행렬을 보내지 않도록 시작할 때 한 번만 받음)
+_graph = None
+
+
+def _init_worker(graph):
+    global _graph
+    _graph = graph
+
+
+# 워커: 출발 노드 묶음 → 도착 노드들까지의 최단 시간 (초, 출발 노드 수 × 도착 노드 수)
+def _shortest_times(sources, targets):
+    return csgraph.dijkstra(_graph, directed=True, indices=sources)[:, targets]
+
+
+# 정류장 → 가장 가까운 도로 노드 번호 (SNAP_DISTANCE 밖이면 -1)
+def snap_stations(stations, tree, nodes, lat0):
+    if not stations:
+        return np.empty(0, dtype=np.int64)
+    _, lat_values, lon_values = zip(*stations)
+    distances, positions = tree.query(_project(lat_values, lon_values, lat0), distance_upper_bound=SNAP_DISTANCE)
+    found = np.isfinite(distances)
+    return np.where(found, nodes[np.where(found, positions, 0)], -1)
+
+
+# 정류장 간 최단 시간 (분) → 정류장명 간 최단 시간 (이름이 같은 정류장이 여럿이면 가장 짧은 값, 도달 불가는 inf)
+def name_matrix(stations, station_minutes):
+    names, codes = np.unique([name for name, _, _ in stations], return_inverse=True)
+    minutes = np.full((len(names), len(names)), np.inf)
+    np.minimum.at(minutes, (codes[:, None], codes[None, :]), station_minutes)
+    return names.tolist(), minutes
+
+
+# 지역별 정류장 간 최단 시간 행렬 계산 (지역별 고유 노드를 출발지로 묶어 프로세스 풀에서 다중 출발 탐색)
+def compute_road_times(graph, lats, lons, region_stations, workers=1):
+    valid = np.isfinite(lats) & np.isfinite(lons)
+    lat0 = float(np.mean(lats[valid])) if valid.any() else 0.0
+    tree = cKDTree(_project(lats[valid], lons[valid], lat0))
+
+    snapped = {}
+    tasks = []
+    for region, stations in region_stations.items():
+        snap = snap_stations(stations, tree, np.flatnonzero(valid), lat0)
+        targets = np.unique(snap[snap >= 0])
+        snapped[region] = snap, targets
+        tasks += [(region, targets[i:i + SOURCES_PER_TASK], targets) for i in range(0, len(targets), SOURCES_PER_TASK)]
+        if (snap < 0).any():
+            logging.warning(f"{region}: {int((snap < 0).sum())} of {len(snap)} stations are farther than "
+                            f"{SNAP_DISTANCE:.0f} m from the road network.")
+
+    if workers <= 1:
+        _init_worker(graph)
+        results = [_shortest_times(sources, targets) for _, sources, targets in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(graph,)) as pool:
+            futures = [pool.submit(_shortest_times, sources, targets) for _, sources, targets in tasks]
+            results = [future.result() for future in futures]
+
+    node_seconds = {region: [] for region in region_stations}
+    for (region, _, _), seconds in zip(tasks, results):
+        node_seconds[region].append(seconds)
+
+    road_times = {}
+    for region, stations in region_stations.items():
+        snap, targets = snapped[region]
+        seconds = np.vstack(node_seconds[region]) if node_seconds[region] else np.empty((0, 0))
+        positions = np.searchsorted(targets, snap)
+        station_minutes = np.full((len(snap), len(snap)), np.inf)
+        ok = np.flatnonzero(snap >= 0)
+        station_minutes[np.ix_(ok, ok)] = seconds[np.ix_(positions[ok], positions[ok])] / 60
+        road_times[region] = name_matrix(stations, station_minutes)
+    logging.info(f"Road times computed for {len(region_stations)} regions in {len(tasks)} tasks by {workers} workers.")
+    return road_times
+
+
+# 저장된 행렬 로드 ({지역명: (키, 정류장명 목록, 분 행렬)}, 파일이 없거나 읽을 수 없으면 빈 사전)
+def read_road_times(file_path=road_times_file):
+    try:
+        with np.load(file_path, allow_pickle=False) as npz:
+            meta = json.loads(str(npz["__meta__"]))
+            if meta["version"] != ROAD_TIMES_VERSION:
+                return {}
+            return {region: (entry["key"], entry["names"], npz[f"{region}/minutes"])
+                    for region, entry in meta["regions"].items()}
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logging.warning(f"Road times {file_path} could not be read: {e}")
+        return {}
+
+
+# 행렬 저장 (임시 파일에 쓴 뒤 교체)
+def save_road_times(entries, file_path=road_times_file):
+    os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+    meta = {"version": ROAD_TIMES_VERSION,
+            "regions": {region: {"key": key, "names": names} for region, (key, names, _) in entries.items()}}
+    temp_path = f"{file_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        np.savez(f, __meta__=np.array(json.dumps(meta, ensure_ascii=False)),
+                 **{f"{region}/minutes": minutes.astype(np.float32) for region, (_, _, minutes) in entries.items()})
+    os.replace(temp_path, file_path)
+    logging.info(f"Road times saved to {file_path}.")
+
+
+# 도로망 파일이나 정류장 목록이 바뀐 지역만 다시 계산하여 저장 (다시 계산한 지역 목록 반환)
+def build_road_times(graph_file, station_file, area_file, file_path=road_times_file, workers=1, force=False):
+    service_area, _ = load_area_data(area_file)
+    region_stations = load_region_stations(station_file, service_area)
+    graph_fingerprint = file_fingerprint(graph_file)
+    keys = {region: region_key(graph_fingerprint, stations) for region, stations in region_stations.items()}
+
+    saved = read_road_times(file_path)
+    stale = [region for region, key in keys.items() if force or saved.get(region, (None,))[0] != key]
+    entries = {region: entry for region, entry in saved.items() if region in keys and region not in stale}
+    if stale:
+        graph, lats, lons = load_road_graph(graph_file)
+        computed = compute_road_times(graph, lats, lons, {region: region_stations[region] for region in stale},
+                                      workers)
+        entries.update({region: (keys[region],) + computed[region] for region in stale})
+    if stale or set(entries) != set(saved):
+        save_road_times(entries, file_path)
+    return stale
+
+
+# 정류장명 쌍 → 도로망 최단 시간 조회 (대시보드용, 그래프 탐색 없이 저장된 행렬에서 바로 찾음)
+class RoadTimes:
+    def __init__(self, entries):
+        self._names = {region: {name: i for i, name in enumerate(names)} for region, (_, names, _) in entries.items()}
+        self._minutes = {region: minutes for region, (_, _, minutes) in entries.items()}
+
+    def __len__(self):
+        return len(self._minutes)
+
+    # 기점 → 종점 최단 시간 (분, 정류장이 도로망에 없거나 도달할 수 없으면 None)
+    def minutes(self, region, origin, destination):
+        names = self._names.get(region)
+        if names is None or origin not in names or destination not in names:
+            return None
+        value = float(self._minutes[region][names[origin], names[destination]])
+        return value if 0 < value < np.inf else None
+
+
+# 저장된 행렬 → RoadTimes (파일이 없으면 None)
+def load_road_times(file_path=road_times_file):
+    entries = read_road_times(file_path)
+    if not entries:
+        return None
+    logging.info(f"Road times loaded from {file_path} ({len(entries)} regions).")
+    return RoadTimes(entries)
+
+
+# 배포 전 도로망 최단 시간 행렬 생성: python road_network.py [--graph 도로망.graphml] [--workers 4]
+def main():
+    data_input_dir = os.path.join('input', '01 data')
+    parser = argparse.ArgumentParser(description="정류장 간 도로망 최단 시간 행렬 생성 (우회율 분석용)")
+    parser.add_argument('--graph', default=road_graph_file, help="도로망 GraphML (osmnx.save_graphml 등으로 미리 저장)")
+    parser.add_argument('--stations', default=os.path.join(data_input_dir, 'DRT정류장(통합).csv'))
+    parser.add_argument('--area', default=os.path.join(data_input_dir, '지역별 중심점.csv'))
+    parser.add_argument('--output', default=road_times_file)
+    parser.add_argument('--force', action='store_true', help="행렬이 유효해도 다시 계산")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="탐색 프로세스 수")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    stale = build_road_times(args.graph, args.stations, args.area, args.output, args.workers, args.force)
+    logging.info(f"{len(stale)} regions recomputed: {', '.join(stale) if stale else '-'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+import os
+import io
+import json
+import hashlib
+import logging
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from ingest import load_area_data, load_history_frame, aggregate_history_tables, zone_files
+from parallel_ingest import read_history_tables
+
+# 집계 스냅샷 설정
+SNAPSHOT_VERSION = 7
+snapshot_dir = 'cache'
+snapshot_file = os.path.join(snapshot_dir, 'aggregates.npz')
+
+
+# 입력 CSV의 크기, 수정 시각으로 스냅샷 키 생성
+def input_fingerprint(file_paths):
+    digest = hashlib.sha256(f"v{SNAPSHOT_VERSION}".encode())
+    for file_path in file_paths:
+        try:
+            stat = os.stat(file_path)
+            digest.update(f"{file_path}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        except FileNotFoundError:
+            digest.update(f"{file_path}:missing".encode())
+    return digest.hexdigest()
+
+
+# 집계 테이블 → 컬럼 배열 (문자열 컬럼은 코드 + 고유값 사전으로 저장)
+def _encode_tables(tables):
+    arrays = {}
+    for name, table in tables.items():
+        for column in table.columns:
+            values = table[column]
+            key = f"{name}/{column}"
+            if values.dtype == object:
+                codes, uniques = pd.factorize(values)
+                arrays[f"{key}/codes"] = codes.astype(np.int32)
+                arrays[f"{key}/uniques"] = np.array(list(uniques), dtype=str)
+            else:
+                arrays[key] = values.to_numpy()
+    return arrays
+
+
+def _decode_tables(arrays, layout):
+    tables = {}
+    for name, columns in layout.items():
+        data = {}
+        for column in columns:
+            key = f"{name}/{column}"
+            if f"{key}/codes" in arrays:
+                uniques = arrays[f"{key}/uniques"].astype(object)
+                data[column] = uniques[arrays[f"{key}/codes"]] if len(uniques) else np.empty(0, dtype=object)
+            else:
+                data[column] = arrays[key]
+        tables[name] = pd.DataFrame(data, columns=columns)
+    return tables
+
+
+# 스냅샷 저장 (임시 파일에 쓴 뒤 교체하여 동시에 읽는 워커가 깨진 파일을 보지 않도록 함)
+# offset: 집계에 반영된 운행내역 CSV의 마지막 위치 (이후 추가된 행은 증분 수집)
+def save_snapshot(tables, fingerprint, offset, file_path=snapshot_file):
+    os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+    meta = {"version": SNAPSHOT_VERSION, "fingerprint": fingerprint, "offset": offset,
+            "layout": {name: list(table.columns) for name, table in tables.items()}}
+    buffer = io.BytesIO()
+    np.savez(buffer, __meta__=np.array(json.dumps(meta, ensure_ascii=False)), **_encode_tables(tables))
+
+    temp_path = f"{file_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(buffer.getvalue())
+    os.replace(temp_path, file_path)
+    logging.info(f"Snapshot saved to {file_path}.")
+
+
+# 스냅샷 로드 (테이블, offset 반환, 키가 다르거나 파일이 없으면 None)
+def load_snapshot(fingerprint, file_path=snapshot_file):
+    try:
+        with np.load(file_path, allow_pickle=False) as npz:
+            meta = json.loads(str(npz["__meta__"]))
+            if meta["version"] != SNAPSHOT_VERSION or meta["fingerprint"] != fingerprint:
+                logging.info(f"Snapshot {file_path} is stale.")
+                return None
+            arrays = {key: npz[key] for key in npz.files if key != "__meta__"}
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.warning(f"Snapshot {file_path} could not be read: {e}")
+        return None
+    logging.info(f"Snapshot loaded from {file_path}.")
+    return _decode_tables(arrays, meta["layout"]), meta["offset"]
+
+
+def try_save_snapshot(tables, fingerprint, offset, file_path=snapshot_file):
+    try:
+        save_snapshot(tables, fingerprint, offset, file_path)
+    except OSError as e:
+        logging.warning(f"Snapshot could not be saved to {file_path}: {e}")
+
+
+# 유효한 스냅샷이 있으면 로드하고, 입력 파일이 바뀌었으면 다시 집계하여 저장 (테이블, 스냅샷 키, offset 반환)
+# workers: 다시 집계할 때 사용할 프로세스 수
+def load_or_build_tables(history_file, area_file, service_area, file_path=snapshot_file, force=False, workers=1):
+    fingerprint = input_fingerprint([history_file, area_file] + zone_files())
+    snapshot = None if force else load_snapshot(fingerprint, file_path)
+    if snapshot is not None:
+        return snapshot[0], fingerprint, snapshot[1]
+
+    try:
+        tables, offset = read_history_tables(history_file, service_area, workers)
+    except FileNotFoundError:
+        logging.error(f"{history_file} 파일을 찾을 수 없습니다.")
+        tables, offset = aggregate_history_tables(load_history_frame(history_file, service_area)), 0
+    try_save_snapshot(tables, fingerprint, offset, file_path)
+    return tables, fingerprint, offset
+
+
+# 배포 전 스냅샷 생성: python snapshot.py [--force]
+def main():
+    data_input_dir = os.path.join('input', '01 data')
+    parser = argparse.ArgumentParser(description="DRT 운행내역 집계 스냅샷 생성")
+    parser.add_argument('--history', default=os.path.join(data_input_dir, 'DRT운행내역(통합).csv'))
+    parser.add_argument('--area', default=os.path.join(data_input_dir, '지역별 중심점.csv'))
+    parser.add_argument('--output', default=snapshot_file)
+    parser.add_argument('--force', action='store_true', help="스냅샷이 유효해도 다시 집계")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="집계 프로세스 수")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    service_area, _ = load_area_data(args.area)
+    tables, _, _ = load_or_build_tables(args.history, args.area, service_area, args.output, force=args.force,
+                                        workers=args.workers)
+    logging.info(f"{len(tables['days'])} region/date aggregates in {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+import os
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+from haversine import haversine_vector, Unit
+
+ZONE_LABELS = ("구역 외", "그린존", "레드존")    # 구역 코드 0, 1, 2 (그린존과 레드존이 겹치면 레드존)
+ZONE_CODES = {"그린존": 1, "레드존": 2}
+MAP_CRS = "EPSG:4326"
+NO_COORD = -999.0   # 좌표가 없는 끝점 (어느 구역에도 속하지 않음)
+MAX_SPEED = 120.0   # 운행 속도 상한 (km/h, 넘으면 이동시간 기록 오류로 보고 속도 집계에서 제외)
+
+
+# 기점-종점 대권거리 (km), 운행 속도 (km/h) (좌표나 이동시간이 없거나 속도가 상한을 넘으면 NaN)
+def trip_distance_speed(o_lats, o_lons, d_lats, d_lons, travel_minutes):
+    origins = np.column_stack([np.asarray(o_lats, dtype=float), np.asarray(o_lons, dtype=float)])
+    destinations = np.column_stack([np.asarray(d_lats, dtype=float), np.asarray(d_lons, dtype=float)])
+    distance = haversine_vector(origins, destinations, Unit.KILOMETERS, check=False)
+    travel = np.asarray(travel_minutes, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        speed = distance / travel * 60
+    speed[~((travel > 0) & (speed <= MAX_SPEED))] = np.nan
+    return distance, speed
+
+
+# 지역별 그린존/레드존 폴리곤 공간 인덱스 (shapely 2 STRtree, 첫 조회 시 shapefile 로드)
+# 운행 끝점은 정류장 좌표가 반복되므로 (지역, 위도, 경도)별 결과를 보관하여 처음 보는 좌표만 검사함
+class ZoneIndex:
+    def __init__(self, shapefiles_of):
+        self.shapefiles_of = shapefiles_of   # 지역 → {구역명: shapefile 경로}
+        self._trees = {}
+        self._codes = {}
+        self._lock = threading.Lock()
+
+    def _load(self, region):
+        import shapely
+        import geopandas as gpd
+
+        geometries, codes = [], []
+        for name, path in self.shapefiles_of(region).items():
+            if name not in ZONE_CODES or not path or not os.path.exists(path):
+                continue
+            try:
+                gdf = gpd.read_file(path)
+            except Exception as e:
+                logging.warning(f"Zone {path} could not be read: {e}")
+                continue
+            if gdf.crs is None:
+                gdf = gdf.set_crs(MAP_CRS)
+            shapes = shapely.make_valid(gdf.to_crs(MAP_CRS).geometry.values)
+            shapes = shapes[~shapely.is_missing(shapes) & ~shapely.is_empty(shapes)]
+            geometries.extend(shapes)
+            codes.extend([ZONE_CODES[name]] * len(shapes))
+        if not geometries:
+            return None
+        return shapely.STRtree(geometries), np.array(codes, dtype=np.int8)
+
+    def _tree(self, region):
+        if region not in self._trees:
+            self._trees[region] = self._load(region)
+        return self._trees[region]
+
+    # 좌표 → 구역 코드 (STRtree로 후보 폴리곤을 찾고 포함 여부를 배열 단위로 검사)
+    def classify(self, region, lats, lons):
+        import shapely
+
+        codes = np.zeros(len(lats), dtype=np.int8)
+        entry = self._tree(region)
+        if entry is None or not len(codes):
+            return codes
+        tree, zone_codes = entry
+        points, shapes = tree.query(shapely.points(lons, lats), predicate='intersects')
+        np.maximum.at(codes, points, zone_codes[shapes])
+        return codes
+
+    # 운행 끝점 → 구역 코드 (고유 좌표만 처음 한 번 검사, 이후 청크, 추가분에서는 보관된 결과 사용)
+    def codes_of(self, regions, lats, lons):
+        lats = np.nan_to_num(np.asarray(lats, dtype=float), nan=NO_COORD)
+        lons = np.nan_to_num(np.asarray(lons, dtype=float), nan=NO_COORD)
+        if not len(lats):
+            return np.empty(0, dtype=np.int8)
+        # (지역, 위도, 경도) 고유값 (컬럼별 코드를 하나의 정수 키로 묶어 한 번에 factorize)
+        region_codes, region_values = pd.factorize(np.asarray(regions, dtype=object))
+        lat_codes, lat_values = pd.factorize(lats)
+        lon_codes, lon_values = pd.factorize(lons)
+        codes, keys = pd.factorize((region_codes.astype(np.int64) * len(lat_values) + lat_codes) * len(lon_values)
+                                   + lon_codes)
+        keys, lon_index = np.divmod(keys, len(lon_values))
+        region_index, lat_index = np.divmod(keys, len(lat_values))
+        uniques = list(zip(np.asarray(region_values, dtype=object)[region_index].tolist(),
+                           lat_values[lat_index].tolist(), lon_values[lon_index].tolist()))
+        with self._lock:
+            missing = {}
+            for key in uniques:
+                if key not in self._codes:
+                    missing.setdefault(key[0], []).append(key)
+            for region, keys in missing.items():
+                _, key_lats, key_lons = map(np.array, zip(*keys))
+                self._codes.update(zip(keys, self.classify(region, key_lats, key_lons).tolist()))
+            zones = np.array([self._codes[key] for key in uniques], dtype=np.int8)
+        return zones[codes]
@@ -0,0 +1,66 @@
+import sys
+import json
+import time
+import logging
+import argparse
+import importlib
+from contextlib import contextmanager
+
+
+# 부팅 단계별 소요 시간 기록 (import, CSV 읽기, 집계, 레이아웃 구성 등)
+class StartupTimer:
+    def __init__(self, started=None):
+        self.started = time.perf_counter() if started is None else started
+        self.phases = []    # (단계명, 초)
+        self._last = self.started
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._last = time.perf_counter()
+            self.phases.append((name, self._last - started))
+
+    # 직전 기록 이후 경과 시간을 한 단계로 기록 (모듈 import처럼 with로 감싸기 어려운 구간용)
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    @property
+    def total(self):
+        return self._last - self.started
+
+    def as_dict(self):
+        return {"phases": {name: round(seconds, 4) for name, seconds in self.phases}, "total": round(self.total, 4)}
+
+    def report(self):
+        width = max([len(name) for name, _ in self.phases] + [5])
+        lines = [f"{name:<{width}} {seconds:8.3f}s {seconds / self.total * 100 if self.total else 0:5.1f}%"
+                 for name, seconds in self.phases]
+        return "\n".join(lines + [f"{'total':<{width}} {self.total:8.3f}s"])
+
+
+# 부팅 시간 측정: python startup.py [--json startup.json] [--max-seconds 10]
+def main():
+    parser = argparse.ArgumentParser(description="대시보드 부팅 단계별 소요 시간 보고")
+    parser.add_argument('--module', default='my_app', help="부팅할 앱 모듈 (모듈의 startup_timer를 보고)")
+    parser.add_argument('--json', help="단계별 소요 시간을 저장할 JSON 파일")
+    parser.add_argument('--max-seconds', type=float, help="전체 부팅 시간 한도 (넘으면 종료 코드 1)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    timer = importlib.import_module(args.module).startup_timer
+    print(timer.report())
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(timer.as_dict(), f, ensure_ascii=False, indent=2)
+    if args.max_seconds is not None and timer.total > args.max_seconds:
+        print(f"Startup took {timer.total:.3f}s (limit {args.max_seconds:.3f}s)", file=sys.stderr)
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
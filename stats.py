@@ -0,0 +1,124 @@
+import math
+
+import numpy as np
+
+
+# 건수/합/제곱합 누적 통계 (합치기 가능, 크기 고정)
+class RunningStats:
+    __slots__ = ("count", "total", "total_sq")
+
+    def __init__(self, count=0, total=0.0, total_sq=0.0):
+        self.count = count
+        self.total = total
+        self.total_sq = total_sq
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.total_sq += value * value
+
+    def add_many(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        self.count += int(values.size)
+        self.total += float(values.sum())
+        self.total_sq += float(np.square(values).sum())
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.total_sq += other.total_sq
+        return self
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        if self.count < 2:
+            return 0.0
+        variance = (self.total_sq - self.total * self.total / self.count) / (self.count - 1)
+        return math.sqrt(max(variance, 0.0))
+
+    def __eq__(self, other):
+        return isinstance(other, RunningStats) and \
+            (self.count, self.total, self.total_sq) == (other.count, other.total, other.total_sq)
+
+    def __repr__(self):
+        return f"RunningStats(count={self.count}, mean={self.mean:.2f})"
+
+
+# 로그 구간 분위수 스케치 (상대오차 alpha, 구간 수 상한 고정, 합치기 가능)
+# 구간 0은 min_value 이하, 구간 k는 (min_value * gamma^(k-1), min_value * gamma^k]
+class QuantileSketch:
+    __slots__ = ("bins", "count")
+
+    alpha = 0.02
+    gamma = (1 + alpha) / (1 - alpha)
+    min_value = 1 / 60        # 1초 (분 단위)
+    max_value = 24 * 60       # 하루 (분 단위)
+    max_key = math.ceil(math.log(max_value / min_value) / math.log(gamma))
+
+    def __init__(self, bins=None):
+        self.bins = dict(bins) if bins else {}
+        self.count = sum(self.bins.values())
+
+    @classmethod
+    def keys_of(cls, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        keys = np.ceil(np.log(np.maximum(values, cls.min_value) / cls.min_value) / math.log(cls.gamma))
+        return np.clip(keys, 0, cls.max_key).astype(np.int64)
+
+    def add(self, value):
+        self.add_many([value])
+
+    def add_many(self, values):
+        keys, counts = np.unique(self.keys_of(values), return_counts=True)
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            self.bins[key] = self.bins.get(key, 0) + count
+            self.count += count
+
+    def add_bins(self, keys, counts):
+        for key, count in zip(keys, counts):
+            self.bins[int(key)] = self.bins.get(int(key), 0) + int(count)
+            self.count += int(count)
+
+    def merge(self, other):
+        self.add_bins(other.bins.keys(), other.bins.values())
+        return self
+
+    def value_of(self, key):
+        if key == 0:
+            return 0.0
+        return self.min_value * 2 * self.gamma ** key / (self.gamma + 1)
+
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                return self.value_of(key)
+        return self.value_of(max(self.bins))
+
+    def quantiles(self, qs=(0.5, 0.9, 0.95)):
+        return [self.quantile(q) for q in qs]
+
+    # 행별 키 구간 건수 배열 (행 × 키) → 행별 q 분위수 (quantile과 같은 규칙을 배열 단위로, 건수가 없는 행은 0)
+    @classmethod
+    def quantile_of_bins(cls, bins, q):
+        bins = np.asarray(bins)
+        counts = bins.sum(axis=1)
+        keys = np.argmax(np.cumsum(bins, axis=1) > (q * (counts - 1))[:, None], axis=1)
+        values = np.where(keys == 0, 0.0, cls.min_value * 2 * cls.gamma ** keys / (cls.gamma + 1))
+        return np.where(counts > 0, values, 0.0)
+
+    def __eq__(self, other):
+        return isinstance(other, QuantileSketch) and self.bins == other.bins
+
+    def __repr__(self):
+        return f"QuantileSketch(count={self.count}, bins={len(self.bins)})"
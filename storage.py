@@ -0,0 +1,577 @@
+import os
+import math
+import queue
+import hashlib
+import logging
+import argparse
+import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit, unquote
+
+import numpy as np
+import pandas as pd
+
+from ingest import (HOURS, HOUR_METRICS, WAIT_EDGES, ZONE_METRICS, load_area_data, load_history_frame,
+                    aggregate_history_tables, zone_files, zone_index)
+from spatial import trip_distance_speed
+from stats import QuantileSketch
+from snapshot import SNAPSHOT_VERSION, input_fingerprint, load_or_build_tables, try_save_snapshot
+from refresh import HistoryFeed, diff_tables
+
+# 운행내역 테이블 (집계에 필요한 컬럼만 타입을 맞춰 저장, id는 적재 순서)
+TRIP_TABLE = "drt_trips"
+TRIP_COLUMNS = [
+    ("area", "VARCHAR(16)"),
+    ("service_date", "VARCHAR(10)"),        # 'YYYY-MM-DD'
+    ("operation_type", "VARCHAR(32)"),
+    ("call_type", "VARCHAR(32)"),           # 괄호 앞부분 (예: '앱')
+    ("adult", "INTEGER"),
+    ("teen", "INTEGER"),
+    ("children", "INTEGER"),
+    ("in_hour", "INTEGER"),                 # 승차 시각의 시, 없으면 NULL
+    ("waiting_minutes", "DOUBLE PRECISION"),
+    ("travel_minutes", "DOUBLE PRECISION"),
+    ("o_name", "VARCHAR(128)"),
+    ("d_name", "VARCHAR(128)"),
+    ("o_lat", "DOUBLE PRECISION"),
+    ("o_lon", "DOUBLE PRECISION"),
+    ("d_lat", "DOUBLE PRECISION"),
+    ("d_lon", "DOUBLE PRECISION"),
+    ("distance_km", "DOUBLE PRECISION"),    # 끝점 직선거리, 좌표가 없으면 NULL (적재 시 계산)
+    ("speed_kmh", "DOUBLE PRECISION"),      # 직선거리 / 이동시간, 집계 대상이 아니면 NULL (적재 시 계산)
+]
+DERIVED_COLUMNS = ["distance_km", "speed_kmh"]
+ID_COLUMN = {
+    "sqlite": "id INTEGER PRIMARY KEY AUTOINCREMENT",
+    "mysql": "id BIGINT PRIMARY KEY AUTO_INCREMENT",
+}
+PLACEHOLDER = {"sqlite": "?", "mysql": "%s"}
+# 연결별 임시 테이블 (LAG_WINDOW 창에서 고른 id를 IN 목록 대신 넣어 두고 결합)
+TEMP_TABLE = {"sqlite": "CREATE TEMP TABLE IF NOT EXISTS {name} (id INTEGER PRIMARY KEY)",
+              "mysql": "CREATE TEMPORARY TABLE IF NOT EXISTS {name} (id BIGINT PRIMARY KEY)"}
+LEAST = {"sqlite": "MIN", "mysql": "LEAST"}     # 인자 여러 개의 최솟값 (SQLite는 MIN이 스칼라 함수로도 동작)
+
+DB_POOL_SIZE = 4        # 프로세스별 최대 동시 연결 수
+FETCH_SIZE = 10000      # 서버 측 커서에서 한 번에 가져오는 행 수
+LAG_WINDOW = 1000       # 늦게 커밋될 수 있는 최근 id 범위 (이 범위의 빈 id는 다음 poll에서 다시 확인)
+COMPLETED = '이용완료'
+
+
+# CSV 저장소: 운행내역 CSV를 (스냅샷이 없으면 병렬로) 집계하고 파일 끝에 추가된 행을 증분 수집
+class CsvBackend:
+    def __init__(self, history_file, area_file, service_area, workers=1):
+        self.history_file = history_file
+        self.area_file = area_file
+        self.service_area = service_area
+        self.workers = workers
+        self.feed = HistoryFeed(history_file, service_area)
+
+    @property
+    def offset(self):
+        return self.feed.offset
+
+    # 전체 집계 (테이블, 데이터 버전, 위치), workers를 주면 이번 집계만 해당 프로세스 수로
+    # load, poll은 위치를 옮기지 않음 (집계를 모두 반영한 뒤 commit으로 위치 확정)
+    def load(self, force=False, workers=None):
+        tables, fingerprint, offset = load_or_build_tables(self.history_file, self.area_file, self.service_area,
+                                                           force=force, workers=workers or self.workers)
+        return tables, self._version(fingerprint, offset), offset
+
+    def truncated(self):
+        return self.feed.truncated()
+
+    # 추가된 행의 (집계 테이블, 새 위치) (없으면 None)
+    def poll(self):
+        return self.feed.poll()
+
+    # 위치까지의 행이 반영되었음을 기록 (다음 poll은 이후 행부터)
+    def commit(self, position):
+        self.feed.offset = position
+
+    # 입력 파일 지문 (스냅샷 키, 스냅샷에는 위치를 함께 저장하므로 파일이 더 커져도 남은 행은 다음 poll에서 반영)
+    def fingerprint(self):
+        return input_fingerprint([self.history_file, self.area_file] + zone_files())
+
+    # 데이터 버전: 입력 파일 지문 + 반영한 위치 (파일이 그대로여도 남은 행을 반영하면 버전이 바뀜)
+    def version(self, position=None):
+        return self._version(self.fingerprint(), self.offset if position is None else position)
+
+    @staticmethod
+    def _version(fingerprint, offset):
+        return hashlib.sha256(f"{fingerprint}:{offset}".encode()).hexdigest()
+
+    # 추가분을 합친 테이블을 스냅샷으로 저장 (다음 시작 시 다시 집계하지 않도록)
+    def save(self, tables, version, position):
+        try_save_snapshot(tables, self.fingerprint(), position)
+
+    def __repr__(self):
+        return f"CsvBackend({self.history_file})"
+
+
+# 프로세스별 연결 풀 (콜백, 주기적 반영 스레드가 연결을 재사용, fork 된 워커는 부모의 연결을 쓰지 않음)
+class ConnectionPool:
+    def __init__(self, connect, size=DB_POOL_SIZE):
+        self._connect = connect
+        self._size = size
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self._size)
+
+    @contextmanager
+    def connection(self):
+        if self._pid != os.getpid():
+            self._reset()   # 부모 프로세스의 소켓은 닫지 않고 버림 (닫으면 부모 쪽 연결이 끊김)
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            except Exception:
+                self._close(conn)   # 오류가 난 연결은 상태를 알 수 없으므로 재사용하지 않음
+                raise
+            self._idle.put_nowait(conn)
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def close(self):
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+# 지역 코드별 집계 결과 → 지역별 집계 (지역 코드가 여러 개인 지역은 다시 합산, 첫 등장 순서 유지)
+def _regroup(frame, service_area, keys, values, dtypes):
+    frame = frame.assign(region=frame["area"].map(service_area).fillna('')).rename(columns={"service_date": "date"})
+    frame = frame.sort_values("first_id", kind="stable")
+    grouped = frame.groupby(["region", "date"] + keys, sort=False)[values].sum().reset_index()
+    return grouped.astype(dtypes)
+
+
+# 대기시간 분포 구간 (WAIT_EDGES 기준 searchsorted(side='right')와 같은 결과)
+def _bucket_sql(column):
+    cases = " ".join(f"WHEN {column} >= {edge:g} THEN {i + 1}" for i, edge in reversed(list(enumerate(WAIT_EDGES))))
+    return f"CASE {cases} ELSE 0 END"
+
+
+# 분위수 스케치 구간 (QuantileSketch.keys_of와 같은 식, 구간별로 줄여 받도록 DB에서 계산)
+def _sketch_key_sql(column, dialect):
+    low = repr(QuantileSketch.min_value)
+    clipped = f"CASE WHEN {column} > {low} THEN {column} ELSE {low} END"
+    key = f"CEIL(LN({clipped} / {low}) / {math.log(QuantileSketch.gamma)!r})"
+    return f"{LEAST[dialect]}({key}, {QuantileSketch.max_key})"
+
+
+# SQLite가 수학 함수 없이 빌드된 경우 (3.35 미만 등) LN, CEIL을 파이썬 함수로 등록
+def _register_math(conn):
+    try:
+        conn.execute("SELECT LN(1), CEIL(1)").fetchall()
+    except sqlite3.OperationalError:
+        conn.create_function("LN", 1, math.log, deterministic=True)
+        conn.create_function("CEIL", 1, math.ceil, deterministic=True)
+    return conn
+
+
+# SQL 저장소: 지역 코드/일자별 집계를 GROUP BY로 DB에서 수행하고 결과만 서버 측 커서로 나눠 받음
+# (id가 마지막으로 집계한 위치보다 큰 행만 읽어 증분 수집, SQLite는 같은 스키마의 로컬 대체용)
+# AUTO_INCREMENT id는 커밋 순서와 다를 수 있으므로 (MySQL에서 동시 적재 시 작은 id가 늦게 커밋됨)
+# 마지막 id 아래 LAG_WINDOW 범위의 빈 id를 기억해 두었다가 나중에 나타나면 함께 집계함
+# (LAG_WINDOW보다 더 늦게 커밋된 행은 증분에서 빠지므로 적재 트랜잭션은 짧게 유지해야 함)
+class SqlBackend:
+    def __init__(self, connect, service_area, area_file, dialect="sqlite", table=TRIP_TABLE, cursor=None,
+                 pool_size=DB_POOL_SIZE, fetch_size=FETCH_SIZE):
+        self.pool = ConnectionPool(connect, pool_size)
+        self.service_area = service_area
+        self.area_file = area_file
+        self.dialect = dialect
+        self.table = table
+        self.batch_table = f"{table}_batch"
+        self.cursor = cursor or (lambda conn: conn.cursor())
+        self.fetch_size = fetch_size
+        self.offset = 0     # 집계에 반영된 마지막 id
+        self.rows = 0       # id <= offset 인 행 수 (삭제 감지용)
+        self.gaps = ()      # offset 아래 LAG_WINDOW 범위에서 아직 커밋되지 않은 id
+
+    # 운행내역 테이블 생성 (이전 스키마의 테이블은 거리, 속도 컬럼을 추가하고 기존 행의 값을 채움)
+    def create_schema(self):
+        columns = ", ".join([ID_COLUMN[self.dialect]] + [f"{name} {sql_type}" for name, sql_type in TRIP_COLUMNS])
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {self.table} ({columns})")
+            cursor.execute(f"SELECT * FROM {self.table} WHERE 1 = 0")
+            existing = {description[0] for description in cursor.description}
+            cursor.fetchall()
+            missing = [(name, sql_type) for name, sql_type in TRIP_COLUMNS if name not in existing]
+            for name, sql_type in missing:
+                cursor.execute(f"ALTER TABLE {self.table} ADD COLUMN {name} {sql_type}")
+            cursor.close()
+            if any(name in DERIVED_COLUMNS for name, _ in missing):
+                self._fill_distances(conn)
+
+    # 거리, 속도가 비어 있는 기존 행을 id 순서로 batch_size행씩 채움
+    def _fill_distances(self, conn, batch_size=FETCH_SIZE):
+        p = PLACEHOLDER[self.dialect]
+        coords = " AND ".join(f"{name} IS NOT NULL" for name in ["o_lat", "o_lon", "d_lat", "d_lon"])
+        last = 0
+        while True:
+            legs = self._fetch(conn, f"SELECT id, o_lat, o_lon, d_lat, d_lon, travel_minutes FROM {self.table} "
+                                     f"WHERE id > {p} AND distance_km IS NULL AND {coords} "
+                                     f"ORDER BY id LIMIT {batch_size}",
+                               [last], ["id", "o_lat", "o_lon", "d_lat", "d_lon", "travel_minutes"])
+            if legs.empty:
+                return
+            distance, speed = trip_distance_speed(*(legs[column].to_numpy(dtype=float) for column in
+                                                    ["o_lat", "o_lon", "d_lat", "d_lon", "travel_minutes"]))
+            speed = [None if np.isnan(value) else value for value in speed.tolist()]
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            try:
+                cursor.executemany(f"UPDATE {self.table} SET distance_km = {p}, speed_kmh = {p} WHERE id = {p}",
+                                   list(zip(distance.tolist(), speed, legs["id"].astype(int).tolist())))
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            finally:
+                cursor.close()
+            last = int(legs["id"].iloc[-1])
+
+    # 운행내역 컬럼형 테이블 → 행 추가 (한 트랜잭션, id는 행 순서대로 부여)
+    def insert_trips(self, trips, batch_size=FETCH_SIZE):
+        names = [name for name, _ in TRIP_COLUMNS]
+        distance, speed = trip_distance_speed(trips["o_lat"], trips["o_lon"], trips["d_lat"], trips["d_lon"],
+                                              trips["travel_time"])
+        rows = pd.DataFrame({
+            "area": trips["area"], "service_date": trips["date"], "operation_type": trips["operation_type"],
+            "call_type": trips["call_type"], "adult": trips["adult"], "teen": trips["teen"],
+            "children": trips["children"], "in_hour": trips["hour"].where(trips["hour"] >= 0),
+            "waiting_minutes": trips["waiting_time"], "travel_minutes": trips["travel_time"],
+            "o_name": trips["o_name"], "d_name": trips["d_name"], "o_lat": trips["o_lat"], "o_lon": trips["o_lon"],
+            "d_lat": trips["d_lat"], "d_lon": trips["d_lon"], "distance_km": distance, "speed_kmh": speed,
+        }, columns=names).astype(object)
+        rows = rows.where(rows.notna(), None).itertuples(index=False, name=None)
+        p = PLACEHOLDER[self.dialect]
+        sql = f"INSERT INTO {self.table} ({', '.join(names)}) VALUES ({', '.join([p] * len(names))})"
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            try:
+                batch = []
+                for row in rows:
+                    batch.append(row)
+                    if len(batch) == batch_size:
+                        cursor.executemany(sql, batch)
+                        batch = []
+                if batch:
+                    cursor.executemany(sql, batch)
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            finally:
+                cursor.close()
+
+    # 쿼리 결과를 fetch_size 행씩 받아 테이블로 (서버 측 커서를 끝까지 읽어 연결을 재사용할 수 있게 함)
+    def _fetch(self, conn, sql, params, columns):
+        cursor = self.cursor(conn)
+        try:
+            cursor.execute(sql, params)
+            frames = []
+            while True:
+                rows = cursor.fetchmany(self.fetch_size)
+                if not rows:
+                    break
+                frames.append(pd.DataFrame.from_records(list(rows), columns=columns))
+        finally:
+            cursor.close()
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+
+    # _stage 조건의 행 수
+    def _count(self, conn, span, ids):
+        return int(self._fetch(conn, f"SELECT COUNT(*) FROM {self.table} WHERE {span}", ids, ["count"]).iloc[0, 0])
+
+    # 행 수, 마지막 id (upto를 주면 id <= upto 범위)
+    def _extent(self, conn, upto=None):
+        where, params = ("", []) if upto is None else (f" WHERE id <= {PLACEHOLDER[self.dialect]}", [upto])
+        count, last = self._fetch(conn, f"SELECT COUNT(*), MAX(id) FROM {self.table}{where}", params,
+                                  ["count", "last"]).iloc[0]
+        return int(count), int(last) if pd.notna(last) else 0
+
+    # 구간 (low, high]에 있는 id
+    def _ids_between(self, conn, low, high):
+        p = PLACEHOLDER[self.dialect]
+        ids = self._fetch(conn, f"SELECT id FROM {self.table} WHERE id > {p} AND id <= {p}", [low, high], ["id"])
+        return ids["id"].astype(int).tolist()
+
+    # id 구간 (start, end]를 창 아래 끝 low와 창 (low, end]의 (있는 id, 빈 id)로 나눔
+    def _window(self, conn, start, end):
+        low = max(start, end - LAG_WINDOW)
+        present = self._ids_between(conn, low, end)
+        return low, present, sorted(set(range(low + 1, end + 1)).difference(present))
+
+    # 빈 id 중 그 사이 커밋된 id (빈 id는 LAG_WINDOW 창 안에 있으므로 구간으로 조회)
+    def _late(self, conn):
+        if not self.gaps:
+            return []
+        gaps = set(self.gaps)
+        return [i for i in self._ids_between(conn, min(gaps) - 1, max(gaps)) if i in gaps]
+
+    # 집계 대상 행 조건: id 구간 (start, low]와 임시 테이블에 넣은 ids (창 안의 있는 id, 늦게 커밋된 id)
+    # (창의 빈 id는 미리 정해 두고 ids에 넣지 않으므로 그 사이 커밋된 행은 지금 집계되지 않고 다음 poll에서 집계됨)
+    def _stage(self, conn, start, low, ids):
+        p = PLACEHOLDER[self.dialect]
+        batch = self.batch_table
+        cursor = conn.cursor()
+        try:
+            cursor.execute(TEMP_TABLE[self.dialect].format(name=batch))
+            cursor.execute("BEGIN")
+            try:
+                cursor.execute(f"DELETE FROM {batch}")
+                if ids:
+                    cursor.executemany(f"INSERT INTO {batch} (id) VALUES ({p})", [(i,) for i in ids])
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+        finally:
+            cursor.close()
+        return f"(id > {p} AND id <= {p} OR id IN (SELECT id FROM {batch}))", [start, low]
+
+    # _stage 조건의 행 집계 (CSV 경로의 aggregate_history_tables와 같은 테이블)
+    # MySQL은 한 쿼리에서 임시 테이블을 두 번 열 수 없으므로 쿼리마다 조건을 한 번만 씀
+    def _aggregate(self, conn, span, ids):
+        p = PLACEHOLDER[self.dialect]
+        table = self.table
+        done = f"{span} AND operation_type = {p}"
+        in_hours = f"in_hour BETWEEN {HOURS.start} AND {HOURS.stop - 1}"
+        users = "adult + teen + children"
+        done_ids = ids + [COMPLETED]
+        area = self.service_area
+
+        def fetch(sql, params, columns):
+            return self._fetch(conn, sql, params, ["area", "service_date"] + columns + ["first_id"])
+
+        def stats(column):
+            return (f"COUNT({column}), COALESCE(SUM({column}), 0), "
+                    f"COALESCE(SUM({column} * {column}), 0)")
+
+        tables = {}
+        days = fetch(f"SELECT area, service_date, MIN(id) AS first_id FROM {table} WHERE {span} "
+                     f"GROUP BY area, service_date ORDER BY first_id", ids, [])
+        days = days.assign(region=days["area"].map(area).fillna('')).rename(columns={"service_date": "date"})
+        tables["days"] = days.drop_duplicates(["region", "date"])[["region", "date", "area"]].reset_index(drop=True)
+
+        # 배차 분류, 호출 방법 건수
+        tables["categories"] = pd.concat([
+            _regroup(fetch(f"SELECT area, service_date, {column}, COUNT(*), MIN(id) AS first_id FROM {table} "
+                           f"WHERE {span} GROUP BY area, service_date, {column} ORDER BY first_id", ids,
+                           ["label", "count"]), area, ["label"], ["count"], {"count": np.int64})
+            .assign(dimension=column)
+            for column in ["operation_type", "call_type"]
+        ], ignore_index=True)
+
+        # 이용 완료 건에 대한 집계
+        day_values = ["users", "adult", "teen", "children", "wait_count", "wait_sum", "wait_sumsq"]
+        tables["day_users"] = _regroup(
+            fetch(f"SELECT area, service_date, SUM({users}), SUM(adult), SUM(teen), SUM(children), "
+                  f"{stats('waiting_minutes')}, MIN(id) AS first_id FROM {table} WHERE {done} "
+                  f"GROUP BY area, service_date ORDER BY first_id", done_ids, day_values),
+            area, [], day_values, {**dict.fromkeys(day_values[:5], np.int64), "wait_sum": float, "wait_sumsq": float})
+
+        # 시간대별 지표 (이동거리, 속도는 적재 시 계산한 컬럼을 그대로 합산)
+        hour_values = list(HOUR_METRICS)
+        tables["hourly"] = _regroup(
+            fetch(f"SELECT area, service_date, in_hour, SUM({users}), {stats('waiting_minutes')}, "
+                  f"{stats('travel_minutes')}, {stats('distance_km')}, {stats('speed_kmh')}, MIN(id) AS first_id "
+                  f"FROM {table} WHERE {done} AND {in_hours} GROUP BY area, service_date, in_hour ORDER BY first_id",
+                  done_ids, ["hour"] + hour_values),
+            area, ["hour"], hour_values,
+            {"hour": np.int64, **{name: np.int64 if name == "users" or name.endswith("_count") else float
+                                  for name in hour_values}})
+
+        # 대기시간 분포, 분위수 스케치 (구간 계산까지 DB에서 하여 구간별 건수로 줄여 받음)
+        waited = f"{done} AND waiting_minutes IS NOT NULL"
+        tables["wait_dist"] = _regroup(
+            fetch(f"SELECT area, service_date, {_bucket_sql('waiting_minutes')} AS bucket, COUNT(*), "
+                  f"MIN(id) AS first_id FROM {table} WHERE {waited} GROUP BY area, service_date, bucket "
+                  f"ORDER BY first_id", done_ids, ["bucket", "count"]),
+            area, ["bucket"], ["count"], {"bucket": np.int64, "count": np.int64})
+        tables["wait_sketch"] = _regroup(
+            fetch(f"SELECT area, service_date, in_hour, "
+                  f"{_sketch_key_sql('waiting_minutes', self.dialect)} AS sketch_key, COUNT(*), MIN(id) AS first_id "
+                  f"FROM {table} WHERE {waited} AND {in_hours} "
+                  f"GROUP BY area, service_date, in_hour, sketch_key ORDER BY first_id", done_ids,
+                  ["hour", "key", "count"]),
+            area, ["hour", "key"], ["count"], {"hour": np.int64, "key": np.int64, "count": np.int64})
+
+        # 정류장 승하차 (운행마다 기점 side 0, 종점 side 1 두 행으로 펼침, 기점은 2 * id, 종점은 2 * id + 1 순서)
+        ends = (f"SELECT area, service_date, CASE side WHEN 0 THEN o_name ELSE d_name END AS name, "
+                f"CASE side WHEN 0 THEN o_lat ELSE d_lat END AS lat, "
+                f"CASE side WHEN 0 THEN o_lon ELSE d_lon END AS lon, "
+                f"CASE side WHEN 0 THEN {users} ELSE 0 END AS boarding, "
+                f"CASE side WHEN 0 THEN 0 ELSE {users} END AS alighting, 2 * id + side AS ord "
+                f"FROM {table} CROSS JOIN (SELECT 0 AS side UNION ALL SELECT 1) sides WHERE {done}")
+        tables["stations"] = _regroup(
+            fetch(f"SELECT area, service_date, name, lat, lon, SUM(boarding), SUM(alighting), MIN(ord) AS first_id "
+                  f"FROM ({ends}) ends WHERE lat IS NOT NULL AND lon IS NOT NULL "
+                  f"GROUP BY area, service_date, name, lat, lon ORDER BY first_id", done_ids,
+                  ["name", "lat", "lon", "승차", "하차"]),
+            area, ["name", "lat", "lon"], ["승차", "하차"],
+            {"lat": float, "lon": float, "승차": np.int64, "하차": np.int64})
+
+        # 통행 OD (이용인원, 이동시간 건수, 합)
+        tables["od"] = _regroup(
+            fetch(f"SELECT area, service_date, o_name, d_name, SUM({users}), COUNT(travel_minutes), "
+                  f"COALESCE(SUM(travel_minutes), 0), MIN(id) AS first_id FROM {table} "
+                  f"WHERE {done} GROUP BY area, service_date, o_name, d_name ORDER BY first_id", done_ids,
+                  ["o_name", "d_name", "users", "travel_count", "travel_sum"]),
+            area, ["o_name", "d_name"], ["users", "travel_count", "travel_sum"],
+            {"users": np.int64, "travel_count": np.int64, "travel_sum": float})
+
+        # 기점 구역 × 종점 구역 (끝점 좌표 쌍별로 줄여 받은 뒤 그린존/레드존 공간 결합)
+        zone_values = list(ZONE_METRICS)
+        flows = fetch(f"SELECT area, service_date, o_lat, o_lon, d_lat, d_lon, COUNT(*), SUM({users}), "
+                      f"{stats('waiting_minutes')}, MIN(id) AS first_id FROM {table} WHERE {done} "
+                      f"GROUP BY area, service_date, o_lat, o_lon, d_lat, d_lon ORDER BY first_id", done_ids,
+                      ["o_lat", "o_lon", "d_lat", "d_lon"] + zone_values)
+        regions = flows["area"].map(area).fillna('').to_numpy()
+        flows["o_zone"] = zone_index.codes_of(regions, flows["o_lat"].to_numpy(dtype=float),
+                                              flows["o_lon"].to_numpy(dtype=float))
+        flows["d_zone"] = zone_index.codes_of(regions, flows["d_lat"].to_numpy(dtype=float),
+                                              flows["d_lon"].to_numpy(dtype=float))
+        tables["zones"] = _regroup(
+            flows, area, ["o_zone", "d_zone"], zone_values,
+            {"o_zone": np.int8, "d_zone": np.int8, "trips": np.int64, "users": np.int64, "wait_count": np.int64,
+             "wait_sum": float, "wait_sumsq": float})
+        return tables
+
+    # 전체 집계 (테이블, 데이터 버전, 위치), 집계는 DB에서 하므로 workers는 쓰지 않음
+    # 위치는 (행 수, 마지막 id, 빈 id), load, poll은 위치를 옮기지 않음 (집계를 모두 반영한 뒤 commit으로 확정)
+    def load(self, force=False, workers=None):
+        self.create_schema()    # 이전 스키마의 테이블이면 거리, 속도 컬럼 추가
+        with self.pool.connection() as conn:
+            _, last = self._extent(conn)
+            low, present, gaps = self._window(conn, 0, last)
+            span, ids = self._stage(conn, 0, low, present)
+            tables = self._aggregate(conn, span, ids)
+            rows = self._count(conn, span, ids)
+        logging.info(f"{rows} trips aggregated from {self.table} (id ≤ {last}).")
+        position = (rows, last, tuple(gaps))
+        return tables, self.version(position), position
+
+    # 이미 집계한 행이 지워졌으면 전체를 다시 집계해야 함
+    def truncated(self):
+        with self.pool.connection() as conn:
+            return self._extent(conn, self.offset)[0] < self.rows
+
+    # 추가된 행 (마지막 id 이후 행과 늦게 커밋된 빈 id의 행)의 (집계 테이블, 새 위치) (없으면 None)
+    def poll(self):
+        with self.pool.connection() as conn:
+            late = self._late(conn)
+            last = max(self._extent(conn)[1], self.offset)
+            if last == self.offset and not late:
+                return None
+            low, present, skip = self._window(conn, self.offset, last)
+            span, ids = self._stage(conn, self.offset, low, present + late)
+            tables = self._aggregate(conn, span, ids)
+            added = self._count(conn, span, ids)
+        # 아직 커밋되지 않은 빈 id (LAG_WINDOW 범위를 벗어난 id는 더 기다리지 않음)
+        gaps = tuple(sorted(set(self.gaps).difference(late).union(skip)))
+        gaps = tuple(i for i in gaps if i > last - LAG_WINDOW)
+        logging.info(f"{added} new trips appended to {self.table} ({len(late)} committed late).")
+        return tables, (self.rows + added, last, gaps)
+
+    # 위치까지의 행이 반영되었음을 기록 (다음 poll은 이후 행과 남은 빈 id부터)
+    def commit(self, position):
+        self.rows, self.offset, self.gaps = position
+
+    def version(self, position=None):
+        rows, last, _ = position or (self.rows, self.offset, self.gaps)
+        digest = hashlib.sha256(f"v{SNAPSHOT_VERSION}:{self.table}:{rows}:{last}".encode())
+        digest.update(input_fingerprint([self.area_file] + zone_files()).encode())
+        return digest.hexdigest()
+
+    # 데이터가 DB에 있으므로 스냅샷은 저장하지 않음
+    def save(self, tables, version, position):
+        pass
+
+    def __repr__(self):
+        return f"SqlBackend({self.dialect}, {self.table})"
+
+
+# 저장소 선택: 비어 있으면 CSV, 'sqlite:///경로' 또는 'mysql://사용자:암호@호스트:포트/DB'이면 SQL
+def open_backend(url, history_file, area_file, service_area, workers=1):
+    if not url:
+        return CsvBackend(history_file, area_file, service_area, workers)
+
+    parts = urlsplit(url)
+    if parts.scheme == "sqlite":
+        path = unquote(parts.path[1:])     # sqlite:///상대경로, sqlite:////절대경로
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+        def connect():
+            # 자동 커밋 (읽기마다 최신 행을 봄), 연결 풀이 한 번에 한 스레드만 쓰도록 보장
+            return _register_math(sqlite3.connect(path, isolation_level=None, check_same_thread=False))
+        return SqlBackend(connect, service_area, area_file, "sqlite")
+
+    if parts.scheme in ("mysql", "mysql+pymysql"):
+        import pymysql
+        import pymysql.cursors
+
+        def connect():
+            return pymysql.connect(host=parts.hostname or "localhost", port=parts.port or 3306,
+                                   user=unquote(parts.username or ""), password=unquote(parts.password or ""),
+                                   database=parts.path.lstrip("/"), charset="utf8mb4", autocommit=True)
+        return SqlBackend(connect, service_area, area_file, "mysql",
+                          cursor=lambda conn: conn.cursor(pymysql.cursors.SSCursor))
+
+    raise ValueError(f"지원하지 않는 저장소 주소입니다: {url}")
+
+
+# CSV → DB 적재, SQL 집계 검증: python storage.py --database sqlite:///cache/drt.sqlite --import-csv --verify
+def main():
+    data_input_dir = os.path.join('input', '01 data')
+    parser = argparse.ArgumentParser(description="DRT 운행내역 SQL 저장소 적재 및 집계 검증")
+    parser.add_argument('--database', default=os.environ.get('DRT_HISTORY_DATABASE', 'sqlite:///cache/drt.sqlite'))
+    parser.add_argument('--history', default=os.path.join(data_input_dir, 'DRT운행내역(통합).csv'))
+    parser.add_argument('--area', default=os.path.join(data_input_dir, '지역별 중심점.csv'))
+    parser.add_argument('--import-csv', action='store_true', help="운행내역 CSV를 운행내역 테이블에 추가")
+    parser.add_argument('--verify', action='store_true', help="SQL 집계와 CSV 집계 비교")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    service_area, _ = load_area_data(args.area)
+    backend = open_backend(args.database, args.history, args.area, service_area)
+    if not isinstance(backend, SqlBackend):
+        parser.error("--database 에 SQL 저장소 주소를 지정하세요.")
+
+    backend.create_schema()
+    if args.import_csv:
+        trips = load_history_frame(args.history, service_area)
+        backend.insert_trips(trips)
+        logging.info(f"{len(trips)} trips imported into {backend.table}.")
+
+    if args.verify:
+        tables, _, _ = backend.load()
+        different = diff_tables(tables, aggregate_history_tables(load_history_frame(args.history, service_area)))
+        print("SQL aggregates " + ("identical to CSV aggregates" if not different else f"differ in {different}"))
+        raise SystemExit(1 if different else 0)
+
+
+if __name__ == '__main__':
+    main()
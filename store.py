@@ -0,0 +1,253 @@
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+
+from ingest import (HOURS, HOUR_METRICS, HOUR_STATS, WAIT_BUCKETS, ZONE_METRICS, OD_METRICS, OD_FIELDS, OD_DTYPES,
+                    new_day_record, init_day_record)
+from spatial import ZONE_LABELS
+from stats import RunningStats
+from catalog import od_matrix
+
+NO_DATES = MappingProxyType({})
+COMPLETED = '이용완료'   # 이용 완료 배차 분류
+DAY_FIELDS = ("map_center", "shapefiles", "total_user", "avg_wait_time", "station_ids", "boarding", "alighting",
+              "od_pairs", "od", "od_travel_count", "od_travel_sum",
+              "operation_type", "user_type", "call_type", "time_wait", "time_wait_sketch", "time_users", "wait_dist",
+              "time_travel", "time_distance", "time_speed", "zone_flows")
+
+
+# 지역/일자 집계 레코드 (읽기 전용)
+class DayAggregate:
+    __slots__ = DAY_FIELDS + ("has_data",)
+
+    def __init__(self, record, has_data=True):
+        for name in DAY_FIELDS:
+            value = record[name]
+            if isinstance(value, dict):
+                value = MappingProxyType(dict(value))
+            elif isinstance(value, np.ndarray):
+                value = value.view()
+                value.flags.writeable = False
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, "has_data", has_data)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("DayAggregate is read-only")
+
+    def __repr__(self):
+        return f"DayAggregate(total_user={self.total_user}, has_data={self.has_data})"
+
+
+# 지역/일자 행 → 일자 번호별로 모은 행 순서, 일자별 시작 위치 (일자 안에서는 원래 행 순서 유지)
+def _group_by_day(table, day_index):
+    codes = day_index.get_indexer(pd.MultiIndex.from_frame(table[["region", "date"]])) if len(table) else \
+        np.empty(0, dtype=np.int64)
+    order = np.argsort(codes, kind='stable')
+    order = order[codes[order] >= 0]
+    ptr = np.concatenate([[0], np.cumsum(np.bincount(codes[order], minlength=len(day_index)))])
+    return order, ptr
+
+
+def _column(table, order, column, dtype):
+    return np.ascontiguousarray(table[column].to_numpy(dtype=dtype)[order])
+
+
+# 행별 일자 번호 (일자 번호 순서로 모은 행 기준)
+def _row_days(ptr):
+    return np.repeat(np.arange(len(ptr) - 1), np.diff(ptr))
+
+
+# 일자별 값을 일자 번호 위치에 합산한 배열 (없는 일자는 0)
+def _dense(table, day_index, columns, positions=(), shape=(), dtype=float):
+    values = np.zeros((len(day_index),) + tuple(shape) + (len(columns),), dtype=dtype)
+    order, ptr = _group_by_day(table, day_index)
+    index = (_row_days(ptr),) + tuple(position[order] for position in positions)
+    np.add.at(values, index, table[columns].to_numpy(dtype=dtype)[order])
+    return values
+
+
+# 집계 완료 후 고정된 조회 전용 저장소
+# 모든 값을 일자 번호 기준의 평평한 NumPy 배열로 보관하고 DayAggregate는 일자별 첫 조회 시 한 번만 만들어 보관
+# (파이썬 객체가 거의 없어 gunicorn preload 후 fork 된 워커들이 메모리를 copy-on-write로 공유)
+class AggregateStore:
+    __slots__ = ("_dates", "_centers", "_empty", "_no_data", "_records", "version",
+                 "_day_values", "_hourly", "_wait_dist", "_zone_flows",
+                 "_category_ptr", "_category_dimension", "_category_label", "_category_count", "_labels",
+                 "_sketch_ptr", "_sketch_hour", "_sketch_key", "_sketch_count",
+                 "_station_ptr", "_station_ids", "_boarding", "_alighting",
+                 "_od_ptr", "_od_origin", "_od_destination", "_od_values", "_catalog")
+
+    def __init__(self, tables, catalog, area_center, region_centers, version=""):
+        self.version = version   # 데이터 버전 (캐시 키에 사용)
+        self._catalog = catalog
+
+        # 지역 → 일자 → 일자 번호, 일자별 지도 중심점
+        days = tables["days"]
+        day_index = pd.MultiIndex.from_frame(days[["region", "date"]]) if len(days) else \
+            pd.MultiIndex.from_arrays([[], []], names=["region", "date"])
+        self._dates = {}
+        for day, (region, date) in enumerate(zip(days["region"], days["date"])):
+            self._dates.setdefault(region, {})[date] = day
+        self._centers = [area_center[area] for area in days["area"]]
+        self._records = [None] * len(days)    # 일자 번호 → 만들어 둔 DayAggregate
+
+        # 일자별 이용인원, 이용자 유형, 대기시간 / 시간대별 지표 / 대기시간 분포
+        self._day_values = _dense(tables["day_users"], day_index,
+                                  ["users", "adult", "teen", "children", "wait_count", "wait_sum", "wait_sumsq"])
+        hourly = tables["hourly"]
+        self._hourly = _dense(hourly, day_index, list(HOUR_METRICS), [hourly["hour"].to_numpy() - HOURS.start],
+                              [len(HOURS)])
+        dist = tables["wait_dist"]
+        self._wait_dist = _dense(dist, day_index, ["count"], [dist["bucket"].to_numpy()], [len(WAIT_BUCKETS)],
+                                 dtype=np.int64)[..., 0]
+        zones = tables["zones"]
+        self._zone_flows = _dense(zones, day_index, list(ZONE_METRICS),
+                                  [zones["o_zone"].to_numpy(), zones["d_zone"].to_numpy()],
+                                  [len(ZONE_LABELS), len(ZONE_LABELS)])
+
+        # 배차 분류, 호출 방법 (일자별 구간, 라벨은 사전 번호)
+        categories = tables["categories"]
+        order, self._category_ptr = _group_by_day(categories, day_index)
+        label_codes, labels = pd.factorize(categories["label"])
+        self._labels = list(labels)
+        self._category_dimension = np.ascontiguousarray(
+            (categories["dimension"].to_numpy() == "call_type").astype(np.int8)[order])
+        self._category_label = np.ascontiguousarray(label_codes.astype(np.int32)[order])
+        self._category_count = _column(categories, order, "count", np.int64)
+
+        # 시간대별 대기시간 분위수 스케치 구간
+        sketch = tables["wait_sketch"]
+        order, self._sketch_ptr = _group_by_day(sketch, day_index)
+        self._sketch_hour = _column(sketch, order, "hour", np.int16)
+        self._sketch_key = _column(sketch, order, "key", np.int16)
+        self._sketch_count = _column(sketch, order, "count", np.int64)
+
+        # 정류장 승하차, 통행 OD (정류장 사전 ID)
+        stations = tables["stations"]
+        order, self._station_ptr = _group_by_day(stations, day_index)
+        self._station_ids = np.ascontiguousarray(
+            catalog.station_ids_of(stations["name"], stations["lat"], stations["lon"])[order])
+        self._boarding = _column(stations, order, "승차", np.int32)
+        self._alighting = _column(stations, order, "하차", np.int32)
+        od = tables["od"]
+        order, self._od_ptr = _group_by_day(od, day_index)
+        self._od_origin = np.ascontiguousarray(catalog.name_ids_of(od["o_name"])[order])
+        self._od_destination = np.ascontiguousarray(catalog.name_ids_of(od["d_name"])[order])
+        self._od_values = [_column(od, order, name, dtype) for name, dtype in zip(OD_METRICS, OD_DTYPES)]
+
+        # 데이터가 없는 지역/일자 조회 시 돌려줄 지역별 빈 레코드
+        self._no_data = DayAggregate(new_day_record(), has_data=False)
+        self._empty = {}
+        for region in set(region_centers) | set(self._dates):
+            record = new_day_record()
+            init_day_record(record, region, region_centers.get(region) or self._first_center(region))
+            self._empty[region] = DayAggregate(record, has_data=False)
+
+    def _first_center(self, region):
+        for day in self._dates.get(region, NO_DATES).values():
+            return self._centers[day]
+        return None
+
+    # 일자 번호 → 집계 레코드
+    def _day(self, region, day):
+        record = new_day_record()
+        init_day_record(record, region, self._centers[day])
+
+        users, adult, teen, children, wait_count, wait_sum, wait_sumsq = self._day_values[day].tolist()
+        record["total_user"] = int(users)
+        record["avg_wait_time"] = RunningStats(int(wait_count), wait_sum, wait_sumsq)
+        record["user_type"] = {"성인": int(adult), "청소년": int(teen), "어린이": int(children)}
+
+        for hour, (users, *values) in zip(HOURS, self._hourly[day].tolist()):
+            record["time_users"][hour] = int(users)
+            for field, (count, total, total_sq) in zip(HOUR_STATS, zip(*[iter(values)] * 3)):
+                record[field][hour] = RunningStats(int(count), total, total_sq)
+        record["wait_dist"] = dict(zip(WAIT_BUCKETS, self._wait_dist[day].tolist()))
+        record["zone_flows"] = self._zone_flows[day]
+
+        start, stop = self._category_ptr[day], self._category_ptr[day + 1]
+        for dimension, label, count in zip(self._category_dimension[start:stop].tolist(),
+                                           self._category_label[start:stop].tolist(),
+                                           self._category_count[start:stop].tolist()):
+            record["call_type" if dimension else "operation_type"][self._labels[label]] += count
+
+        start, stop = self._sketch_ptr[day], self._sketch_ptr[day + 1]
+        for hour, key, count in zip(self._sketch_hour[start:stop].tolist(), self._sketch_key[start:stop].tolist(),
+                                    self._sketch_count[start:stop].tolist()):
+            record["time_wait_sketch"][hour].add_bins([key], [count])
+
+        start, stop = self._station_ptr[day], self._station_ptr[day + 1]
+        record["station_ids"] = self._station_ids[start:stop]
+        record["boarding"] = self._boarding[start:stop]
+        record["alighting"] = self._alighting[start:stop]
+
+        start, stop = self._od_ptr[day], self._od_ptr[day + 1]
+        record["od_pairs"] = np.stack([self._od_origin[start:stop], self._od_destination[start:stop]])
+        for field, values, dtype in zip(OD_FIELDS, self._od_values, OD_DTYPES):
+            record[field] = od_matrix(self._od_origin[start:stop], self._od_destination[start:stop],
+                                      values[start:stop], self._catalog.n_names, dtype)
+        return DayAggregate(record)
+
+    # O(1) 조회, 데이터가 없으면 지역별 "데이터 없음" 레코드 반환
+    # 레코드는 읽기 전용이므로 일자별로 처음 만든 것을 계속 돌려줌 (여러 스레드가 동시에 만들어도 같은 값이 들어감)
+    def get(self, region, date):
+        dates = self._dates.get(region)
+        if dates is None:
+            return self._empty.get(region, self._no_data)
+        day = dates.get(date)
+        if day is None:
+            return self._empty[region]
+        record = self._records[day]
+        if record is None:
+            record = self._records[day] = self._day(region, day)
+        return record
+
+    # 일자별 (지역, 일자, 이용인원, 호출건수, 대기시간 통계) (레코드를 만들지 않고 배열에서 바로 계산, keys를 주면
+    # 해당 (지역, 일자)만)
+    def day_totals(self, keys=None):
+        calls = np.bincount(_row_days(self._category_ptr), self._category_count * self._category_dimension,
+                            minlength=len(self._centers))
+        for region, dates in self._dates.items():
+            for date, day in dates.items():
+                if keys is not None and (region, date) not in keys:
+                    continue
+                users, _, _, _, wait_count, wait_sum, wait_sumsq = self._day_values[day].tolist()
+                yield region, date, int(users), int(calls[day]), RunningStats(int(wait_count), wait_sum, wait_sumsq)
+
+    # 일자별 요약 행 (지역, 일자, 호출건수, 이용완료 건수, 이용인원, 성인, 청소년, 어린이, 대기시간 통계)
+    # regions(없으면 전체), 기간 [start_date, end_date]에 드는 일자만 지역, 일자 순으로 배열에서 한 행씩 생성
+    def day_rows(self, regions=None, start_date=None, end_date=None):
+        days = _row_days(self._category_ptr)
+        calls = np.bincount(days, self._category_count * self._category_dimension, minlength=len(self._centers))
+        completed_label = self._labels.index(COMPLETED) if COMPLETED in self._labels else -1
+        completed = np.bincount(days, self._category_count * ((self._category_dimension == 0) &
+                                                              (self._category_label == completed_label)),
+                                minlength=len(self._centers))
+        for region in sorted(self._dates) if regions is None else regions:
+            dates = self._dates.get(region, NO_DATES)
+            for date in sorted(dates):
+                if (start_date and date < start_date) or (end_date and date > end_date):
+                    continue
+                day = dates[date]
+                users, adult, teen, children, wait_count, wait_sum, wait_sumsq = self._day_values[day].tolist()
+                yield (region, date, int(calls[day]), int(completed[day]), int(users), int(adult), int(teen),
+                       int(children), RunningStats(int(wait_count), wait_sum, wait_sumsq))
+
+    def regions(self):
+        return self._dates.keys()
+
+    def dates(self, region):
+        return self._dates.get(region, NO_DATES).keys()
+
+    def __len__(self):
+        return len(self._centers)
+
+    def __contains__(self, key):
+        region, date = key
+        return date in self._dates.get(region, ())
+
+
+# 지역명 → 지역 중심점
+def region_centers_of(service_area, area_center):
+    return {region: area_center[code] for code, region in service_area.items()}
@@ -0,0 +1,148 @@
+import os
+import logging
+import argparse
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+from haversine import haversine_vector, Unit
+
+from ingest import HISTORY_COLUMNS, load_area_data, load_region_stations
+
+N_COLUMNS = 28                  # 운행내역 CSV 컬럼 수
+CHUNK_SIZE = 200_000            # 한 번에 만들어 쓰는 행 수 (천만 건도 메모리를 일정하게 사용)
+OPERATION_TYPES = (("이용완료", 0.78), ("취소", 0.14), ("미배차", 0.08))
+CALL_TYPES = (("앱(어플)", 0.55), ("전화(콜센터)", 0.35), ("현장", 0.10))
+# 시간대별 호출 비중 (5시, 22시는 집계 시간대 밖 호출)
+HOUR_WEIGHTS = {5: 0.5, 6: 2, 7: 6, 8: 8, 9: 5, 10: 4, 11: 4, 12: 4, 13: 4, 14: 4, 15: 4, 16: 5, 17: 7,
+                18: 8, 19: 5, 20: 3, 21: 2, 22: 0.5}
+REGION_SKEW = 1.1               # 정류장 인기도 (순위^-skew 비례)
+VEHICLE_SPEED = 25.0            # 평균 운행 속도 (km/h)
+PAD = np.array([f"{i:02d}" for i in range(100)], dtype=object)
+
+
+def _choice(rng, options, size):
+    labels, weights = zip(*options)
+    return np.array(labels, dtype=object)[rng.choice(len(labels), size, p=np.array(weights) / sum(weights))]
+
+
+# 초 → 'HH:MM:SS' (빈 값은 NaN)
+def _clock(seconds):
+    valid = ~np.isnan(seconds)
+    total = np.where(valid, seconds, 0).astype(np.int64)
+    text = PAD[np.minimum(total // 3600, 99)] + ':' + PAD[total // 60 % 60] + ':' + PAD[total % 60]
+    return np.where(valid, text, '')
+
+
+# 지역별 정류장 배열, 인기도 (순위는 정류장 순서와 무관하게 섞되 파일 전체에서 고정)
+def station_popularity(rng, regions):
+    prepared = {}
+    for code, stations in regions.items():
+        names, lats, lons = map(np.array, zip(*stations))
+        popularity = np.arange(1, len(names) + 1, dtype=float) ** -REGION_SKEW
+        popularity = popularity[rng.permutation(len(names))]
+        prepared[code] = (names.astype(object), lats, lons, popularity / popularity.sum())
+    return prepared
+
+
+# 운행내역 행 묶음 생성 (지역, 정류장 인기도, 시간대 비중을 반영한 무작위 운행)
+def generate_chunk(rng, size, regions, dates):
+    codes = list(regions)
+    region_weights = np.array([len(regions[code][0]) for code in codes], dtype=float)
+    region_index = rng.choice(len(codes), size, p=region_weights / region_weights.sum())
+
+    o_name = np.empty(size, dtype=object)
+    d_name = np.empty(size, dtype=object)
+    coords = np.empty((size, 4))
+    for i, code in enumerate(codes):
+        rows = np.flatnonzero(region_index == i)
+        names, lats, lons, popularity = regions[code]
+        o, d = (rng.choice(len(names), len(rows), p=popularity) for _ in range(2))
+        o_name[rows], d_name[rows] = names[o], names[d]
+        coords[rows] = np.column_stack([lats[o], lons[o], lats[d], lons[d]])
+
+    hours, hour_weights = zip(*HOUR_WEIGHTS.items())
+    hour = np.array(hours)[rng.choice(len(hours), size, p=np.array(hour_weights) / sum(hour_weights))]
+    in_time = hour * 3600 + rng.integers(0, 60, size) * 60
+
+    operation = _choice(rng, OPERATION_TYPES, size)
+    done = operation == "이용완료"
+    adult = rng.choice([0, 1, 1, 1, 2, 3], size)
+    teen = rng.choice([0, 0, 0, 0, 1], size)
+    children = rng.choice([0, 0, 0, 0, 0, 1], size)
+    adult[adult + teen + children == 0] = 1
+
+    # 대기시간 (감마 분포), 이동시간 (직선거리 / 평균 속도 + 정차, 우회), 이용완료 건만 기록
+    distance = haversine_vector(coords[:, :2], coords[:, 2:], Unit.KILOMETERS)
+    waiting = np.where(done, rng.gamma(2.0, 360.0, size), np.nan)
+    travel = distance / VEHICLE_SPEED * 3600 * rng.uniform(1.1, 1.6, size) + rng.gamma(2.0, 90.0, size)
+    travel = np.where(done, travel, np.nan)
+
+    columns = {i: '' for i in range(N_COLUMNS)}
+    columns.update({
+        HISTORY_COLUMNS["area"]: np.array(codes, dtype=object)[region_index],
+        6: adult + teen + children,
+        HISTORY_COLUMNS["adult"]: adult,
+        HISTORY_COLUMNS["teen"]: teen,
+        HISTORY_COLUMNS["children"]: children,
+        HISTORY_COLUMNS["operation_type"]: operation,
+        HISTORY_COLUMNS["date"]: dates[rng.integers(0, len(dates), size)],
+        HISTORY_COLUMNS["call_type"]: _choice(rng, CALL_TYPES, size),
+        HISTORY_COLUMNS["in_time"]: _clock(in_time.astype(float)),
+        HISTORY_COLUMNS["waiting_time"]: _clock(waiting),
+        HISTORY_COLUMNS["travel_time"]: _clock(travel),
+        HISTORY_COLUMNS["o_name"]: o_name,
+        HISTORY_COLUMNS["d_name"]: d_name,
+        HISTORY_COLUMNS["o_lat"]: coords[:, 0],
+        HISTORY_COLUMNS["o_lon"]: coords[:, 1],
+        HISTORY_COLUMNS["d_lat"]: coords[:, 2],
+        HISTORY_COLUMNS["d_lon"]: coords[:, 3],
+    })
+    return pd.DataFrame({f"c{i}": columns[i] for i in range(N_COLUMNS)}, index=pd.RangeIndex(size))
+
+
+# 합성 운행내역 CSV 생성 (같은 seed, 입력이면 같은 파일)
+def write_history(output, trips, station_file, area_file, seed=0, start=date(2024, 1, 1), days=365,
+                  encoding='cp949'):
+    service_area, _ = load_area_data(area_file)
+    # 지역 코드별 실제 정류장 (정류장명, 위도, 경도)
+    stations = load_region_stations(station_file, service_area)
+    stations = {code: stations[region] for code, region in service_area.items() if region in stations}
+    if not stations:
+        raise ValueError(f"{station_file}에서 지역별 정류장을 찾을 수 없습니다.")
+    dates = np.array([(start + timedelta(i)).isoformat() for i in range(days)], dtype=object)
+    rng = np.random.default_rng(seed)
+    regions = station_popularity(rng, stations)
+
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    temp_path = f"{output}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding=encoding, newline='') as f:
+        f.write(",".join(f"c{i}" for i in range(N_COLUMNS)) + "\n")
+        for written in range(0, trips, CHUNK_SIZE):
+            chunk = generate_chunk(rng, min(CHUNK_SIZE, trips - written), regions, dates)
+            chunk.to_csv(f, header=False, index=False, float_format='%.6f', lineterminator='\n')
+    os.replace(temp_path, output)
+    logging.info(f"{trips} synthetic trips in {len(regions)} regions written to {output}.")
+    return output
+
+
+# 합성 운행내역 생성: python synth.py --trips 1000000 --seed 7 --output "input/01 data/DRT운행내역(통합).csv"
+def main():
+    data_input_dir = os.path.join('input', '01 data')
+    parser = argparse.ArgumentParser(description="실제 정류장, 지역 기반 합성 DRT 운행내역 생성")
+    parser.add_argument('--trips', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--start', default='2024-01-01', help="첫 운행 일자")
+    parser.add_argument('--days', type=int, default=365, help="운행 일수")
+    parser.add_argument('--output', default=os.path.join(data_input_dir, 'DRT운행내역(통합).csv'))
+    parser.add_argument('--stations', default=os.path.join(data_input_dir, 'DRT정류장(통합).csv'))
+    parser.add_argument('--area', default=os.path.join(data_input_dir, '지역별 중심점.csv'))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    write_history(args.output, args.trips, args.stations, args.area, args.seed,
+                  date.fromisoformat(args.start), args.days)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 저장소 루트 모듈(ingest, store 등)을 가져올 수 있도록 경로 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
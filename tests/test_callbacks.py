@@ -0,0 +1,266 @@
+import os
+import sys
+import csv
+import json
+import inspect
+import tempfile
+import importlib
+from collections import defaultdict
+from datetime import date
+
+import plotly
+import pytest
+from dash.exceptions import PreventUpdate
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXPECTED_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'expected_callbacks.json')
+
+# 앱 부팅 환경 (백그라운드 콜백, 미리 계산, 계측을 끄고 CSV 저장소, 브라우저 지도 방식)
+APP_ENV = {"DRT_BACKGROUND_CALLBACKS": "0", "DRT_PREFETCH": "0", "DRT_METRICS": "0", "DRT_PROFILING": "0",
+           "DRT_HISTORY_DATABASE": "", "DRT_MAP_MODE": "client", "DRT_LOG_LEVEL": "WARNING"}
+HISTORY_TRIPS = 3000
+HISTORY_SEED = 11
+HISTORY_START = date(2024, 1, 1)
+HISTORY_DAYS = 21
+
+# (지역, 기준 일자, 조회 단위, 시작일, 종료일)
+CASES = {
+    "day": ("청주_오송", "2024-01-03", "day", None, None),
+    "day_other_region": ("청주_남이", "2024-01-10", "day", None, None),
+    "week": ("청주_오송", "2024-01-10", "week", None, None),
+    "month": ("청주_남이", "2024-01-10", "month", None, None),
+    "range": ("청주_오송", None, "range", "2024-01-05", "2024-01-12"),
+    "no_data": ("청주_오송", "2024-03-01", "day", None, None),
+    "reversed_range": ("청주_오송", None, "range", "2024-01-12", "2024-01-05"),
+}
+
+# 콜백 → 기간 입력 뒤에 붙는 추가 입력 (지역 입력이 없는 콜백은 기간만)
+CALLBACKS = {
+    "update_total_calls": (),
+    "update_total_users": (),
+    "update_avg_waitings": (),
+    "update_area_avg": ("day_type",),
+    "update_map": (),
+    "update_top5": (5,),
+    "update_pie_charts": (),
+    "update_waiting_time_chart": (),
+    "update_waiting_time_dist": (),
+    "update_zone_chart": (),
+    "update_trip_distance_chart": (),
+    "update_overview": None,
+}
+
+# 처음 앱에 있던 콜백 중 출력 형식이 그대로인 콜백, 처음 앱이 지원하던 조회 (하루 단위, 자료가 있는 일자)
+# 이 조합은 기록된 값이 아니라 처음 앱의 계산을 옮긴 baseline_outputs와 비교
+# (update_area_avg는 비교 기준이 바뀌어 (user-021) 기록된 값으로만 확인)
+BASELINE_CALLBACKS = ("update_total_calls", "update_total_users", "update_avg_waitings", "update_map",
+                      "update_top5", "update_pie_charts", "update_waiting_time_chart", "update_waiting_time_dist")
+BASELINE_CASES = ("day", "day_other_region")
+RECORDED = [(case_name, name) for case_name in CASES for name in CALLBACKS
+            if not (case_name in BASELINE_CASES and name in BASELINE_CALLBACKS)]
+
+
+# 작업 디렉터리에 입력 파일(정류장, 지역 중심점, 구역 shapefile)을 연결하고 합성 운행내역을 만든 뒤 앱 import
+def boot_app(workdir, monkeypatch):
+    from synth import write_history
+
+    data_dir = os.path.join(workdir, 'input', '01 data')
+    os.makedirs(data_dir)
+    for name in ('DRT정류장(통합).csv', '지역별 중심점.csv'):
+        os.symlink(os.path.join(REPO_DIR, 'input', '01 data', name), os.path.join(data_dir, name))
+    os.symlink(os.path.join(REPO_DIR, 'input', '02 shp'), os.path.join(workdir, 'input', '02 shp'))
+    write_history(os.path.join(data_dir, 'DRT운행내역(통합).csv'), HISTORY_TRIPS,
+                  os.path.join(data_dir, 'DRT정류장(통합).csv'), os.path.join(data_dir, '지역별 중심점.csv'),
+                  seed=HISTORY_SEED, start=HISTORY_START, days=HISTORY_DAYS)
+
+    for key, value in APP_ENV.items():
+        monkeypatch.setenv(key, value)
+    monkeypatch.chdir(workdir)
+    monkeypatch.delitem(sys.modules, 'my_app', raising=False)
+    return importlib.import_module('my_app')
+
+
+# 콜백 결과의 확인할 값만 남김 (그래프는 제목과 계열별 이름, x, y / HTML 요소는 내용)
+def key_fields(value):
+    if isinstance(value, dict) and "data" in value and "layout" in value:
+        return {"title": value["layout"].get("title", {}).get("text"),
+                "traces": [[trace.get("name"), trace.get("x", trace.get("labels")),
+                            trace.get("y", trace.get("values"))] for trace in value["data"]]}
+    if isinstance(value, dict) and "props" in value:
+        return key_fields(value["props"].get("children"))
+    if isinstance(value, list):
+        return [key_fields(item) for item in value]
+    return value
+
+
+# 콜백 결과 → 확인할 값 (PreventUpdate는 문자열로 기록)
+def run_callback(app_module, name, case):
+    function = inspect.unwrap(getattr(app_module, name))
+    extra = CALLBACKS[name]
+    args = case[1:] if extra is None else case + extra
+    try:
+        result = function(*args)
+    except PreventUpdate:
+        return "PreventUpdate"
+    return key_fields(json.loads(json.dumps(result, cls=plotly.utils.PlotlyJSONEncoder)))
+
+
+def _minutes(text):
+    return sum(int(x) * [1 / 60, 1, 60][i] for i, x in enumerate(reversed(text.split(':')))) if text else None
+
+
+# 처음 앱의 운행내역 행 단위 집계 (대기, 이동시간 목록을 그대로 들고 있는 원래 구조)
+# 처음 앱은 운영 시간(06~21시) 밖의 승차 건에서 멈췄으므로 그 건은 시간대별 값에서만 빠지고,
+# '-'가 든 정류장명을 잘못 나누던 OD 키 (user-009)는 (기점, 종점)으로 보관
+def baseline_region_data(history_file, area_file):
+    with open(area_file, encoding='cp949') as f:
+        rows = list(csv.reader(f))[1:]
+    service_area = {row[0]: row[1] for row in rows}
+    area_center = {row[0]: [row[3], row[2]] for row in rows}
+    region_data = defaultdict(lambda: defaultdict(lambda: {
+        "map_center": None,
+        "total_user": 0,
+        "avg_wait_time": [],
+        "stations": defaultdict(lambda: {"승차": 0, "하차": 0}),
+        "od": defaultdict(int),
+        "operation_type": defaultdict(int),
+        "user_type": {"성인": 0, "청소년": 0, "어린이": 0},
+        "call_type": defaultdict(int),
+        "time_wait": {hour: [] for hour in range(6, 22)},
+        "time_users": {hour: 0 for hour in range(6, 22)},
+        "wait_dist": {**{(f"{5 * i}분 미만" if i == 1 else f"{5 * (i - 1)}~{5 * i}분"): [] for i in range(1, 13)},
+                      "60분 이상": []},
+        "time_travel": {hour: [] for hour in range(6, 22)},
+    }))
+
+    with open(history_file, encoding='cp949') as f:
+        rows = list(csv.reader(f))[1:]
+    for row in rows:
+        info = region_data[service_area[row[0]]][row[11]]
+        adult, teen, children = int(row[7]), int(row[8]), int(row[9])
+        total_num = adult + teen + children
+        in_time = int(row[15].split(':')[0]) if row[15] else None
+        waiting_time, travel_time = _minutes(row[17]), _minutes(row[18])
+        if not info["map_center"]:
+            info["map_center"] = area_center[row[0]]
+        info["operation_type"][row[10]] += 1
+        info["call_type"][row[12].split("(")[0]] += 1
+        if row[10] != '이용완료':
+            continue
+        info["total_user"] += total_num
+        info["avg_wait_time"] += [waiting_time]
+        info["user_type"]["성인"] += adult
+        info["user_type"]["청소년"] += teen
+        info["user_type"]["어린이"] += children
+        if in_time in info["time_users"]:
+            info["time_wait"][in_time] += [waiting_time]
+            info["time_users"][in_time] += total_num
+            info["time_travel"][in_time] += [travel_time]
+        info["stations"][(row[19], float(row[23]), float(row[24]))]["승차"] += total_num
+        info["stations"][(row[20], float(row[25]), float(row[26]))]["하차"] += total_num
+        labels = list(info["wait_dist"])
+        info["wait_dist"][labels[min(int(waiting_time // 5), len(labels) - 1)]] += [waiting_time]
+        info["od"][(row[19], row[20])] += total_num
+    return region_data
+
+
+# 처음 앱의 콜백 계산 → 확인할 값 (지도는 중심점과 정류장별 승하차)
+def baseline_outputs(region_info):
+    def escape(name):
+        return str(name).replace('[', '\\[').replace(']', '\\]')
+
+    def ranking(title, items):
+        return f"### {title}\n" + "".join(f"{i}. **{name}** : {count}명\n\n" for i, (name, count) in
+                                          enumerate(items, start=1))
+
+    stations = region_info["stations"]
+    top_in = sorted(stations.items(), key=lambda item: item[1]['승차'], reverse=True)[:5]
+    top_out = sorted(stations.items(), key=lambda item: item[1]['하차'], reverse=True)[:5]
+    top_od = sorted(region_info["od"].items(), key=lambda x: x[1], reverse=True)[:5]
+
+    def mean(values):
+        return round(sum(values) / len(values) if values else 0, 1)
+
+    sizes = [len(times) for times in region_info["wait_dist"].values()]
+    hours = list(region_info["time_wait"])
+    return json.loads(json.dumps({
+        "update_total_calls": [f"{sum(region_info['call_type'].values())}건"],
+        "update_total_users": [f"{region_info['total_user']}명"],
+        "update_avg_waitings": [f"{float(mean(region_info['avg_wait_time']))}분"],
+        "update_map": {"center": [float(value) for value in region_info["map_center"]],
+                       "stations": sorted([name, count["승차"], count["하차"]]
+                                          for (name, _, _), count in stations.items())},
+        "update_top5": [
+            ranking("승차량 상위 5개 정류장", [(escape(key[0]), count['승차']) for key, count in top_in]),
+            ranking("하차량 상위 5개 정류장", [(escape(key[0]), count['하차']) for key, count in top_out]),
+            ranking("통행량 상위 5개 O-D", [(escape(o) + '-' + escape(d), count) for (o, d), count in top_od]),
+        ],
+        "update_pie_charts": [{"title": title, "traces": [[None, list(region_info[key]),
+                                                           list(region_info[key].values())]]}
+                              for key, title in zip(["operation_type", "user_type", "call_type"],
+                                                    ["호출 현황", "이용자 현황", "호출 방법"])],
+        "update_waiting_time_chart": {"title": "시간대별 현황", "traces": [
+            ["대기시간", hours, [mean(values) for values in region_info["time_wait"].values()]],
+            ["이동시간", hours, [mean(values) for values in region_info["time_travel"].values()]],
+            ["이용인원", hours, list(region_info["time_users"].values())],
+        ]},
+        "update_waiting_time_dist": {"title": "대기시간 분포", "traces": [
+            [None, list(region_info["wait_dist"]), [round(size / sum(sizes) * 100, 1) for size in sizes]]]},
+    }))
+
+
+@pytest.fixture(scope="module")
+def app_module(tmp_path_factory):
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        yield boot_app(str(tmp_path_factory.mktemp("app")), monkeypatch)
+
+
+@pytest.fixture(scope="module")
+def baseline_data(app_module):
+    return baseline_region_data(app_module.history_file, app_module.area_file)
+
+
+@pytest.fixture(scope="module")
+def expected():
+    with open(EXPECTED_FILE, encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("case_name", BASELINE_CASES)
+@pytest.mark.parametrize("name", BASELINE_CALLBACKS)
+def test_callback_matches_baseline(app_module, baseline_data, name, case_name):
+    region, selected_date = CASES[case_name][:2]
+    expected = baseline_outputs(baseline_data[region][selected_date])[name]
+    output = run_callback(app_module, name, CASES[case_name])
+    if name == "update_map":
+        output = {"center": output["center"], "stations": sorted(station[-1:] + station[2:4]
+                                                                 for station in output["stations"])}
+    elif name == "update_waiting_time_chart":
+        output["traces"] = [trace for trace in output["traces"] if trace[0] != "대기시간(p90)"]   # user-003에서 추가
+    assert output == expected
+
+
+@pytest.mark.parametrize("case_name, name", RECORDED)
+def test_callback_output(app_module, expected, name, case_name):
+    assert run_callback(app_module, name, CASES[case_name]) == expected[case_name][name]
+
+
+@pytest.mark.parametrize("region", [None, "없는지역"])
+def test_map_skips_unknown_region(app_module, region):
+    assert run_callback(app_module, "update_map", (region,) + CASES["day"][1:]) == "PreventUpdate"
+
+
+# 기대 결과 다시 기록: python tests/test_callbacks.py (처음 앱과 비교하지 않는 조합, 출력을 의도적으로 바꾼 경우에만)
+if __name__ == '__main__':
+    sys.path.insert(0, REPO_DIR)
+    with tempfile.TemporaryDirectory() as workdir, pytest.MonkeyPatch.context() as monkeypatch:
+        booted = boot_app(workdir, monkeypatch)
+        outputs = {}
+        for case_name, name in RECORDED:
+            outputs.setdefault(case_name, {})[name] = run_callback(booted, name, CASES[case_name])
+    # 조회별 콜백 결과를 한 줄씩 기록 (리뷰 시 바뀐 콜백만 보이도록)
+    with open(EXPECTED_FILE, 'w', encoding='utf-8') as f:
+        f.write("{\n" + ",\n".join(
+            f" {json.dumps(case_name)}: {{\n" + ",\n".join(
+                f"  {json.dumps(name)}: {json.dumps(value, ensure_ascii=False)}" for name, value in sorted(values.items()))
+            + "\n }" for case_name, values in sorted(outputs.items())) + "\n}\n")
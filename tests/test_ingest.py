@@ -0,0 +1,218 @@
+import csv
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from catalog import StationCatalog, od_entries
+from ingest import HISTORY_COLUMNS, HOURS, HOUR_STATS, OD_FIELDS, WAIT_BUCKETS, aggregate_history_tables, read_history_frame
+from spatial import trip_distance_speed
+from stats import RunningStats, QuantileSketch
+from store import AggregateStore
+
+SERVICE_AREA = defaultdict(str, {"A01": "청주_오송", "A02": "청주_남이"})
+AREA_CENTER = defaultdict(list, {"A01": ["36.62", "127.32"], "A02": ["36.55", "127.47"]})
+STATION_TYPES = {"오송역": "기존정류장", "남이면사무소": "가상정류장"}   # 나머지 정류장은 사전에 없음
+STATIONS = [("오송역", "36.6201", "127.3273"), ("봉산리", "36.6302", "127.3011"),
+            ("남이면사무소", "36.5561", "127.4702"), ("미등록정류장", "36.5402", "127.4803"),
+            ("좌표없음정류장", "", "")]
+
+# (지역 코드, 일자, 배차 분류, 호출 방법, 탑승 시각, 대기시간, 이동시간, 기점, 종점, 성인, 청소년, 어린이)
+TRIPS = [
+    ("A01", "2024-01-02", "이용완료", "앱(안드로이드)", "07:12:00", "00:08:30", "00:14:10", 0, 1, 1, 0, 0),
+    ("A01", "2024-01-02", "이용완료", "전화", "07:40:00", "00:21:00", "00:09:00", 1, 0, 2, 1, 0),
+    ("A01", "2024-01-02", "이용완료", "앱(iOS)", "", "00:03:00", "00:11:00", 0, 1, 1, 0, 1),     # 탑승 시각 없음
+    ("A01", "2024-01-02", "이용완료", "전화", "23:05:00", "01:10:00", "00:20:00", 1, 0, 1, 0, 0),  # 운영 시간 밖
+    ("A01", "2024-01-02", "취소", "앱(안드로이드)", "", "", "", 0, 1, 1, 0, 0),
+    ("A01", "2024-01-02", "미탑승", "전화", "09:00:00", "00:12:00", "", 1, 0, 1, 0, 0),
+    ("A01", "2024-01-03", "이용완료", "앱(안드로이드)", "18:30:00", "", "00:07:00", 0, 1, 1, 0, 0),  # 대기시간 없음
+    ("A01", "2024-01-03", "이용완료", "전화", "18:45:00", "00:45:00", "", 1, 0, 0, 2, 0),      # 이동시간 없음
+    ("A01", "2024-01-03", "이용완료", "전화", "06:00:00", "00:00:40", "00:00:00", 0, 0, 1, 0, 0),  # 같은 정류장
+    ("A02", "2024-01-02", "이용완료", "앱(iOS)", "10:10:00", "00:05:00", "00:16:00", 2, 3, 1, 1, 1),
+    ("A02", "2024-01-02", "이용완료", "앱(iOS)", "10:20:00", "00:59:59", "00:30:00", 3, 2, 3, 0, 0),
+    ("A02", "2024-01-02", "취소", "전화", "10:20:00", "", "", 3, 2, 1, 0, 0),
+    ("A02", "2024-01-02", "이용완료", "전화", "21:59:00", "00:15:00", "00:08:00", 2, 3, 1, 0, 0),
+    ("A02", "2024-01-02", "이용완료", "앱(iOS)", "11:00:00", "00:06:00", "00:12:00", 4, 2, 1, 0, 0),  # 기점 좌표 없음
+]
+
+
+def write_history(path, trips):
+    width = max(HISTORY_COLUMNS.values()) + 1
+    with open(path, 'w', encoding='cp949', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow([f"col{i}" for i in range(width)])
+        for area, date, operation, call, in_time, waiting, travel, o, d, adult, teen, children in trips:
+            row = [""] * width
+            values = {"area": area, "date": date, "operation_type": operation, "call_type": call,
+                      "in_time": in_time, "waiting_time": waiting, "travel_time": travel,
+                      "adult": adult, "teen": teen, "children": children,
+                      "o_name": STATIONS[o][0], "o_lat": STATIONS[o][1], "o_lon": STATIONS[o][2],
+                      "d_name": STATIONS[d][0], "d_lat": STATIONS[d][1], "d_lon": STATIONS[d][2]}
+            for name, value in values.items():
+                row[HISTORY_COLUMNS[name]] = str(value)
+            writer.writerow(row)
+
+
+@pytest.fixture
+def history_file(tmp_path):
+    path = tmp_path / "history.csv"
+    write_history(path, TRIPS)
+    return str(path)
+
+
+def _stats(stats):
+    return stats.count, pytest.approx(stats.total), pytest.approx(stats.total_sq)
+
+
+def _stations(day, catalog):
+    return {catalog.stations[station_id]: (boarding, alighting)
+            for station_id, boarding, alighting in zip(np.asarray(day["station_ids"]).tolist(),
+                                                        np.asarray(day["boarding"]).tolist(),
+                                                        np.asarray(day["alighting"]).tolist())}
+
+
+# OD 행렬 → {(기점, 종점): 값} (명시적으로 저장된 0은 제외)
+def _od(matrix, catalog):
+    return {(catalog.names[o], catalog.names[d]): pytest.approx(value)
+            for o, d, value in zip(*od_entries(matrix)) if value}
+
+
+# DayAggregate → 비교용 값
+def summarize(day, catalog):
+    def field(name):
+        return getattr(day, name)
+    return {
+        "total_user": field("total_user"),
+        "operation_type": {label: count for label, count in field("operation_type").items() if count},
+        "call_type": {label: count for label, count in field("call_type").items() if count},
+        "user_type": dict(field("user_type")),
+        "avg_wait_time": _stats(field("avg_wait_time")),
+        "wait_quantiles": {hour: field("time_wait_sketch")[hour].quantiles() for hour in HOURS},
+        "time_users": dict(field("time_users")),
+        **{name: {hour: _stats(field(name)[hour]) for hour in HOURS} for name in HOUR_STATS},
+        "wait_dist": dict(field("wait_dist")),
+        "stations": _stations({"station_ids": field("station_ids"), "boarding": field("boarding"),
+                               "alighting": field("alighting")}, catalog),
+        **{name: _od(field(name), catalog) for name in OD_FIELDS},
+    }
+
+
+def _minutes(value):
+    hours, minutes, seconds = (int(part) for part in value.split(':'))
+    return hours * 60 + minutes + seconds / 60
+
+
+# TRIPS를 한 건씩 집계한 기대값 (summarize와 같은 형태, 집계 모듈을 거치지 않는 검증 기준)
+def reference_days(trips):
+    days = {}
+    for area, date, operation, call, in_time, waiting, travel, o, d, adult, teen, children in trips:
+        day = days.setdefault((SERVICE_AREA[area], date), {
+            "total_user": 0, "operation_type": defaultdict(int), "call_type": defaultdict(int),
+            "user_type": {"성인": 0, "청소년": 0, "어린이": 0}, "avg_wait_time": RunningStats(),
+            "wait_sketch": {hour: QuantileSketch() for hour in HOURS}, "time_users": {hour: 0 for hour in HOURS},
+            **{name: {hour: RunningStats() for hour in HOURS} for name in HOUR_STATS},
+            "wait_dist": {label: 0 for label in WAIT_BUCKETS}, "stations": defaultdict(lambda: [0, 0]),
+            **{name: defaultdict(float) for name in OD_FIELDS},
+        })
+        day["operation_type"][operation] += 1
+        day["call_type"][call.split("(")[0]] += 1
+        if operation != "이용완료":
+            continue
+
+        users = adult + teen + children
+        waiting = _minutes(waiting) if waiting else None
+        travel = _minutes(travel) if travel else None
+        day["total_user"] += users
+        for label, count in zip(["성인", "청소년", "어린이"], [adult, teen, children]):
+            day["user_type"][label] += count
+        if waiting is not None:
+            day["avg_wait_time"].add(waiting)
+            day["wait_dist"][WAIT_BUCKETS[min(int(waiting // 5), len(WAIT_BUCKETS) - 1)]] += 1
+
+        (o_name, o_lat, o_lon), (d_name, d_lat, d_lon) = STATIONS[o], STATIONS[d]
+        hour = int(in_time[:2]) if in_time else None
+        if hour in HOURS:
+            coords = [[float(value) if value else np.nan] for value in (o_lat, o_lon, d_lat, d_lon)]
+            distance, speed = trip_distance_speed(*coords, [travel if travel is not None else np.nan])
+            day["time_users"][hour] += users
+            for name, value in [("time_wait", waiting), ("time_travel", travel),
+                                ("time_distance", distance[0]), ("time_speed", speed[0])]:
+                if value is not None and not np.isnan(value):
+                    day[name][hour].add(value)
+            if waiting is not None:
+                day["wait_sketch"][hour].add(waiting)
+
+        # 좌표가 없는 끝점은 정류장 승하차에서 제외
+        if o_lat and o_lon:
+            day["stations"][(o_name, float(o_lat), float(o_lon))][0] += users
+        if d_lat and d_lon:
+            day["stations"][(d_name, float(d_lat), float(d_lon))][1] += users
+        day["od"][(o_name, d_name)] += users
+        if travel is not None:
+            day["od_travel_count"][(o_name, d_name)] += 1
+            day["od_travel_sum"][(o_name, d_name)] += travel
+
+    return {key: {
+        "total_user": day["total_user"],
+        "operation_type": dict(day["operation_type"]),
+        "call_type": dict(day["call_type"]),
+        "user_type": day["user_type"],
+        "avg_wait_time": _stats(day["avg_wait_time"]),
+        "wait_quantiles": {hour: sketch.quantiles() for hour, sketch in day["wait_sketch"].items()},
+        "time_users": day["time_users"],
+        **{name: {hour: _stats(stats) for hour, stats in day[name].items()} for name in HOUR_STATS},
+        "wait_dist": day["wait_dist"],
+        "stations": {station: tuple(counts) for station, counts in day["stations"].items()},
+        **{name: {pair: pytest.approx(value) for pair, value in day[name].items() if value} for name in OD_FIELDS},
+    } for key, day in days.items()}
+
+
+def test_table_aggregates_match_trip_by_trip_reference(history_file):
+    catalog = StationCatalog(STATION_TYPES)
+    trips, _ = read_history_frame(history_file, SERVICE_AREA)
+    store = AggregateStore(aggregate_history_tables(trips), catalog, AREA_CENTER,
+                           {"청주_오송": None, "청주_남이": None})
+    expected = reference_days(TRIPS)
+
+    keys = [(region, date) for region in store.regions() for date in store.dates(region)]
+    assert sorted(keys) == sorted(expected)
+    assert sorted(keys) == [("청주_남이", "2024-01-02"), ("청주_오송", "2024-01-02"), ("청주_오송", "2024-01-03")]
+    for region, date in keys:
+        assert summarize(store.get(region, date), catalog) == expected[(region, date)], (region, date)
+
+
+def test_missing_values_stay_out_of_hourly_stats(history_file):
+    catalog = StationCatalog(STATION_TYPES)
+    trips, _ = read_history_frame(history_file, SERVICE_AREA)
+    store = AggregateStore(aggregate_history_tables(trips), catalog, AREA_CENTER, {})
+
+    day = store.get("청주_오송", "2024-01-02")
+    assert day.total_user == 7                                   # 이용완료 4건 (시각 없음, 운영 시간 밖 포함)
+    assert day.avg_wait_time.count == 4
+    assert sum(day.time_users.values()) == 4                     # 07시 두 건만 시간대에 집계
+    assert day.operation_type == {"이용완료": 4, "취소": 1, "미탑승": 1}
+    assert day.call_type == {"앱": 3, "전화": 3}
+
+    day = store.get("청주_오송", "2024-01-03")
+    assert day.avg_wait_time.count == 2
+    assert day.time_travel[18].count == 1
+    assert catalog.station_type(catalog.station_ids[("미등록정류장", 36.5402, 127.4803)]) == ''
+
+
+def test_store_lookups_reuse_day_records(history_file):
+    catalog = StationCatalog(STATION_TYPES)
+    trips, _ = read_history_frame(history_file, SERVICE_AREA)
+    store = AggregateStore(aggregate_history_tables(trips), catalog, AREA_CENTER, {})
+
+    day = store.get("청주_오송", "2024-01-02")
+    assert store.get("청주_오송", "2024-01-02") is day
+    assert store.get("청주_오송", "2024-01-03") is not day
+
+
+# 운행내역이 비어 있어도 (파일이 없는 경우 포함) 저장소를 만들 수 있어야 함
+def test_store_builds_from_empty_history(tmp_path):
+    path = tmp_path / "empty.csv"
+    write_history(path, [])
+    trips, _ = read_history_frame(str(path), SERVICE_AREA)
+    store = AggregateStore(aggregate_history_tables(trips), StationCatalog(STATION_TYPES), AREA_CENTER, {})
+    assert len(store) == 0 and not store.get("청주_오송", "2024-01-02").has_data
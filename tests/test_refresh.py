@@ -0,0 +1,59 @@
+import os
+from datetime import date
+
+import pytest
+
+from ingest import load_area_data, load_history_frame, aggregate_history_tables
+from refresh import HistoryFeed, append_cuts, diff_tables, verify_appends
+from synth import write_history
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATION_FILE = os.path.join(REPO_DIR, 'input', '01 data', 'DRT정류장(통합).csv')
+AREA_FILE = os.path.join(REPO_DIR, 'input', '01 data', '지역별 중심점.csv')
+
+
+@pytest.fixture(scope="module")
+def history(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("refresh") / "history.csv")
+    write_history(path, 2000, STATION_FILE, AREA_FILE, seed=3, start=date(2024, 1, 1), days=10)
+    service_area, _ = load_area_data(AREA_FILE)
+    return path, service_area
+
+
+@pytest.mark.parametrize("parts", [1, 2, 3, 7, 60])
+def test_appends_cut_mid_row(history, parts):
+    path, _ = history
+    with open(path, 'rb') as f:
+        data = f.read()
+    cuts = append_cuts(data, parts)
+
+    assert len(cuts) == parts and cuts[-1] == len(data)
+    assert cuts == sorted(cuts)
+    for cut in cuts[:-1]:
+        assert data[cut - 1:cut] != b'\n' and data[cut:cut + 1] != b'\n'
+
+
+@pytest.mark.parametrize("parts", [1, 2, 3, 7, 60])
+def test_merged_appends_match_single_load(history, parts):
+    path, service_area = history
+    assert verify_appends(path, service_area, parts) == []
+
+
+# 반영에 실패해도 추가분을 잃지 않도록 poll은 위치를 옮기지 않음
+def test_poll_keeps_offset_until_committed(history):
+    path, service_area = history
+    feed = HistoryFeed(path, service_area)
+    tables, offset = feed.poll()
+    retried, retried_offset = feed.poll()
+
+    assert feed.offset == 0 and retried_offset == offset > 0
+    assert diff_tables(retried, tables) == []
+    feed.offset = offset
+    assert feed.poll() is None
+
+
+def test_diff_tables_reports_changed_table(history):
+    path, service_area = history
+    tables = aggregate_history_tables(load_history_frame(path, service_area))
+    changed = dict(tables, hourly=tables["hourly"].assign(users=tables["hourly"]["users"] + 1))
+    assert diff_tables(changed, tables) == ["hourly"]
@@ -0,0 +1,122 @@
+import os
+import sqlite3
+from datetime import date
+
+import pytest
+
+from ingest import TABLE_KEYS, load_area_data, load_history_frame, aggregate_history_tables, merge_tables
+from refresh import diff_tables
+from storage import open_backend
+from synth import write_history
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATION_FILE = os.path.join(REPO_DIR, 'input', '01 data', 'DRT정류장(통합).csv')
+AREA_FILE = os.path.join(REPO_DIR, 'input', '01 data', '지역별 중심점.csv')
+FIRST = 1500    # 처음 적재하는 행 수 (나머지는 추가분)
+
+
+@pytest.fixture(scope="module")
+def history(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("storage") / "history.csv")
+    write_history(path, 2000, STATION_FILE, AREA_FILE, seed=5, start=date(2024, 1, 1), days=10)
+    service_area, _ = load_area_data(AREA_FILE)
+    return path, service_area
+
+
+@pytest.fixture(scope="module")
+def trips(history):
+    path, service_area = history
+    return load_history_frame(path, service_area), service_area
+
+
+@pytest.fixture
+def database(tmp_path):
+    return os.path.join(str(tmp_path), "drt.sqlite")
+
+
+def open_sqlite(database, service_area):
+    backend = open_backend(f"sqlite:///{database}", None, AREA_FILE, service_area)
+    backend.create_schema()
+    return backend
+
+
+# 키 순서로 정렬한 테이블 (늦게 커밋된 행은 처음 나타난 순서가 달라지므로 값만 비교)
+def sorted_tables(tables):
+    ordered = {"days": tables["days"].sort_values(["region", "date"]).reset_index(drop=True)}
+    for name, (keys, _) in TABLE_KEYS.items():
+        ordered[name] = tables[name].sort_values(keys).reset_index(drop=True)
+    return ordered
+
+
+# 파일이 그대로여도 남은 행을 반영하면 데이터 버전이 바뀌어야 함 (버전을 키로 쓰는 캐시가 이전 결과를 내지 않도록)
+def test_csv_version_follows_position(history):
+    path, service_area = history
+    backend = open_backend(None, path, AREA_FILE, service_area)
+    _, position = backend.poll()
+    assert backend.version(position) != backend.version(0) == backend.version()
+    backend.commit(position)
+    assert backend.version() == backend.version(position)
+    assert backend.fingerprint() == open_backend(None, path, AREA_FILE, service_area).fingerprint()
+
+
+def test_load_matches_csv_aggregates(trips, database):
+    frame, service_area = trips
+    backend = open_sqlite(database, service_area)
+    backend.insert_trips(frame)
+    tables, _, _ = backend.load()
+    assert diff_tables(tables, aggregate_history_tables(frame)) == []
+
+
+def test_poll_appends_match_full_aggregates(trips, database):
+    frame, service_area = trips
+    backend = open_sqlite(database, service_area)
+    backend.insert_trips(frame.iloc[:FIRST])
+    tables, _, position = backend.load()
+    backend.commit(position)
+    assert backend.poll() is None
+
+    backend.insert_trips(frame.iloc[FIRST:])
+    new_tables, position = backend.poll()
+    backend.commit(position)
+    assert diff_tables(merge_tables(tables, new_tables), aggregate_history_tables(frame)) == []
+    assert backend.poll() is None and not backend.truncated()
+
+
+# 작은 id가 늦게 커밋된 경우 (id를 비워 두었다가 같은 id로 다시 넣음)
+def test_poll_collects_late_commits(trips, database):
+    frame, service_area = trips
+    backend = open_sqlite(database, service_area)
+    backend.insert_trips(frame)
+    late = (FIRST + 10, FIRST + 60)
+    conn = sqlite3.connect(database, isolation_level=None)
+    conn.execute(f"CREATE TABLE held AS SELECT * FROM {backend.table} WHERE id > ? AND id <= ?", late)
+    conn.execute(f"DELETE FROM {backend.table} WHERE id > ? AND id <= ?", late)
+
+    tables, _, position = backend.load()
+    backend.commit(position)
+    assert set(range(late[0] + 1, late[1] + 1)) <= set(backend.gaps)
+
+    conn.execute(f"INSERT INTO {backend.table} SELECT * FROM held")
+    conn.close()
+    new_tables, position = backend.poll()
+    backend.commit(position)
+    assert not backend.gaps
+    assert diff_tables(sorted_tables(merge_tables(tables, new_tables)),
+                       sorted_tables(aggregate_history_tables(frame))) == []
+    assert backend.poll() is None
+
+
+def test_delete_requires_full_reload(trips, database):
+    frame, service_area = trips
+    backend = open_sqlite(database, service_area)
+    backend.insert_trips(frame)
+    _, _, position = backend.load()
+    backend.commit(position)
+    assert not backend.truncated()
+
+    conn = sqlite3.connect(database, isolation_level=None)
+    conn.execute(f"DELETE FROM {backend.table} WHERE id <= 10")
+    conn.close()
+    assert backend.truncated()
+    tables, _, _ = backend.load()
+    assert diff_tables(tables, aggregate_history_tables(frame.iloc[10:].reset_index(drop=True))) == []
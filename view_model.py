@@ -0,0 +1,137 @@
+import functools
+
+import numpy as np
+
+from stats import RunningStats
+from ingest import ZONE_METRICS
+from spatial import ZONE_LABELS
+
+PIE_KEYS = ("operation_type", "user_type", "call_type")
+WAIT_QUANTILES = (0.5, 0.9, 0.95)
+TOP_K_CHOICES = (5, 10, 20)
+TOP_K = max(TOP_K_CHOICES)   # 화면 값에는 최대 k개 순위를 미리 계산해 두고 요청한 k만큼 잘라 사용
+
+
+# 지역/일자 화면에 필요한 값을 한 번에 계산한 결과 (모든 콜백이 공유)
+class DayView:
+    __slots__ = ("has_data", "total_calls", "total_users", "avg_wait",
+                 "top_in", "top_out", "top_od", "top_od_travel", "pies",
+                 "hours", "hourly_wait", "hourly_wait_quantiles", "hourly_users", "hourly_travel",
+                 "hourly_distance", "hourly_speed", "hourly_speed_std", "trip_distance", "trip_speed",
+                 "wait_dist_labels", "wait_dist_percentages",
+                 "zone_labels", "zone_start_shares", "zone_end_shares", "zone_wait")
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            setattr(self, name, values[name])
+
+
+# 전 지역 비교 화면 값 (지역 순서의 지표 목록)
+class RegionOverview:
+    __slots__ = ("regions", "calls", "users", "wait_mean", "wait_p90", "completion")
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            setattr(self, name, values[name])
+
+
+# 건수 상위 k개 위치 (건수가 같으면 앞선 항목 우선)
+# k번째 값 이상인 후보만 선형 시간 분할(np.partition)로 고른 뒤 후보끼리만 정렬
+def _top_positions(counts, k=TOP_K):
+    counts = np.asarray(counts)
+    candidates = np.arange(len(counts))
+    if len(counts) > k:
+        threshold = np.partition(counts, len(counts) - k)[len(counts) - k]
+        candidates = np.flatnonzero(counts >= threshold)
+    return candidates[np.argsort(-counts[candidates], kind='stable')][:k]
+
+
+# 집계 레코드 → 화면 값
+def build_day_view(region_info, catalog):
+    station_ids = region_info.station_ids
+    # OD별 이용인원 (OD 쌍의 첫 등장 순서, 인원이 같으면 먼저 나온 쌍이 앞 순위)
+    od_origins, od_destinations = region_info.od_pairs
+    od_users = np.asarray(region_info.od[od_origins, od_destinations]).ravel() if len(od_origins) else \
+        np.empty(0, dtype=np.int64)
+    top_od = _top_positions(od_users)
+
+    # 상위 OD별 이동시간 건수, 합 (희소 행렬에서 상위 쌍만 조회)
+    travel_count, travel_sum = [], []
+    if len(top_od):
+        top_origins, top_destinations = od_origins[top_od], od_destinations[top_od]
+        travel_count = np.asarray(region_info.od_travel_count[top_origins, top_destinations]).ravel().tolist()
+        travel_sum = np.asarray(region_info.od_travel_sum[top_origins, top_destinations]).ravel().tolist()
+
+    # 시간대별 현황
+    hours = list(region_info.time_wait.keys())
+    wait_quantiles = [
+        [round(value, 1) for value in sketch.quantiles(WAIT_QUANTILES)]
+        for sketch in region_info.time_wait_sketch.values()
+    ]
+
+    # 이동거리, 속도 (시간대별 분포와 기간 전체 분포를 평균, 표준편차로 요약)
+    distance = functools.reduce(RunningStats.merge, region_info.time_distance.values(), RunningStats())
+    speed = functools.reduce(RunningStats.merge, region_info.time_speed.values(), RunningStats())
+
+    # 대기시간 분포 비율 (백분율)
+    sizes = list(region_info.wait_dist.values())
+    total = sum(sizes)
+
+    # 그린존/레드존 (기점, 종점 구역별 운행 비율, 기점 구역별 평균 대기시간)
+    flows = np.asarray(region_info.zone_flows)
+    trips = flows[..., ZONE_METRICS.index("trips")]
+    wait_count = flows[..., ZONE_METRICS.index("wait_count")].sum(axis=1).tolist()
+    wait_sum = flows[..., ZONE_METRICS.index("wait_sum")].sum(axis=1).tolist()
+    total_trips = float(trips.sum())
+
+    return DayView(
+        has_data=region_info.has_data,
+        total_calls=sum(region_info.call_type.values()),
+        total_users=region_info.total_user,
+        avg_wait=float(round(region_info.avg_wait_time.mean, 1)),
+
+        # 승차, 하차 상위 정류장 (정류장명, 인원), 통행 OD 상위 ((기점명, 종점명), 인원)
+        top_in=[(catalog.station_name(station_ids[i]), int(region_info.boarding[i]))
+                for i in _top_positions(region_info.boarding)],
+        top_out=[(catalog.station_name(station_ids[i]), int(region_info.alighting[i]))
+                 for i in _top_positions(region_info.alighting)],
+        top_od=[((catalog.names[od_origins[i]], catalog.names[od_destinations[i]]), int(od_users[i]))
+                for i in top_od],
+        # 상위 OD별 평균 이동시간 (분, 이동시간 기록이 없으면 None)
+        top_od_travel=[round(total / count, 1) if count else None for total, count in zip(travel_sum, travel_count)],
+
+        # 배차 분류, 이용자 유형, 호출 방법 (라벨, 값)
+        pies={key: (list(getattr(region_info, key).keys()), list(getattr(region_info, key).values()))
+              for key in PIE_KEYS},
+
+        hours=hours,
+        hourly_wait=[round(wait_stats.mean, 1) for wait_stats in region_info.time_wait.values()],
+        hourly_wait_quantiles=wait_quantiles,
+        hourly_users=list(region_info.time_users.values()),
+        hourly_travel=[round(travel_stats.mean, 1) for travel_stats in region_info.time_travel.values()],
+        hourly_distance=[round(stats.mean, 2) for stats in region_info.time_distance.values()],
+        hourly_speed=[round(stats.mean, 1) for stats in region_info.time_speed.values()],
+        hourly_speed_std=[round(stats.std, 1) for stats in region_info.time_speed.values()],
+        trip_distance=(round(distance.mean, 2), round(distance.std, 2)),
+        trip_speed=(round(speed.mean, 1), round(speed.std, 1)),
+
+        wait_dist_labels=list(region_info.wait_dist.keys()),
+        wait_dist_percentages=[round((size / total) * 100, 1) if total else 0 for size in sizes],
+
+        zone_labels=list(ZONE_LABELS),
+        zone_start_shares=[round(count / total_trips * 100, 1) if total_trips else 0 for count in trips.sum(axis=1).tolist()],
+        zone_end_shares=[round(count / total_trips * 100, 1) if total_trips else 0 for count in trips.sum(axis=0).tolist()],
+        zone_wait=[round(total / count, 1) if count else 0 for total, count in zip(wait_sum, wait_count)],
+    )
+
+
+# 지역별 기간 요약 (RangeIndex.overview) → 전 지역 비교 화면 값 (이용 완료율은 백분율)
+def build_region_overview(regions, summary):
+    return RegionOverview(
+        regions=list(regions),
+        calls=summary["calls"].astype(np.int64).tolist(),
+        users=summary["users"].astype(np.int64).tolist(),
+        wait_mean=np.round(summary["wait_mean"], 1).tolist(),
+        wait_p90=np.round(summary["wait_p90"], 1).tolist(),
+        completion=np.round(summary["completion"] * 100, 1).tolist(),
+    )
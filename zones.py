@@ -0,0 +1,139 @@
+import os
+import json
+import hashlib
+import logging
+import argparse
+import threading
+
+import shapely
+import geopandas as gpd
+
+# 그린존/레드존 단순화 설정
+SIMPLIFY_TOLERANCE = 5.0      # 단순화 허용오차 (m)
+SIMPLIFY_CRS = "EPSG:5179"    # 단순화에 사용할 미터 단위 좌표계
+MAP_CRS = "EPSG:4326"         # 지도 표시 좌표계
+COORD_PRECISION = 6           # 경위도 소수점 자리수 (약 0.1m)
+zone_cache_dir = os.path.join('cache', 'zones')
+
+_zone_cache = {}
+_zone_lock = threading.Lock()
+
+
+def _round_coords(coords, ndigits):
+    if isinstance(coords[0], (int, float)):
+        return [round(value, ndigits) for value in coords]
+    return [_round_coords(part, ndigits) for part in coords]
+
+
+def _source_key(path, tolerance):
+    stat = os.stat(path)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "tolerance": tolerance, "precision": COORD_PRECISION}
+
+
+# shapefile → 단순화된 경량 GeoJSON (위상 유지 단순화, 좌표 반올림, 속성 제거)
+def preprocess_zone(path, tolerance=SIMPLIFY_TOLERANCE):
+    gdf = gpd.read_file(path)
+    if gdf.crs is None:
+        gdf = gdf.set_crs(MAP_CRS)
+    original = gdf.to_crs(MAP_CRS)
+
+    simplified = gdf.to_crs(SIMPLIFY_CRS).geometry.simplify(tolerance, preserve_topology=True).to_crs(MAP_CRS)
+    features = [
+        {"type": "Feature", "properties": {},
+         "geometry": {"type": geom.geom_type,
+                      "coordinates": _round_coords(shapely.geometry.mapping(geom)["coordinates"], COORD_PRECISION)}}
+        for geom in simplified if geom is not None and not geom.is_empty
+    ]
+    geojson = {"type": "FeatureCollection", "features": features}
+
+    report = {
+        "file": os.path.basename(path),
+        "vertices_before": int(shapely.get_num_coordinates(original.geometry.values).sum()),
+        "vertices_after": int(shapely.get_num_coordinates(simplified.values).sum()),
+        "bytes_before": len(original.to_json().encode()),
+        "bytes_after": len(json.dumps(geojson, ensure_ascii=False, separators=(',', ':')).encode()),
+    }
+    return geojson, report
+
+
+def _cache_file(path):
+    return os.path.join(zone_cache_dir, os.path.splitext(os.path.basename(path))[0] + '.json')
+
+
+def _load_cached(path, source):
+    try:
+        with open(_cache_file(path), 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    return cached if cached.get("source") == source else None
+
+
+def _save_cached(path, source, geojson, report):
+    os.makedirs(zone_cache_dir, exist_ok=True)
+    temp_path = f"{_cache_file(path)}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({"source": source, "report": report, "geojson": geojson}, f,
+                  ensure_ascii=False, separators=(',', ':'))
+    os.replace(temp_path, _cache_file(path))
+
+
+# 구역 GeoJSON 조회 (shapefile 수정 시각이 바뀐 경우에만 다시 처리)
+def zone_geojson(path, tolerance=SIMPLIFY_TOLERANCE):
+    return _zone_entry(path, tolerance)["geojson"]
+
+
+# 구역 GeoJSON 응답 본문과 ETag (직렬화 결과를 구역 캐시 항목에 보관, shapefile이 바뀌면 항목과 함께 다시 만듦)
+def zone_payload(path, tolerance=SIMPLIFY_TOLERANCE):
+    entry = _zone_entry(path, tolerance)
+    payload = entry.get("payload")
+    if payload is None:
+        body = json.dumps(entry["geojson"], ensure_ascii=False, separators=(',', ':')).encode()
+        payload = entry["payload"] = body, hashlib.sha1(body).hexdigest()[:20]
+    return payload
+
+
+def _zone_entry(path, tolerance):
+    source = _source_key(path, tolerance)
+    entry = _zone_cache.get(path)
+    if entry is not None and entry["source"] == source:
+        return entry
+
+    with _zone_lock:
+        entry = _load_cached(path, source)
+        if entry is None:
+            geojson, report = preprocess_zone(path, tolerance)
+            entry = {"source": source, "report": report, "geojson": geojson}
+            try:
+                _save_cached(path, source, geojson, report)
+            except OSError as e:
+                logging.warning(f"Zone cache could not be saved for {path}: {e}")
+            logging.info(f"Zone {report['file']}: {report['vertices_before']} → {report['vertices_after']} vertices, "
+                         f"{report['bytes_before']} → {report['bytes_after']} bytes")
+        _zone_cache[path] = entry
+    return entry
+
+
+# 구역별 단순화 전후 정점 수, 크기
+def zone_report(paths, tolerance=SIMPLIFY_TOLERANCE):
+    return [_zone_entry(path, tolerance)["report"] for path in paths]
+
+
+# 구역 전처리 및 결과 출력: python zones.py [--tolerance 5]
+def main():
+    shp_input_dir = os.path.join('input', '02 shp')
+    parser = argparse.ArgumentParser(description="그린존/레드존 shapefile 단순화 및 캐시 생성")
+    parser.add_argument('--tolerance', type=float, default=SIMPLIFY_TOLERANCE, help="단순화 허용오차 (m)")
+    args = parser.parse_args()
+
+    paths = sorted(os.path.join(shp_input_dir, name) for name in os.listdir(shp_input_dir) if name.endswith('.shp'))
+    reports = zone_report(paths, args.tolerance)
+
+    print(f"{'file':<28} {'vertices':>15} {'bytes':>19}")
+    for report in reports + [{"file": "합계", **{key: sum(r[key] for r in reports) for key in reports[0] if key != "file"}}]:
+        print(f"{report['file']:<28} {report['vertices_before']:>7}→{report['vertices_after']:<7} "
+              f"{report['bytes_before']:>9}→{report['bytes_after']:<9}")
+
+
+if __name__ == '__main__':
+    main()